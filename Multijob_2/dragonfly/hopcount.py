@@ -1,59 +1,76 @@
 import math
+import os
+import sys
 from collections import Counter
 
-def calculate_hop_count(node_i, node_j, num_groups, routers_per_group, hosts_per_router, intergroup_links):
-    # Decompose node addresses
-    nodes_per_group = routers_per_group * hosts_per_router
-    group_i = node_i // nodes_per_group
-    group_j = node_j // nodes_per_group
+import numpy as np
 
-    router_i = (node_i % nodes_per_group) // hosts_per_router
-    router_j = (node_j % nodes_per_group) // hosts_per_router
-    
-    # Same group
-    if group_i == group_j:
-        if router_i == router_j:# Same router
-            return 2
-        else:
-            return 3
-    # Different groups   
-    else:
-        # Determine if groups are directly connected
-        groups_per_router = num_groups // intergroup_links
-        for link in range(intergroup_links):
-            dest_group = (group_i + link * groups_per_router + 1) % num_groups
-            if dest_group == group_j:
-                return 4
-        return 5
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from sst_analysis.allocation import allocate
+from sst_analysis.dragonfly import all_pairs_hop_histogram, root_hop_histogram
+from sst_analysis.hops import histogram_average
+from sst_analysis.parallel import hop_histograms
+from sst_analysis.sampling import sample_hops
+from sst_analysis.schedules import collective_schedule, schedule_hops
+from sst_analysis.topology import DragonflyModel
+
+# Hop count between two nodes (including NIC<->router) on merlin's dragonfly wiring.
+# routing="minimal": local hop to the router owning a global link to the destination
+# group, the global link, local hop to the destination router (2..5 hops).
+# routing="valiant": the same through an intermediate group, averaged over all groups.
+def calculate_hop_count(node_i, node_j, model, routing="minimal"):
+    if routing == "valiant":
+        return float(model.valiant_distance(node_i, node_j))
+    return int(model.distance(node_i, node_j))
+
+# Hop statistics of the messages of the job's collective algorithm: per message,
+# byte-weighted and per step under minimal routing (see schedules.schedule_hops),
+# plus the Valiant average over the same messages
+def schedule_hop_stats(job, model, nodes, allreduce_algorithm="binomial"):
+    algorithm = allreduce_algorithm if job["pattern"] == "Allreduce" else None
+    stats = schedule_hops(model, job, nodes, algorithm)
+    _, src, dst, _ = collective_schedule(job, algorithm)
+    nodes = np.asarray(nodes)
+    stats["valiant_avg_hops"] = float(model.valiant_distance(nodes[src], nodes[dst]).mean()) if src.size else 0.0
+    return stats
 
-def calculate_job_hop_count(job, num_groups, routers_per_group, hosts_per_router, intergroup_links):
+# Calculate average and detailed hop counts for a given job, counting all pairs
+# for Allreduce/Alltoall and root -> others for Scatter/Bcast
+# method="groups" builds the minimal-route histogram from group-pair occupancy,
+# "routers" from router-pair occupancy, "pairs" enumerates every node pair.
+# method="sample" estimates both from random pairs stratified by group (minimal
+# routing only); the breakdown then holds estimated pair counts.
+# nodes is the job's rank -> node map (defaults to start..start+size).
+def calculate_job_hop_count(job, model, routing="minimal", nodes=None, method=None):
     start = job["start"]
     size = job["size"]
-    nodes = list(range(start, start + size))
-    total_hops = 0
-    count = 0
-    hop_counter = Counter()
+    if nodes is None:
+        nodes = range(start, start + size)
 
+    if method == "sample":
+        if routing != "minimal":
+            raise ValueError("method='sample' supports minimal routing only")
+        root = 0 if job["pattern"] in ["Scatter", "Bcast"] else None
+        estimate = sample_hops(model, nodes, root=root, strata="group", seed=0)
+        return estimate["avg_hops"], estimate["counts"]
+
+    nodes = [int(n) for n in nodes]
+    if method == "pairs":
+        hop_counter = Counter()
+        if job["pattern"] in ["Scatter", "Bcast"]:
+            pairs = [(nodes[0], node) for node in nodes[1:]]
+        else:
+            pairs = [(i, j) for i in nodes for j in nodes if i != j]
+        for node_i, node_j in pairs:
+            hop_counter[calculate_hop_count(node_i, node_j, model, routing)] += 1
     # Scatter/Bcast: Only root communicates with others
-    if job["pattern"] in ["Scatter", "Bcast"]:
-        root = nodes[0]
-        for node_j in nodes[1:]:
-            hops = calculate_hop_count(root, node_j, num_groups, routers_per_group, hosts_per_router, intergroup_links)
-            total_hops += hops
-            hop_counter[hops] += 1
-            count += 1
-     # Allreduce/Alltoall: All pairs communicate       
-    else: 
-        for i in nodes:
-            for j in nodes:
-                if i != j:
-                    hops = calculate_hop_count(i, j, num_groups, routers_per_group, hosts_per_router, intergroup_links)
-                    total_hops += hops
-                    hop_counter[hops] += 1
-                    count += 1
+    elif job["pattern"] in ["Scatter", "Bcast"]:
+        hop_counter = root_hop_histogram(nodes, nodes[0], model, routing)
+    # Allreduce/Alltoall: All pairs communicate
+    else:
+        hop_counter = all_pairs_hop_histogram(nodes, model, routing, method=method)
 
-    avg = total_hops / count if count > 0 else 0
-    return avg, hop_counter
+    return histogram_average(hop_counter), hop_counter
 
 # Parameters for dragonfly
 num_groups = 16
@@ -61,6 +78,9 @@ routers_per_group = 8
 hosts_per_router = 4
 intergroup_links = 4
 
+# Global link map and group x group gateway table, built once
+model = DragonflyModel(num_groups, routers_per_group, hosts_per_router, intergroup_links)
+
 jobs = [
     {"size": 16, "start": 0, "pattern": "Allreduce"},
     {"size": 64, "start": 16, "pattern": "Alltoall"},
@@ -68,11 +88,48 @@ jobs = [
     {"size": 64, "start": 112, "pattern": "Bcast"}
 ]
 
+# Rank -> node placement, replaying system.allocateNodes() in job order.
+# dragonfly.py uses unseeded "random", which no replay reproduces;
+# allocation.allocated_nodes("dragonfly_stats.csv") lists the nodes that run used.
+allocation_method = "linear"
+allocation_seed = None
+job_nodes = allocate(jobs, model.num_nodes, allocation_method, seed=allocation_seed)
+
+# Hop analysis: "schedule" routes the messages of each job's collective algorithm
+# (sst_analysis.schedules); None, "groups", "routers", "pairs" or "sample" count
+# all pairs for Allreduce/Alltoall and root -> others for Scatter/Bcast;
+# "parallel" counts the same minimal-route pairs for all jobs at once in
+# hop_workers processes (sst_analysis.parallel.hop_histograms; None uses all cores)
+hop_method = "schedule"
+hop_workers = None
+# Allreduce algorithm of the schedule analysis: "binomial" (ember's tree),
+# "recursive_doubling", "rabenseifner" or "ring". Alltoall is pairwise exchange,
+# Scatter/Bcast binomial trees from rank 0.
+allreduce_algorithm = "binomial"
+if hop_method == "parallel":
+    parallel_histograms = hop_histograms(model, jobs, job_nodes, workers=hop_workers)
+
 # Print results
 print("Hop Count Analysis Per Job:\n")
 for idx, job in enumerate(jobs):
-    avg_hops, hop_dist = calculate_job_hop_count(job, num_groups, routers_per_group, hosts_per_router, intergroup_links)
+    if hop_method == "schedule":
+        stats = schedule_hop_stats(job, model, job_nodes[idx], allreduce_algorithm)
+        avg_hops, hop_dist = stats["avg_hops"], stats["message_histogram"]
+        valiant_hops = stats["valiant_avg_hops"]
+    else:
+        stats = None
+        if hop_method == "parallel":
+            hop_dist = parallel_histograms[idx]
+            avg_hops = histogram_average(hop_dist)
+        else:
+            avg_hops, hop_dist = calculate_job_hop_count(job, model, nodes=job_nodes[idx], method=hop_method)
+        valiant_hops, _ = calculate_job_hop_count(job, model, "valiant", nodes=job_nodes[idx])
     print(f"  Job {idx + 1}: {job['pattern']} (size={job['size']})")
     print(f"     Average Hop Count: {avg_hops:.2f}")
-    print(f"     Hop Count Breakdown: {dict(hop_dist)}\n")
-
+    print(f"     Hop Count Breakdown: {dict(sorted(hop_dist.items()))}")
+    if stats is not None:
+        steps = ", ".join(f"{a:.2f}/{m}" for a, m in zip(stats["step_avg_hops"], stats["step_max_hops"]))
+        print(f"     Byte-Weighted Average Hop Count: {stats['byte_avg_hops']:.2f}")
+        print(f"     Bytes per Hop Count: {dict(sorted(stats['histogram'].items()))}")
+        print(f"     Per-Step Hops (byte-weighted avg/max): {steps}")
+    print(f"     Valiant Average Hop Count: {valiant_hops:.2f}\n")
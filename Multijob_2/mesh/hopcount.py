@@ -1,5 +1,16 @@
 import numpy as np
 import csv
+from collections import Counter
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from sst_analysis.allocation import allocate
+from sst_analysis.jobs import iterations
+from sst_analysis.mesh import all_pairs_hop_stats, root_hop_stats
+from sst_analysis.sampling import sample_hops
+from sst_analysis.schedules import schedule_hops
+from sst_analysis.topology import MeshModel
 
 # Job definitions - 256 ranks
 jobs = [
@@ -11,43 +22,84 @@ jobs = [
     {"size": 2, "start": 254, "pattern": "PingPong", "params": "arg.messageSize=1024 arg.iterations=15 arg.rank2=1"}
 ]
 
+# 32x32 mesh of mesh.py, one node per router; node n sits at (n % 32, n // 32)
+mesh_model = MeshModel((32, 32))
+num_nodes = mesh_model.num_nodes
+
 # Generate mesh coordinates
-x_coords = np.tile(np.arange(32), 32)
-y_coords = np.repeat(np.arange(32), 32)
+x_coords, y_coords = mesh_model.router_coords(mesh_model.router_of(np.arange(num_nodes)))
 all_coords = list(zip(x_coords, y_coords))
 
-# Randomly select 256 nodes for ranks
-np.random.seed(42)
-rank_coords = [all_coords[i] for i in np.random.choice(1024, 256, replace=False)]
+# Rank placement. None keeps the original seeded sample of 256 of the 1024 nodes;
+# "linear" replays system.allocateNodes() as called by mesh.py, job by job;
+# "random" draws a random placement (mesh.py's own is unseeded).
+allocation_method = None
+allocation_seed = None
+if allocation_method is None:
+    np.random.seed(42)
+    rank_nodes = np.random.choice(num_nodes, 256, replace=False)
+else:
+    rank_nodes = np.concatenate(allocate(jobs, num_nodes, allocation_method, seed=allocation_seed))
+rank_coords = [all_coords[i] for i in rank_nodes]
+rank_x = np.array([c[0] for c in rank_coords])
+rank_y = np.array([c[1] for c in rank_coords])
+
+# Hop analysis: "schedule" routes the messages of each job's collective algorithm
+# (sst_analysis.schedules), byte-weighted and per step; "pairs" counts all rank
+# pairs for Allreduce/Alltoall and root -> others for Scatter/Bcast
+analysis = "schedule"
+# Allreduce algorithm of the schedule analysis: "binomial" (ember's tree),
+# "recursive_doubling", "rabenseifner" or "ring". Alltoall is pairwise exchange,
+# Scatter/Bcast binomial trees from arg.root, Barrier the dissemination rounds.
+allreduce_algorithm = "binomial"
+
+# Set a tolerance (hops) to estimate the all-pairs and root patterns of the
+# "pairs" analysis from random pairs stratified by router instead of counting them exactly
+sample_tolerance = None
 
 # Manhattan hop distance
 def manhattan(coord1, coord2):
     return abs(coord1[0]-coord2[0]) + abs(coord1[1]-coord2[1]) + 2  # +2 for injection/ejection
 
-# Hop count calculation based on pattern
-def pattern_hops(job):
+# Hop statistics of the job's collective schedule (see schedules.schedule_hops)
+def schedule_hop_stats(job):
+    nodes = rank_nodes[job["start"]:job["start"] + job["size"]]
+    algorithm = allreduce_algorithm if job["pattern"] == "Allreduce" else None
+    return schedule_hops(mesh_model, job, nodes, algorithm)
+
+# Hop count calculation based on pattern: returns (avg, hop_counter)
+def pattern_hop_stats(job):
     start, size, pattern = job["start"], job["size"], job["pattern"]
-    coords = rank_coords[start:start+size]
+    xs, ys = rank_x[start:start+size], rank_y[start:start+size]
+    nodes = rank_nodes[start:start+size]
 
-    if pattern in ["Allreduce", "Alltoall"]:
-        total = 0
-        for i in range(size):
-            for j in range(size):
-                if i != j:
-                    total += manhattan(coords[i], coords[j])
-        return total / (size * (size - 1))
+    if analysis == "schedule":
+        stats = schedule_hop_stats(job)
+        return stats["avg_hops"], stats["message_histogram"]
+
+    # Barrier has no all-pairs form: count the messages of one round of the dissemination barrier
+    if pattern == "Barrier":
+        stats = schedule_hop_stats(job)
+        return stats["avg_hops"], Counter({h: c // iterations(job) for h, c in stats["message_histogram"].items()})
 
-    elif pattern == "Barrier":
-        return 2 * (np.log2(size) + 1)
+    if sample_tolerance is not None and pattern in ["Allreduce", "Alltoall", "Scatter", "Bcast"]:
+        root = int(job["params"].split("root=")[1].split()[0]) if pattern in ["Scatter", "Bcast"] else None
+        estimate = sample_hops(mesh_model, nodes, root=root, strata="router", tol=sample_tolerance, seed=0)
+        return estimate["avg_hops"], estimate["counts"]
+
+    if pattern in ["Allreduce", "Alltoall"]:
+        return all_pairs_hop_stats(xs, ys)
 
     elif pattern in ["Scatter", "Bcast"]:
         root = int(job["params"].split("root=")[1].split()[0])
-        root_coord = coords[root]
-        total = sum(manhattan(root_coord, c) for i, c in enumerate(coords) if i != root)
-        return total / (size - 1)
+        return root_hop_stats(xs, ys, root)
 
     elif pattern == "PingPong":
-        return manhattan(coords[0], coords[1])
+        hops = int(manhattan((xs[0], ys[0]), (xs[1], ys[1])))
+        return hops, Counter({hops: 1})
+
+def pattern_hops(job):
+    return pattern_hop_stats(job)[0]
 
 # Print job summary
 print("Job Hop Count Analysis:\n")
@@ -55,11 +107,24 @@ print("Job Hop Count Analysis:\n")
 # Collect per-rank CSV rows
 csv_rows = [["Job ID", "Pattern", "Size", "Avg Hop Count", "Rank", "Coordinates"]]
 
+job_avgs = []
 for job_id, job in enumerate(jobs, start=1):
-    hops = pattern_hops(job)
+    if analysis == "schedule":
+        stats = schedule_hop_stats(job)
+        hops, hop_dist = stats["avg_hops"], stats["message_histogram"]
+    else:
+        hops, hop_dist = pattern_hop_stats(job)
+    job_avgs.append(hops)
     coords = rank_coords[job["start"]:job["start"] + job["size"]]
     
     print(f"Job {job_id}: {job['pattern']:<10} Size={job['size']:<3} Avg Hops={hops:.2f}")
+    if hop_dist:
+        print(f"       Hop Count Breakdown: {dict(sorted(hop_dist.items()))}")
+    if analysis == "schedule":
+        steps = ", ".join(f"{a:.2f}/{m}" for a, m in zip(stats["step_avg_hops"], stats["step_max_hops"]))
+        print(f"       Byte-Weighted Avg Hops={stats['byte_avg_hops']:.2f}")
+        print(f"       Bytes per Hop Count: {dict(sorted(stats['histogram'].items()))}")
+        print(f"       Per-Step Hops (byte-weighted avg/max, one iteration): {steps}")
     
     for rank, coord in enumerate(coords):
         csv_rows.append([
@@ -72,7 +137,7 @@ for job_id, job in enumerate(jobs, start=1):
         ])
 
 # Overall average
-total_avg = np.mean([pattern_hops(job) for job in jobs])
+total_avg = np.mean(job_avgs)
 print(f"\nOverall Average Hop Count: {total_avg:.2f}")
 
 # Export to CSV
@@ -0,0 +1,136 @@
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from sst_analysis.allocation import allocate
+from sst_analysis.hops import histogram_average
+from sst_analysis.parallel import hop_histograms
+from sst_analysis.polarfly import (load_distance_matrix, all_pairs_hop_histogram, root_hop_histogram,
+                                   polarfly_adjacency, write_adjacency)
+from sst_analysis.schedules import schedule_hops
+from sst_analysis.topology import DistanceMatrixModel
+
+# Hop statistics of the messages of the job's collective algorithm: per message,
+# byte-weighted and per step (see schedules.schedule_hops)
+def schedule_hop_stats(job, model, nodes, allreduce_algorithm="binomial"):
+    algorithm = allreduce_algorithm if job["pattern"] == "Allreduce" else None
+    return schedule_hops(model, job, nodes, algorithm)
+
+# Calculate average and detailed hop counts for a given job, counting all pairs
+# for Allreduce/Alltoall and root -> others for Scatter/Bcast
+# nodes is the job's rank -> node map (defaults to start..start+size).
+def calculate_job_hop_count(job, dist, hosts_per_router, nodes=None):
+    start = job["start"]
+    size = job["size"]
+    if nodes is None:
+        nodes = range(start, start + size)
+
+    # Scatter/Bcast: Only root communicates with others
+    if job["pattern"] in ["Scatter", "Bcast"]:
+        hop_counter = root_hop_histogram(nodes, nodes[0], dist, hosts_per_router)
+    # Allreduce/Alltoall: All pairs communicate
+    else:
+        hop_counter = all_pairs_hop_histogram(nodes, dist, hosts_per_router)
+
+    return histogram_average(hop_counter), hop_counter
+
+# PolarFly topology config: q=25 -> 651 routers, 1 host per router (see polarfly.py)
+q = 25
+hosts_per_router = 1
+adjacency_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "polarfly_data", f"PolarFly.q_{q}.txt")
+# Other prime powers q have no shipped file; generate it
+if not os.path.exists(adjacency_file):
+    write_adjacency(adjacency_file, *polarfly_adjacency(q))
+
+# All-pairs router distances, cached next to the adjacency file after the first run
+dist = load_distance_matrix(adjacency_file)
+
+jobs = [
+    {"size": 16, "start": 0, "pattern": "Allreduce"},
+    {"size": 64, "start": 16, "pattern": "Alltoall"},
+    {"size": 32, "start": 80, "pattern": "Scatter"},
+    {"size": 64, "start": 112, "pattern": "Bcast"}
+]
+
+# Rank -> node placement; polarfly.py allocates every job "linear"
+allocation_method = "linear"
+allocation_seed = None
+job_nodes = allocate(jobs, dist.shape[0] * hosts_per_router, allocation_method, seed=allocation_seed)
+
+# Hop analysis: "schedule" routes the messages of each job's collective algorithm
+# (sst_analysis.schedules); "pairs" counts all pairs for Allreduce/Alltoall and
+# root -> others for Scatter/Bcast (calculate_job_hop_count); "parallel" counts the
+# same pairs for all jobs at once in hop_workers processes
+# (sst_analysis.parallel.hop_histograms; None uses all cores)
+hop_method = "schedule"
+hop_workers = None
+# Allreduce algorithm of the schedule analysis: "binomial" (ember's tree),
+# "recursive_doubling", "rabenseifner" or "ring". Alltoall is pairwise exchange,
+# Scatter/Bcast binomial trees from rank 0.
+allreduce_algorithm = "binomial"
+model = DistanceMatrixModel(dist, hosts_per_router)
+if hop_method == "parallel":
+    parallel_histograms = hop_histograms(model, jobs, job_nodes, workers=hop_workers)
+
+# Run and store outputs
+job_outputs = []
+print("PolarFly Hop Count Analysis Per Job:\n")
+for idx, job in enumerate(jobs):
+    if hop_method == "schedule":
+        stats = schedule_hop_stats(job, model, job_nodes[idx], allreduce_algorithm)
+        avg_hops, hop_dist = stats["avg_hops"], stats["message_histogram"]
+    elif hop_method == "parallel":
+        stats = None
+        hop_dist = parallel_histograms[idx]
+        avg_hops = histogram_average(hop_dist)
+    else:
+        stats = None
+        avg_hops, hop_dist = calculate_job_hop_count(job, dist, hosts_per_router, nodes=job_nodes[idx])
+    breakdown = dict(sorted(hop_dist.items()))
+    print(f"  Job {idx + 1}: {job['pattern']} (size={job['size']})")
+    print(f"     Average Hop Count: {avg_hops:.2f}")
+    print(f"     Hop Count Breakdown: {breakdown}")
+    if stats is not None:
+        steps = ", ".join(f"{a:.2f}/{m}" for a, m in zip(stats["step_avg_hops"], stats["step_max_hops"]))
+        print(f"     Byte-Weighted Average Hop Count: {stats['byte_avg_hops']:.2f}")
+        print(f"     Bytes per Hop Count: {dict(sorted(stats['histogram'].items()))}")
+        print(f"     Per-Step Hops (byte-weighted avg/max): {steps}")
+    print()
+
+    job_outputs.append({
+        "job": idx + 1,
+        "pattern": job["pattern"],
+        "size": job["size"],
+        "avg": avg_hops,
+        "byte_avg": stats["byte_avg_hops"] if stats is not None else avg_hops,
+        "breakdown": breakdown
+    })
+
+# Collect all unique hop types across all jobs
+all_hop_types = sorted({hop for job in job_outputs for hop in job["breakdown"]})
+
+# CSV header
+header = ["Job ID", "Pattern", "Size", "Avg Hop Count", "Byte-Weighted Avg Hop Count"] + [str(hop) for hop in all_hop_types]
+
+# CSV rows
+rows = []
+for job in job_outputs:
+    row = [
+        f"Job {job['job']}",
+        job["pattern"],
+        job["size"],
+        round(job["avg"], 2),
+        round(job["byte_avg"], 2),
+    ]
+    for hop in all_hop_types:
+        row.append(job["breakdown"].get(hop, ""))
+    rows.append(row)
+
+# Write to CSV file
+with open("polarfly_hopcount_table.csv", "w", newline="") as f:
+    writer = csv.writer(f)
+    writer.writerow(header)
+    writer.writerows(rows)
+
+print("Hop count data saved to 'polarfly_hopcount_table.csv'")
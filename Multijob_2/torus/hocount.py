@@ -1,7 +1,18 @@
 import math
 import csv
+import os
+import sys
 from collections import Counter
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from sst_analysis.allocation import allocate
+from sst_analysis.hops import histogram_average
+from sst_analysis.parallel import hop_histograms
+from sst_analysis.sampling import sample_hops
+from sst_analysis.schedules import schedule_hops
+from sst_analysis.topology import TorusModel
+from sst_analysis.torus import all_pairs_hop_histogram, root_hop_histogram
+
 # Torus hop distance calculation between routers
 def torus_distance(x1, y1, x2, y2, dim_x, dim_y):
     dx = min(abs(x1 - x2), dim_x - abs(x1 - x2))
@@ -22,15 +33,43 @@ def calculate_hop_count_torus(node_i, node_j, dim_x, dim_y, hosts_per_router):
     router_hops = torus_distance(x1, y1, x2, y2, dim_x, dim_y)
     return router_hops + 2  # +2 for NIC-router-NIC
 
-# Calculate average and detailed hop counts for a given job
-def calculate_job_hop_count(job, dim_x, dim_y, hosts_per_router):
+# Hop statistics of the messages of the job's collective algorithm: per message,
+# byte-weighted and per step (see schedules.schedule_hops)
+def schedule_hop_stats(job, model, nodes, allreduce_algorithm="binomial"):
+    algorithm = allreduce_algorithm if job["pattern"] == "Allreduce" else None
+    return schedule_hops(model, job, nodes, algorithm)
+
+# Calculate average and detailed hop counts for a given job, counting all pairs
+# for Allreduce/Alltoall and root -> others for Scatter/Bcast
+# method="routers" counts job members per router and builds the histogram from
+# router-pair multiplicities; method="pairs" enumerates every node pair;
+# method="sample" estimates both from random pairs stratified by router.
+# nodes is the job's rank -> node map (defaults to start..start+size).
+def calculate_job_hop_count(job, dim_x, dim_y, hosts_per_router, method="routers", nodes=None):
     start = job["start"]
     size = job["size"]
-    nodes = list(range(start, start + size))
+    pattern = job["pattern"]
+    if nodes is None:
+        nodes = range(start, start + size)
+
+    if method == "routers":
+        shape = (dim_x, dim_y)
+        if pattern in ["Scatter", "Bcast"]:
+            hop_counter = root_hop_histogram(nodes, nodes[0], shape, hosts_per_router)
+        else:
+            hop_counter = all_pairs_hop_histogram(nodes, shape, hosts_per_router)
+        return histogram_average(hop_counter), hop_counter
+
+    if method == "sample":
+        root = 0 if pattern in ["Scatter", "Bcast"] else None
+        estimate = sample_hops(TorusModel((dim_x, dim_y), hosts_per_router), nodes, root=root,
+                               strata="router", seed=0)
+        return estimate["avg_hops"], estimate["counts"]
+
+    nodes = [int(n) for n in nodes]
     total_hops = 0
     pair_count = 0
     hop_counter = Counter()
-    pattern = job["pattern"]
 
     if pattern in ["Scatter", "Bcast"]:
         root = nodes[0]
@@ -63,21 +102,61 @@ jobs = [
     {"size": 256, "start": 224, "pattern": "Bcast"}
 ]
 
+# Rank -> node placement, replaying system.allocateNodes() in job order.
+# "linear" gives the contiguous start..start+size ranges. torus.py uses unseeded
+# "random", which no replay reproduces; allocation.allocated_nodes("torus_stats.csv")
+# lists the nodes that run used.
+allocation_method = "linear"
+allocation_seed = None
+job_nodes = allocate(jobs, dim_x * dim_y * hosts_per_router, allocation_method, seed=allocation_seed)
+
+# Hop analysis: "schedule" routes the messages of each job's collective algorithm
+# (sst_analysis.schedules); "routers", "pairs" or "sample" count all pairs for
+# Allreduce/Alltoall and root -> others for Scatter/Bcast (calculate_job_hop_count);
+# "parallel" counts the same pairs for all jobs at once in hop_workers processes
+# (sst_analysis.parallel.hop_histograms; None uses all cores)
+hop_method = "schedule"
+hop_workers = None
+# Allreduce algorithm of the schedule analysis: "binomial" (ember's tree),
+# "recursive_doubling", "rabenseifner" or "ring". Alltoall is pairwise exchange,
+# Scatter/Bcast binomial trees from rank 0.
+allreduce_algorithm = "binomial"
+model = TorusModel((dim_x, dim_y), hosts_per_router)
+if hop_method == "parallel":
+    parallel_histograms = hop_histograms(model, jobs, job_nodes, workers=hop_workers)
+
 # Run and store outputs
 job_outputs = []
 print("Torus Hop Count Analysis Per Job:\n")
 for idx, job in enumerate(jobs):
-    avg_hops, hop_dist = calculate_job_hop_count(job, dim_x, dim_y, hosts_per_router)
+    if hop_method == "schedule":
+        stats = schedule_hop_stats(job, model, job_nodes[idx], allreduce_algorithm)
+        avg_hops, hop_dist = stats["avg_hops"], stats["message_histogram"]
+    elif hop_method == "parallel":
+        stats = None
+        hop_dist = parallel_histograms[idx]
+        avg_hops = histogram_average(hop_dist)
+    else:
+        stats = None
+        avg_hops, hop_dist = calculate_job_hop_count(job, dim_x, dim_y, hosts_per_router, method=hop_method,
+                                                     nodes=job_nodes[idx])
     breakdown = dict(sorted(hop_dist.items()))
     print(f"  Job {idx + 1}: {job['pattern']} (size={job['size']})")
     print(f"     Average Hop Count: {avg_hops:.2f}")
-    print(f"     Hop Count Breakdown: {breakdown}\n")
+    print(f"     Hop Count Breakdown: {breakdown}")
+    if stats is not None:
+        steps = ", ".join(f"{a:.2f}/{m}" for a, m in zip(stats["step_avg_hops"], stats["step_max_hops"]))
+        print(f"     Byte-Weighted Average Hop Count: {stats['byte_avg_hops']:.2f}")
+        print(f"     Bytes per Hop Count: {dict(sorted(stats['histogram'].items()))}")
+        print(f"     Per-Step Hops (byte-weighted avg/max): {steps}")
+    print()
 
     job_outputs.append({
         "job": idx + 1,
         "pattern": job["pattern"],
         "size": job["size"],
         "avg": avg_hops,
+        "byte_avg": stats["byte_avg_hops"] if stats is not None else avg_hops,
         "breakdown": breakdown
     })
 
@@ -85,7 +164,7 @@ for idx, job in enumerate(jobs):
 all_hop_types = sorted({hop for job in job_outputs for hop in job["breakdown"]})
 
 # CSV header
-header = ["Job ID", "Pattern", "Size", "Avg Hop Count"] + [str(hop) for hop in all_hop_types]
+header = ["Job ID", "Pattern", "Size", "Avg Hop Count", "Byte-Weighted Avg Hop Count"] + [str(hop) for hop in all_hop_types]
 
 # CSV rows
 rows = []
@@ -95,6 +174,7 @@ for job in job_outputs:
         job["pattern"],
         job["size"],
         round(job["avg"], 2),
+        round(job["byte_avg"], 2),
     ]
     for hop in all_hop_types:
         row.append(job["breakdown"].get(hop, ""))
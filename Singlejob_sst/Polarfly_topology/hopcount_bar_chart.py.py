@@ -1,6 +1,10 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from sst_analysis.statcsv import aggregate
 
 POLARFLY_CSV_PATH = "polarfly_stats.csv"
 
@@ -13,24 +17,21 @@ def plot_polarfly_hop_counts(csv_path):
         return
 
     try:
-        df_stats = pd.read_csv(csv_path)
-
-        # Strip whitespace from column names
-        df_stats.columns = df_stats.columns.str.strip()
-
-        # Filter for polarfly components and hopcount statistics
-        polarfly_hops = df_stats[
-            (df_stats['ComponentName'].str.startswith('polarfly_network.r')) &
-            (df_stats['ComponentName'].str.endswith(':topology')) &
-            (df_stats['StatisticName'].str.strip().str.startswith('hopcount'))
-        ]
-
-        aggregated_hops = polarfly_hops.groupby('StatisticName')['Sum.u32'].sum()
+        # Stream the file, keeping only polarfly router hopcount records
+        stats = aggregate(
+            csv_path,
+            by="StatisticName",
+            components="polarfly_network.r*:topology",
+            statistics="hopcount*",
+            fields=("Sum",),
+        )
+        aggregated_hops = pd.Series({name: int(entry["Sum"]) for name, entry in stats.items()}, dtype="int64")
 
         if aggregated_hops.empty or aggregated_hops.sum() == 0:
             print("No hop count statistics found or all aggregated hop counts are zero. Please check 'ComponentName' and 'StatisticName' filters, and the 'Sum.u32' column.", flush=True)
-            print("\nAvailable ComponentNames (after stripping):", df_stats['ComponentName'].unique(), flush=True)
-            print("Available StatisticNames (after stripping):", df_stats['StatisticName'].unique(), flush=True)
+            all_stats = aggregate(csv_path, by=("ComponentName", "StatisticName"), fields=())
+            print("\nAvailable ComponentNames:", sorted({c for c, _ in all_stats}), flush=True)
+            print("Available StatisticNames:", sorted({s for _, s in all_stats}), flush=True)
             print("Aggregated Hops (if any):", aggregated_hops, flush=True)
             return
 
@@ -62,11 +63,8 @@ def plot_polarfly_hop_counts(csv_path):
         plt.show()
         print(f"Plot saved as polarfly_hop_counts_bar_chart.png in {os.getcwd()}", flush=True)
 
-    except pd.errors.EmptyDataError:
-        print(f"Error: CSV file at {csv_path} is empty or malformed.", flush=True)
-    except KeyError as ke:
-        print(f"Error: Missing expected column in CSV: {ke}. Please check column names in the CSV.", flush=True)
-        print("Available columns:", df_stats.columns.tolist(), flush=True)
+    except ValueError as ve:
+        print(f"Error: CSV file at {csv_path} is empty or malformed: {ve}", flush=True)
     except Exception as e:
         print(f"An unexpected error occurred while plotting: {e}", flush=True)
         print("Please ensure the CSV file is correctly formatted and pandas/matplotlib are installed.", flush=True)
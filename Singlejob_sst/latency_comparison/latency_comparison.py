@@ -1,21 +1,47 @@
 import matplotlib.pyplot as plt
 import pandas as pd
 import os
+import sys
 
-# --- Manually collected data ---
-# Ensure these lists have the exact same number of elements.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from sst_analysis.loggp import predict_spec
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# --- Single-job configurations, as in ../*_topology/*_sst.py ---
+# Shared hr_router / NIC settings of the three SST scripts
+router = {"link_bw": "4GB/s", "flit_size": "8B", "xbar_bw": "6GB/s",
+          "input_latency": "20ns", "output_latency": "20ns"}
+
+configs = [
+    ('Mesh Allreduce (4 ranks)', {
+        "topology": {"type": "topoMesh", "shape": "2x2", "local_ports": 1, "link_latency": "20ns"},
+        "jobs": [{"size": 4, "start": 0, "pattern": "Allreduce", "params": "messageSize=1024"}]}),
+    ('PolarFly Allreduce (13 ranks)', {
+        "topology": {"type": "topoPolarFly", "hosts_per_router": 1, "link_latency": "20ns",
+                     "adjacency": os.path.join(here, "..", "Polarfly_topology", "polarfly_data", "PolarFly.q_3.txt")},
+        "jobs": [{"size": 13, "start": 0, "pattern": "Allreduce", "params": "messageSize=1024"}]}),
+    ('Dragonfly Allreduce (32 ranks)', {
+        "topology": {"type": "topoDragonFly", "hosts_per_router": 2, "routers_per_group": 4,
+                     "num_groups": 4, "intergroup_links": 2, "link_latency": "20ns"},
+        "jobs": [{"size": 32, "start": 0, "pattern": "Allreduce"}]}),
+]
+
+# --- Latencies SST measured for these runs, next to the analytical (LogGP) model ---
+# ember's Allreduce ignores messageSize and reduces one 8 B element in all three
+# runs. The model has no ember software overheads or contention, so it runs low.
 simulation_data = {
-    'Simulation Type': [
-        'Mesh Allreduce (4 ranks)',
-        'PolarFly Allreduce (13 ranks)',
-        'Dragonfly Allreduce (32 ranks)'
-    ],
+    'Simulation Type': [label for label, _ in configs],
     'Latency (us)': [
         2.074,  # For Mesh
         3.939,  # For PolarFly
         5.269   # For Dragonfly
-    ]
+    ],
+    'Predicted Latency (us)': [],
 }
+for label, config in configs:
+    config.update(router=router, nic2host_lat="100ns", allocation="linear")
+    simulation_data['Predicted Latency (us)'].append(predict_spec(config)[0])
 
 def plot_latency_comparison(data):
     """
@@ -27,9 +53,22 @@ def plot_latency_comparison(data):
     # --- End Debugging ---
 
     df = pd.DataFrame(data)
+    series = [c for c in df.columns if c != 'Simulation Type']
 
     plt.figure(figsize=(8, 7))
-    bars = plt.bar(df['Simulation Type'], df['Latency (us)'], color=['lightcoral', 'lightgreen', 'lightblue'])
+    if len(series) == 1:
+        bars = plt.bar(df['Simulation Type'], df[series[0]], color=['lightcoral', 'lightgreen', 'lightblue'])
+    else:
+        # Measured and predicted side by side for each simulation
+        width = 0.8 / len(series)
+        positions = range(len(df))
+        bars = []
+        for k, (column, color) in enumerate(zip(series, ['lightcoral', 'lightblue', 'lightgreen'])):
+            offset = (k - (len(series) - 1) / 2) * width
+            bars += plt.bar([p + offset for p in positions], df[column], width, color=color,
+                            label={'Latency (us)': 'SST'}.get(column, column.replace(' Latency (us)', '')))
+        plt.xticks(positions, df['Simulation Type'])
+        plt.legend()
     plt.xlabel("Simulation Type")
     plt.ylabel("Latency (microseconds)")
     plt.title("Latency Comparison Across Topologies")
@@ -47,4 +86,12 @@ def plot_latency_comparison(data):
 
 
 if __name__ == "__main__":
+    # With statistics files as arguments, plot their measured latencies instead,
+    # e.g. python latency_comparison.py ../*_topology/*.csv
+    if len(sys.argv) > 1:
+        from sst_analysis.latency import LatencyIndex, comparison_table
+        index = LatencyIndex(os.path.join(here, "latency_index.sqlite"))
+        summaries, _ = index.update(sys.argv[1:])
+        index.close()
+        simulation_data = comparison_table(summaries)
     plot_latency_comparison(simulation_data)
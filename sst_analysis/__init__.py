@@ -0,0 +1,7 @@
+"""
+Shared analysis helpers for the SST topology experiments in this repository.
+
+The per-topology scripts (Multijob_2/*/hopcount.py, ...) import from here so
+that large jobs can be evaluated with vectorized NumPy code instead of Python
+loops over every rank pair.
+"""
@@ -0,0 +1,205 @@
+"""
+Node allocation policies producing the rank -> node map of every job.
+
+The SST configs call system.allocateNodes(ep, method) once per job, in job
+order, against one shared list of free nodes. allocate() replays that sequence:
+
+    linear       next `size` free nodes (what the analysis scripts' start..start+size assume)
+    random       uniformly random free nodes; seeded runs are reproducible
+    interleaved  free nodes dealt round-robin to the jobs, one node at a time
+    block        like linear, but every job starts on a fresh block of `block_size`
+                 nodes (e.g. hosts_per_router or a dragonfly group)
+    curve        nodes ordered along a space-filling curve over router coordinates
+                 (Hilbert in 2D, Morton otherwise), then taken linearly
+
+Maps are int64 NumPy arrays, ready for the batch hop-count engines
+(sst_analysis.torus / polarfly take node arrays, mesh takes coordinates).
+Only "random" without a seed is non-reproducible.
+
+"random" gives the same distribution of placements as SST, not SST's
+placement. The configs in this repository call allocateNodes(ep, "random")
+without a seed. None of the seeded shuffle or sample replays tried (seeds
+0-2999, one seed or a reseed per job) reproduces the node sets of the
+shipped torus and dragonfly runs. allocated_nodes() reads the nodes a run
+actually used from its statistics file.
+"""
+import random
+import re
+
+import numpy as np
+
+from sst_analysis.statcsv import iter_chunks
+
+METHODS = ("linear", "random", "interleaved", "block", "curve")
+
+
+def _check_capacity(jobs, num_nodes):
+    total = sum(job["size"] for job in jobs)
+    if total > num_nodes:
+        raise ValueError(f"jobs need {total} nodes but the system has {num_nodes}")
+
+
+def _take_in_order(order, sizes):
+    bounds = np.cumsum([0] + list(sizes))
+    return [order[bounds[i]:bounds[i + 1]].copy() for i in range(len(sizes))]
+
+
+def allocate_linear(jobs, num_nodes):
+    _check_capacity(jobs, num_nodes)
+    return _take_in_order(np.arange(num_nodes, dtype=np.int64), [j["size"] for j in jobs])
+
+
+def allocate_random(jobs, num_nodes, seed=None, exact=False):
+    """
+    Random allocation: the jobs take consecutive slices of one NumPy
+    permutation of the nodes, in milliseconds even for 100k-node systems.
+
+    exact=True instead shuffles the remaining free list with Python's
+    `random` module for every job and takes the first `size` nodes, with
+    the generator seeded once. That is how merlin's allocator is believed
+    to work, but it has not been checked against pymerlin-base. It costs
+    one shuffle of the free list per job, about 0.4 s for 10 jobs on 100k
+    nodes.
+    """
+    _check_capacity(jobs, num_nodes)
+    if not exact:
+        order = np.random.default_rng(seed).permutation(num_nodes).astype(np.int64)
+        return _take_in_order(order, [j["size"] for j in jobs])
+    rng = random.Random(seed)
+    available = list(range(num_nodes))
+    maps = []
+    for job in jobs:
+        rng.shuffle(available)
+        maps.append(np.array(available[:job["size"]], dtype=np.int64))
+        available = available[job["size"]:]
+    return maps
+
+
+def allocated_nodes(stats_path):
+    """
+    Sorted int64 array of the nodes that hosted a rank in an SST run, from
+    the NIC components ("nic<node>:...") of its statistics file. It needs
+    the linkcontrol statistics; unallocated nodes appear as "empty_node_<node>".
+    """
+    pattern = re.compile(r"nic(\d+):")
+    nodes = set()
+    for chunk in iter_chunks(stats_path, components="nic*", fields=()):
+        nodes.update(int(m.group(1)) for m in map(pattern.match, chunk["ComponentName"]) if m)
+    return np.array(sorted(nodes), dtype=np.int64)
+
+
+def allocate_interleaved(jobs, num_nodes):
+    """
+    Deal nodes 0, 1, 2, ... round-robin to the jobs still needing nodes.
+    """
+    _check_capacity(jobs, num_nodes)
+    sizes = np.array([j["size"] for j in jobs], dtype=np.int64)
+    # Round r gives one node to every job with size > r
+    rounds = np.arange(sizes.max(initial=0))
+    active = sizes[None, :] > rounds[:, None]
+    owner = np.nonzero(active)[1]
+    # Node id = dealing position; group the positions by owning job
+    nodes = np.argsort(owner, kind="stable").astype(np.int64)
+    bounds = np.cumsum(np.concatenate([[0], sizes]))
+    return [nodes[bounds[i]:bounds[i + 1]] for i in range(sizes.size)]
+
+
+def allocate_block(jobs, num_nodes, block_size):
+    """
+    Linear allocation where every job starts at a multiple of block_size.
+    """
+    maps = []
+    start = 0
+    for job in jobs:
+        start = -(-start // block_size) * block_size
+        if start + job["size"] > num_nodes:
+            raise ValueError(f"block allocation needs more than {num_nodes} nodes")
+        maps.append(np.arange(start, start + job["size"], dtype=np.int64))
+        start += job["size"]
+    return maps
+
+
+def hilbert_index(x, y, order):
+    """
+    Position along a 2D Hilbert curve of side 2**order, vectorized.
+    """
+    x = np.asarray(x, dtype=np.int64).copy()
+    y = np.asarray(y, dtype=np.int64).copy()
+    d = np.zeros_like(x)
+    s = 1 << (order - 1) if order > 0 else 0
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant so the sub-curve has the standard orientation
+        flip = ~ry & rx
+        x = np.where(flip, s - 1 - x, x)
+        y = np.where(flip, s - 1 - y, y)
+        swap = ~ry
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        s >>= 1
+    return d
+
+
+def morton_index(coords, bits):
+    """
+    Z-order index interleaving the bits of N coordinate arrays.
+    """
+    coords = [np.asarray(c, dtype=np.int64) for c in coords]
+    d = np.zeros_like(coords[0])
+    for b in range(bits):
+        for axis, c in enumerate(coords):
+            d |= ((c >> b) & 1) << (b * len(coords) + axis)
+    return d
+
+
+def curve_order(shape, hosts_per_router=1, curve="hilbert"):
+    """
+    Node ids ordered along a space-filling curve over the router grid
+    (router = x + dim_x * y + ..., node = router * hosts_per_router + host).
+    """
+    shape = tuple(shape)
+    routers = np.arange(int(np.prod(shape)), dtype=np.int64)
+    coords = np.unravel_index(routers, shape, order="F")
+    bits = max(1, int(np.ceil(np.log2(max(shape)))))
+    if curve == "hilbert" and len(shape) == 2:
+        key = hilbert_index(coords[0], coords[1], bits)
+    else:
+        key = morton_index(coords, bits)
+    router_order = routers[np.argsort(key, kind="stable")]
+    hosts = np.arange(hosts_per_router, dtype=np.int64)
+    return (router_order[:, None] * hosts_per_router + hosts[None, :]).ravel()
+
+
+def allocate_curve(jobs, shape, hosts_per_router=1, curve="hilbert"):
+    order = curve_order(shape, hosts_per_router, curve)
+    _check_capacity(jobs, order.size)
+    return _take_in_order(order, [j["size"] for j in jobs])
+
+
+def allocate(jobs, num_nodes, method="linear", seed=None, block_size=None, shape=None,
+             hosts_per_router=1, curve="hilbert", exact=False):
+    """
+    Rank -> node map (int64 array) of every job, allocated in job order.
+
+    `shape` and `hosts_per_router` are needed by "curve" (num_nodes must match
+    prod(shape) * hosts_per_router); `block_size` by "block"; `exact` only
+    affects "random" (see allocate_random).
+    """
+    if method == "linear":
+        return allocate_linear(jobs, num_nodes)
+    if method == "random":
+        return allocate_random(jobs, num_nodes, seed, exact)
+    if method == "interleaved":
+        return allocate_interleaved(jobs, num_nodes)
+    if method == "block":
+        if not block_size:
+            raise ValueError("block allocation needs block_size")
+        return allocate_block(jobs, num_nodes, block_size)
+    if method == "curve":
+        if shape is None:
+            raise ValueError("curve allocation needs the router grid shape")
+        if int(np.prod(shape)) * hosts_per_router != num_nodes:
+            raise ValueError(f"shape {shape} x {hosts_per_router} hosts does not match {num_nodes} nodes")
+        return allocate_curve(jobs, shape, hosts_per_router, curve)
+    raise ValueError(f"unknown allocation method {method!r}; expected one of {METHODS}")
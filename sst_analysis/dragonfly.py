@@ -0,0 +1,171 @@
+"""
+Hop histograms for merlin dragonflies, using the exact global wiring of
+topology.DragonflyModel.
+
+Job members are counted per (group, router), and histograms follow from
+occupancy products instead of node pairs:
+
+    method="groups"   (minimal routing) one closed-form step per pair of
+                      occupied groups. With A and B the members on the
+                      gateway routers of the two groups towards each other,
+                      D the member pairs on the two ends of one global link
+                      and Ca, Cb the group totals, the group pair has D pairs
+                      at 1 router hop, A*Cb + Ca*B - A*B - D at 2 and the rest
+                      at 3. Cost O(occupied_groups**2 * intergroup_links).
+    method="routers"  occupied router pairs weighted by occupancy products,
+                      O(occupied_routers**2); used for Valiant routing.
+
+Both match per-pair enumeration exactly. Pair blocks are bounded by
+`block_pairs` to limit memory.
+
+routing="minimal" uses merlin's minimal local-global-local route.
+routing="valiant" spreads every inter-group pair evenly over the Valiant
+routes through all other groups, so its histogram has fractional counts
+(summing to the number of pairs).
+"""
+from collections import Counter
+
+import numpy as np
+
+from sst_analysis.hops import ENDPOINT_HOPS
+
+
+def router_occupancy(nodes, hosts_per_router):
+    """
+    (routers, counts): the occupied routers of a job and its members on each.
+    """
+    routers = np.asarray(nodes, dtype=np.int64) // hosts_per_router
+    return np.unique(routers, return_counts=True)
+
+
+def _hop_counter(model, ra, rb, weights, routing, endpoint_hops):
+    # Histogram of router-pair hops weighted by pair multiplicity
+    ra, rb, weights = np.broadcast_arrays(ra, rb, weights)
+    if routing == "minimal":
+        parts = [(model.router_distance(ra, rb), weights)]
+    elif routing == "valiant":
+        # Every intermediate group other than the two end groups is equally likely
+        ga = ra // model.routers_per_group
+        gb = rb // model.routers_per_group
+        inter = ga != gb
+        share = weights / max(model.num_groups - 2, 1)
+        parts = [(model.router_distance(ra, rb), np.where(inter, 0, weights))]
+        for mid in range(model.num_groups):
+            valid = inter & (ga != mid) & (gb != mid)
+            parts.append((model.valiant_router_distance(ra, rb, mid), np.where(valid, share, 0)))
+    else:
+        raise ValueError(f"unknown routing {routing!r}")
+
+    hist = Counter()
+    for hops, w in parts:
+        sums = np.bincount(hops.ravel(), weights=w.ravel())
+        for d, c in enumerate(sums):
+            if c > 0:
+                hist[d + endpoint_hops] += int(round(c)) if routing == "minimal" else float(c)
+    return hist
+
+
+def group_occupancy(nodes, model):
+    """
+    (groups, occupancy): the occupied groups of a job and a
+    (len(groups), routers_per_group) array of members per router.
+    """
+    routers = np.asarray(nodes, dtype=np.int64) // model.hosts_per_router
+    rpg = model.routers_per_group
+    groups, index = np.unique(routers // rpg, return_inverse=True)
+    occupancy = np.zeros((groups.size, rpg), dtype=np.int64)
+    np.add.at(occupancy, (index.ravel(), routers % rpg), 1)
+    return groups, occupancy
+
+
+def _first_occurrence(*keys):
+    # Mask of entries along the last axis not equal (in all keys) to an earlier entry
+    links = keys[0].shape[-1]
+    first = np.ones(keys[0].shape, dtype=bool)
+    for k in range(1, links):
+        for j in range(k):
+            same = np.ones(keys[0].shape[:-1], dtype=bool)
+            for key in keys:
+                same &= key[..., k] == key[..., j]
+            first[..., k] &= ~same
+    return first
+
+
+def _group_pair_hist(model, groups, occupancy, block_pairs):
+    # Router-hop bincount (0..3) of all ordered member pairs, i != j
+    totals = occupancy.sum(axis=1)
+    hist = np.zeros(4, dtype=np.int64)
+    hist[0] = int((occupancy * (occupancy - 1)).sum())
+    hist[1] = int((totals ** 2 - (occupancy ** 2).sum(axis=1)).sum())
+
+    table = model.gateway_slots()
+    ports = model.global_ports
+    rows = max(1, block_pairs // (groups.size * model.intergroup_links))
+    cols = np.arange(groups.size)
+    for lo in range(0, groups.size, rows):
+        ia = np.arange(lo, min(lo + rows, groups.size))
+        ga, gb = groups[ia, None], groups[None, :]
+        out_local = table[ga, gb] // ports
+        in_local = table[gb, ga] // ports
+        a_members = occupancy[ia[:, None, None], out_local]
+        b_members = occupancy[cols[None, :, None], in_local]
+        # Several parallel links may share a gateway router or a router pair
+        gateway_a = (a_members * _first_occurrence(out_local)).sum(axis=-1)
+        gateway_b = (b_members * _first_occurrence(in_local)).sum(axis=-1)
+        direct = (a_members * b_members * _first_occurrence(out_local, in_local)).sum(axis=-1)
+
+        ca, cb = totals[ia, None], totals[None, :]
+        either = gateway_a * cb + ca * gateway_b - gateway_a * gateway_b
+        inter = ga != gb
+        hist[1] += int(direct[inter].sum())
+        hist[2] += int((either - direct)[inter].sum())
+        hist[3] += int((ca * cb - either)[inter].sum())
+    return hist
+
+
+def all_pairs_hop_histogram(nodes, model, routing="minimal", endpoint_hops=ENDPOINT_HOPS,
+                            block_pairs=1 << 22, method=None):
+    """
+    Counter of hop count -> number of ordered node pairs (i != j) of a job.
+
+    method defaults to "groups" for minimal and "routers" for Valiant routing.
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    if nodes.size < 2:
+        return Counter()
+    if method is None:
+        method = "groups" if routing == "minimal" else "routers"
+    if method == "groups":
+        if routing != "minimal":
+            raise ValueError("group aggregation is only available for minimal routing")
+        groups, occupancy = group_occupancy(nodes, model)
+        hist = _group_pair_hist(model, groups, occupancy, block_pairs)
+        return Counter({d + endpoint_hops: int(c) for d, c in enumerate(hist) if c > 0})
+
+    routers, counts = router_occupancy(nodes, model.hosts_per_router)
+    hist = Counter()
+    # Members sharing a router: c * (c - 1) ordered pairs at 0 router hops
+    same = int((counts * (counts - 1)).sum())
+    if same:
+        hist[endpoint_hops] += same
+
+    rows = max(1, block_pairs // routers.size)
+    for lo in range(0, routers.size, rows):
+        ra = routers[lo:lo + rows, None]
+        weights = counts[lo:lo + rows, None] * counts[None, :]
+        weights = np.where(ra == routers[None, :], 0, weights)
+        hist.update(_hop_counter(model, ra, routers[None, :], weights, routing, endpoint_hops))
+    return hist
+
+
+def root_hop_histogram(nodes, root, model, routing="minimal", endpoint_hops=ENDPOINT_HOPS):
+    """
+    Counter of hop count -> number of nodes reached from root (root excluded).
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    others = nodes[nodes != root]
+    if others.size == 0:
+        return Counter()
+    routers, counts = router_occupancy(others, model.hosts_per_router)
+    return _hop_counter(model, np.full(routers.size, root // model.hosts_per_router), routers, counts,
+                        routing, endpoint_hops)
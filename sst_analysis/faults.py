@@ -0,0 +1,422 @@
+"""
+Hop impact of failed links and routers, with the all-pairs router distance
+table maintained incrementally.
+
+A DegradedTopology holds the router graph of a topology model and its
+all-pairs shortest-path table. The graph comes from PolarFly's adjacency, or
+from the directed links of linkload.link_endpoints() for mesh, torus and
+dragonfly, so merlin's parallel links count as separate links. Links and
+routers can be failed and restored in any order:
+
+    fail      Distances only grow. A pair (s, t) can change only if every
+              shortest s -> t path crossed a removed element, i.e.
+              D[s, a] + 1 + D[b, t] == D[s, t] for a removed link (a, b), or
+              D[s, r] + D[r, t] == D[s, t] for a removed router r. Only rows
+              of sources with such a pair are touched. Their candidate
+              cells are recomputed level by level: a cell gets distance L
+              when a live neighbour of t is at L - 1 from s. Pairs left
+              without such a neighbour are disconnected (UNREACHABLE).
+    restore   A link (a, b) gives D = min(D, D[:, a] + 1 + D[b, :], ...). A
+              router gets its row from its live neighbours, then D =
+              min(D, D[:, r] + D[r, :]).
+
+Every update returns a change record (the changed cells with their old and
+new distances) that undo() reverts, so sweeps fail and restore each element
+in turn without rebuilding the table. Diameter, disconnected pairs and job
+hop histograms are updated from the changed cells alone.
+
+Distances are shortest paths in the router graph. For the mesh, the torus
+and PolarFly that is what minimal routing uses. For the dragonfly a few
+pairs may have a path through a third group that is shorter than merlin's
+local-global-local route; degraded routing would have to find such paths too.
+
+    python -m sst_analysis.faults spec.json --sweep-links
+"""
+import argparse
+import json
+import time
+from collections import Counter
+
+import numpy as np
+
+from sst_analysis.hops import ENDPOINT_HOPS, histogram_average
+from sst_analysis.jobs import ROOT_PATTERNS, job_root
+from sst_analysis.linkload import link_endpoints, num_links
+from sst_analysis.polarfly import UNREACHABLE, all_pairs_distances
+from sst_analysis.topology import DistanceMatrixModel, model_from_topology
+
+
+def router_graph(model):
+    """
+    (neighbours, multiplicity): (num_routers, max_degree) table of distinct
+    neighbours padded with num_routers, and the number of links to each.
+    """
+    n = model.num_routers
+    if isinstance(model, DistanceMatrixModel):
+        indptr, indices = model.adjacency
+        src = np.repeat(np.arange(n), np.diff(indptr))
+        dst = np.asarray(indices, dtype=np.int64)
+    else:
+        _, src, dst = link_endpoints(model, np.arange(num_links(model)))
+    keep = (dst >= 0) & (src != dst)
+    keys, counts = np.unique(src[keep] * n + dst[keep], return_counts=True)
+    src, dst = keys // n, keys % n
+    degree = np.bincount(src, minlength=n)
+    slots = np.arange(src.size) - np.repeat(np.cumsum(degree) - degree, degree)
+    neighbours = np.full((n, int(degree.max(initial=0))), n, dtype=np.int64)
+    multiplicity = np.zeros(neighbours.shape, dtype=np.int64)
+    neighbours[src, slots] = dst
+    multiplicity[src, slots] = counts
+    return neighbours, multiplicity
+
+
+class DegradedTopology:
+    """
+    Router graph of a topology model with failed links and routers, and its
+    incrementally maintained all-pairs distance table `dist` (uint8).
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.neighbours, self.links = router_graph(model)
+        n = model.num_routers
+        self.alive = np.ones(n, dtype=bool)
+        if isinstance(model, DistanceMatrixModel):
+            self.dist = np.array(model.dist, dtype=np.uint8)
+        else:
+            live = self.neighbours < n
+            indptr = np.concatenate([[0], np.cumsum(live.sum(axis=1))])
+            self.dist = all_pairs_distances(indptr, self.neighbours[live])
+
+    @property
+    def num_routers(self):
+        return self.alive.size
+
+    def _slot(self, a, b):
+        slot = np.flatnonzero(self.neighbours[a] == b)
+        if not slot.size:
+            raise ValueError(f"no link between routers {a} and {b}")
+        return int(slot[0])
+
+    def _live_slots(self, rows):
+        # Live links of the given routers, as a mask over their neighbour slots
+        padded = np.append(self.alive, False)
+        return (self.links[rows] > 0) & padded[self.neighbours[rows]] & self.alive[rows, None]
+
+    def edges(self):
+        """
+        (a, b) arrays of the distinct router pairs with live links, a < b.
+        """
+        a, slot = np.nonzero(self._live_slots(np.arange(self.num_routers)))
+        b = self.neighbours[a, slot]
+        keep = a < b
+        return a[keep], b[keep]
+
+    def _record(self, rows, before, after, state):
+        # Write the changed cells and return them with the previous element state
+        changed = before != after
+        r, c = np.nonzero(changed)
+        rows = np.asarray(rows, dtype=np.int64)[r]
+        change = {"rows": rows, "cols": c, "old": before[changed], "new": after[changed], "state": state}
+        self.dist[rows, c] = change["new"]
+        return change
+
+    def _state(self):
+        return self.alive.copy(), self.links.copy()
+
+    def undo(self, change):
+        """
+        Revert a change record (the last one applied, or changes in reverse order).
+        """
+        self.dist[change["rows"], change["cols"]] = change["old"]
+        self.alive, self.links = (a.copy() for a in change["state"])
+
+    def fail_links(self, pairs):
+        """
+        Fail one link between each (a, b) router pair (one of merlin's
+        parallel links). Returns the change record.
+        """
+        state = self._state()
+        ends = []
+        for a, b in pairs:
+            a, b = int(a), int(b)
+            sa, sb = self._slot(a, b), self._slot(b, a)
+            if self.links[a, sa] == 0:
+                raise ValueError(f"link {a}-{b} has already failed")
+            self.links[a, sa] -= 1
+            self.links[b, sb] -= 1
+            if self.links[a, sa] == 0 and self.alive[a] and self.alive[b]:
+                ends.append((a, b))
+        if not ends:
+            empty = np.zeros((0, self.num_routers), dtype=np.uint8)
+            return self._record([], empty, empty, state)
+        a, b = (np.array(v, dtype=np.int64) for v in zip(*ends))
+        d = self.dist.astype(np.int16)
+        # Sources with a removed link on some shortest path
+        uses = (np.abs(d[:, a] - d[:, b]) == 1) & (np.minimum(d[:, a], d[:, b]) < UNREACHABLE)
+        rows = np.flatnonzero(uses.any(axis=1))
+        sub = d[rows]
+        candidate = np.zeros(sub.shape, dtype=bool)
+        for x, y in ((a, b), (b, a)):
+            for k in range(x.size):
+                candidate |= (sub[:, x[k], None] + 1 + d[y[k], None, :] == sub) & (sub < UNREACHABLE)
+        return self._record(rows, self.dist[rows], self._repair(sub, candidate), state)
+
+    def fail_routers(self, routers):
+        """
+        Fail routers with all their links. Returns the change record.
+        """
+        state = self._state()
+        routers = np.unique(np.asarray(routers, dtype=np.int64))
+        if not self.alive[routers].all():
+            raise ValueError(f"routers {routers[~self.alive[routers]].tolist()} have already failed")
+        self.alive[routers] = False
+        d = self.dist.astype(np.int16)
+        rows = np.flatnonzero(self.alive)
+        sub = d[rows]
+        candidate = np.zeros(sub.shape, dtype=bool)
+        for r in routers:
+            candidate |= (sub[:, r, None] + d[r, None, :] == sub) & (sub < UNREACHABLE)
+        after = self._repair(sub, candidate)
+        after[:, routers] = UNREACHABLE
+        # The failed routers lose their own rows too
+        rows = np.concatenate([rows, routers])
+        after = np.concatenate([after, np.full((routers.size, self.num_routers), UNREACHABLE, dtype=np.uint8)])
+        return self._record(rows, self.dist[rows], after, state)
+
+    def _repair(self, sub, candidate):
+        # Recompute the candidate cells of the source rows `sub` (int16), level by level
+        n = self.num_routers
+        if not candidate.any():
+            return sub.astype(np.uint8)
+        i, t = np.nonzero(candidate)
+        level = int(sub[i, t].min())
+        padded = np.concatenate([sub, np.full((sub.shape[0], 1), -1, dtype=sub.dtype)], axis=1)
+        padded[i, t] = -1
+        live = self._live_slots(np.arange(n))
+        # Past the largest finite distance in these rows no cell can be reached any more
+        limit = int(padded[padded < UNREACHABLE].max(initial=0)) + 1
+        while i.size and level <= limit:
+            near = (padded[i[:, None], self.neighbours[t]] == level - 1) & live[t]
+            hit = near.any(axis=1)
+            padded[i[hit], t[hit]] = level
+            if hit.any():
+                limit = max(limit, level + 1)
+            i, t = i[~hit], t[~hit]
+            level += 1
+        padded[i, t] = UNREACHABLE
+        return padded[:, :n].astype(np.uint8)
+
+    def restore_links(self, pairs):
+        """
+        Restore one failed link between each (a, b) router pair. Returns the
+        change record.
+        """
+        state = self._state()
+        before = self.dist.copy()
+        d = self.dist.copy()
+        for a, b in pairs:
+            a, b = int(a), int(b)
+            sa, sb = self._slot(a, b), self._slot(b, a)
+            self.links[a, sa] += 1
+            self.links[b, sb] += 1
+            if self.links[a, sa] == 1 and self.alive[a] and self.alive[b]:
+                via = np.minimum(_min_plus(d[:, a, None], _min_plus(d[None, b, :], 1)),
+                                 _min_plus(d[:, b, None], _min_plus(d[None, a, :], 1)))
+                d = np.minimum(d, via).astype(np.uint8)
+        return self._record(np.arange(self.num_routers), before, d, state)
+
+    def restore_routers(self, routers):
+        """
+        Restore failed routers and their live links. Returns the change record.
+        """
+        state = self._state()
+        before = self.dist.copy()
+        d = self.dist.copy()
+        for r in np.unique(np.asarray(routers, dtype=np.int64)):
+            if self.alive[r]:
+                raise ValueError(f"router {r} has not failed")
+            self.alive[r] = True
+            near = self.neighbours[r, self._live_slots(np.array([r]))[0]]
+            row = (_min_plus(d[near], 1).min(axis=0) if near.size
+                   else np.full(self.num_routers, UNREACHABLE)).astype(np.uint8)
+            row[r] = 0
+            d[r] = row
+            d[:, r] = row
+            d = np.minimum(d, _min_plus(d[:, r, None], d[None, r, :])).astype(np.uint8)
+        return self._record(np.arange(self.num_routers), before, d, state)
+
+    def diameter(self):
+        """
+        Largest finite distance between live routers.
+        """
+        live = self.dist[np.ix_(self.alive, self.alive)]
+        return int(live[live < UNREACHABLE].max(initial=0))
+
+    def disconnected_pairs(self):
+        """
+        Ordered pairs of live routers with no path between them.
+        """
+        return int(np.count_nonzero(self.dist[np.ix_(self.alive, self.alive)] >= UNREACHABLE))
+
+    def job_histograms(self, jobs, maps):
+        """
+        Per job, (hop Counter over its connected pairs, disconnected pairs).
+        Scatter and Bcast count arg.root -> every other rank, other patterns
+        every ordered pair of distinct ranks.
+        """
+        result = []
+        for job, nodes in zip(jobs, maps):
+            weights = _job_weights(self.model, job, nodes, self.num_routers)
+            if isinstance(weights, tuple):
+                root, mult = weights
+                hops = self.dist[root]
+                hist = np.bincount(hops, weights=mult, minlength=UNREACHABLE + 1)
+            else:
+                occupied = np.flatnonzero(weights)
+                mult = weights[occupied]
+                sub = self.dist[np.ix_(occupied, occupied)]
+                hist = np.bincount(sub.ravel(), weights=np.outer(mult, mult).ravel(), minlength=UNREACHABLE + 1)
+                np.subtract.at(hist, self.dist[occupied, occupied], mult)
+            hist = np.rint(hist).astype(np.int64)
+            result.append((Counter({d + ENDPOINT_HOPS: int(c) for d, c in enumerate(hist[:UNREACHABLE]) if c > 0}),
+                           int(hist[UNREACHABLE])))
+        return result
+
+
+def _job_weights(model, job, nodes, num_routers):
+    # Members per router (all pairs), or (root router, members per router less the root) for root patterns
+    nodes = np.asarray(nodes, dtype=np.int64)
+    mult = np.bincount(model.router_of(nodes), minlength=num_routers).astype(np.float64)
+    if job["pattern"] in ROOT_PATTERNS:
+        root = int(model.router_of(nodes[job_root(job)]))
+        mult[root] -= 1
+        return root, mult
+    return mult
+
+
+def _min_plus(a, b):
+    # a + b with UNREACHABLE absorbing
+    a = np.asarray(a).astype(np.int16)
+    b = np.asarray(b).astype(np.int16)
+    return np.where((a >= UNREACHABLE) | (b >= UNREACHABLE), UNREACHABLE, np.minimum(a + b, UNREACHABLE))
+
+
+def change_impact(change, job_weights):
+    """
+    Per-job (hop total delta, connected pair delta, disconnected pair delta)
+    arrays of a change record, for job_weights from _job_weights() of each job.
+    """
+    rows, cols, old, new = change["rows"], change["cols"], change["old"], change["new"]
+    num = len(job_weights)
+    total, connected, lost = np.zeros(num), np.zeros(num), np.zeros(num)
+    for idx, weights in enumerate(job_weights):
+        if isinstance(weights, tuple):
+            root, mult = weights
+            w = np.where(rows == root, mult[cols], 0.0)
+        else:
+            w = weights[rows] * weights[cols] - np.where(rows == cols, weights[rows], 0.0)
+        was, now = old < UNREACHABLE, new < UNREACHABLE
+        total[idx] = np.dot(w, np.where(now, new + ENDPOINT_HOPS, 0)) - np.dot(w, np.where(was, old + ENDPOINT_HOPS, 0))
+        connected[idx] = w[now].sum() - w[was].sum()
+        lost[idx] = w[~now].sum() - w[~was].sum()
+    return total, connected, lost
+
+
+def sweep_link_failures(topo, jobs=(), maps=(), pairs=None):
+    """
+    Fail every link (one per router pair, or the given pairs) on its own and
+    undo it. Returns one dict per link with "link" (a, b), "changed_pairs",
+    "diameter", "disconnected_pairs" and per job "avg_hops" and
+    "disconnected".
+    """
+    if pairs is None:
+        pairs = list(zip(*topo.edges()))
+    base_diameter = topo.diameter()
+    base_disconnected = topo.disconnected_pairs()
+    weights = [_job_weights(topo.model, job, nodes, topo.num_routers) for job, nodes in zip(jobs, maps)]
+    base = topo.job_histograms(jobs, maps)
+    base_total = np.array([sum(h * c for h, c in hist.items()) for hist, _ in base], dtype=np.float64)
+    base_pairs = np.array([sum(hist.values()) for hist, _ in base], dtype=np.float64)
+    base_lost = np.array([lost for _, lost in base], dtype=np.float64)
+
+    results = []
+    for a, b in pairs:
+        change = topo.fail_links([(a, b)])
+        new = change["new"]
+        finite = new[new < UNREACHABLE]
+        total, connected, lost = change_impact(change, weights)
+        reachable = base_pairs + connected
+        results.append({
+            "link": (int(a), int(b)),
+            "changed_pairs": int(new.size),
+            "diameter": max(base_diameter, int(finite.max(initial=0))),
+            "disconnected_pairs": base_disconnected + int(np.count_nonzero(new >= UNREACHABLE))
+                                  - int(np.count_nonzero(change["old"] >= UNREACHABLE)),
+            "avg_hops": np.divide(base_total + total, reachable, out=np.zeros(len(weights)),
+                                  where=reachable > 0).tolist(),
+            "disconnected": (base_lost + lost).astype(np.int64).tolist(),
+        })
+        topo.undo(change)
+    return results
+
+
+def _parse_pair(text):
+    a, b = text.split("-")
+    return int(a), int(b)
+
+
+def _print_jobs(jobs, histograms, label):
+    for idx, (job, (hist, lost)) in enumerate(zip(jobs, histograms)):
+        print(f"  {label} Job {idx + 1}: {job['pattern']} (size={job['size']})  "
+              f"Average Hop Count: {histogram_average(hist):.3f}  disconnected pairs: {lost}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hop impact of failed links and routers")
+    parser.add_argument("spec", help="spec with 'topology' and 'jobs' (sweep format)")
+    parser.add_argument("--fail-routers", type=int, nargs="*", default=[], help="router ids to fail")
+    parser.add_argument("--fail-links", type=_parse_pair, nargs="*", default=[], help="router pairs a-b to fail")
+    parser.add_argument("--sweep-links", action="store_true", help="fail every link on its own")
+    parser.add_argument("--top", type=int, default=10, help="worst links to print with --sweep-links")
+    parser.add_argument("--seed", type=int, default=None, help="seed for random allocation")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    model = model_from_topology(spec["topology"])
+    jobs = spec.get("jobs", [])
+    if jobs:
+        from sst_analysis.allocation import allocate
+        maps = allocate(jobs, model.num_nodes, spec.get("allocation", "linear"), seed=args.seed)
+    else:
+        maps = []
+
+    started = time.perf_counter()
+    topo = DegradedTopology(model)
+    print(f"{model.num_routers} routers, {topo.edges()[0].size} router pairs with links, "
+          f"diameter {topo.diameter()}  ({time.perf_counter() - started:.2f} s)")
+    _print_jobs(jobs, topo.job_histograms(jobs, maps), "intact")
+
+    if args.fail_routers or args.fail_links:
+        started = time.perf_counter()
+        changed = 0
+        if args.fail_routers:
+            changed += topo.fail_routers(args.fail_routers)["new"].size
+        if args.fail_links:
+            changed += topo.fail_links(args.fail_links)["new"].size
+        print(f"Failed {len(args.fail_routers)} routers and {len(args.fail_links)} links: {changed} distances "
+              f"changed, diameter {topo.diameter()}, {topo.disconnected_pairs()} disconnected router pairs  "
+              f"({(time.perf_counter() - started) * 1e3:.1f} ms)")
+        _print_jobs(jobs, topo.job_histograms(jobs, maps), "degraded")
+
+    if args.sweep_links:
+        started = time.perf_counter()
+        results = sweep_link_failures(topo, jobs, maps)
+        print(f"Swept {len(results)} link failures in {time.perf_counter() - started:.1f} s")
+        results.sort(key=lambda r: (r["disconnected_pairs"], r["diameter"], max(r["avg_hops"], default=0.0)),
+                     reverse=True)
+        for r in results[:args.top]:
+            hops = "  ".join(f"{h:.3f}" for h in r["avg_hops"])
+            print(f"  link {r['link'][0]}-{r['link'][1]}: {r['changed_pairs']} distances changed, "
+                  f"diameter {r['diameter']}, {r['disconnected_pairs']} disconnected  job hops {hops}")
@@ -0,0 +1,226 @@
+"""
+Flow-level network simulation with max-min fair bandwidth sharing.
+
+A fast surrogate for full SST runs: every communicating pair of every job is
+one flow carrying its bytes over all iterations (traffic.placed_traffic), routed
+over linkload.route_incidence. All jobs start at time 0. A flow uses
+
+    its NIC injection link      capacity nic link_bw
+    every router-to-router link capacity min(router link_bw, xbar_bw)
+    its NIC ejection link       capacity min(nic link_bw, xbar_bw)
+
+Rates are the max-min fair allocation over these links, computed by
+progressive filling: the link with the smallest fair share (remaining
+capacity / unfrozen flows) fixes the rate of all its flows, which are then
+removed, until every flow has a rate.
+
+The simulation is event driven. It advances to the next flow completion,
+removes the finished flows and re-solves only the flows connected to them
+through shared links (transitively). Max-min allocations decompose over
+these connected components, so all other flows keep their rates exactly.
+
+A job completes when its last flow does, plus arg.iterations * arg.compute
+of compute time. Link and NIC latencies are not modelled, so times are
+bandwidth bound.
+"""
+import argparse
+import json
+
+import numpy as np
+
+from sst_analysis.jobs import compute_time, iterations
+from sst_analysis.linkload import num_links, route_incidence
+from sst_analysis.sweep import parse_bandwidth
+from sst_analysis.topology import model_from_topology
+from sst_analysis.traffic import placed_traffic
+
+
+def _gather(indptr, indices, items):
+    # Concatenated CSR rows of `items`
+    starts = indptr[items]
+    counts = indptr[items + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return indices[offsets + np.arange(offsets.size)], counts
+
+
+def _distinct(items, size):
+    # Unique entries of an id array (ids < size), without sorting
+    last = np.empty(size, dtype=np.int64)
+    positions = np.arange(items.size)
+    last[items] = positions
+    return items[last[items] == positions]
+
+
+def _csr(rows, cols, num_rows):
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+    return indptr, cols[order]
+
+
+def max_min_rates(flows, flow_ptr, flow_links, link_ptr, link_flows, capacity, rtol=1e-9):
+    """
+    Max-min fair rates of `flows` (flow ids into the flow -> link and
+    link -> flow CSRs), given that no other flow uses their links.
+
+    Each round freezes the flows of the links with the smallest fair share,
+    found through the link -> flow lists, so a solve costs the incidences of
+    `flows` plus one pass over the still open links per round.
+    """
+    member = np.zeros(flow_ptr.size - 1, dtype=bool)
+    member[flows] = True
+    rates = np.zeros(flow_ptr.size - 1)
+    links, _ = _gather(flow_ptr, flow_links, flows)
+    active = np.bincount(links, minlength=capacity.size)
+    remaining = capacity.astype(np.float64)
+    open_links = np.flatnonzero(active)
+    while open_links.size:
+        share = remaining[open_links] / active[open_links]
+        level = share.min()
+        tight = open_links[share <= level * (1 + rtol)]
+        frozen, _ = _gather(link_ptr, link_flows, tight)
+        frozen = _distinct(frozen[member[frozen]], member.size)
+        member[frozen] = False
+        rates[frozen] = level
+        released = np.bincount(_gather(flow_ptr, flow_links, frozen)[0], minlength=capacity.size)
+        remaining -= released * level
+        active -= released
+        open_links = open_links[active[open_links] > 0]
+    return rates[flows]
+
+
+def _component(seed_links, active, flow_ptr, flow_links, link_ptr, link_flows):
+    # Active flows connected to seed_links through shared links
+    seen_link = np.zeros(link_ptr.size - 1, dtype=bool)
+    seen_flow = ~active
+    total = int(active.sum())
+    frontier = _distinct(seed_links, seen_link.size)
+    seen_link[frontier] = True
+    found = 0
+    while frontier.size:
+        if found > total // 2:
+            # Solving a union of components is just as exact and cheaper than finishing the search
+            return np.flatnonzero(active)
+        flows, _ = _gather(link_ptr, link_flows, frontier)
+        flows = _distinct(flows[~seen_flow[flows]], seen_flow.size)
+        seen_flow[flows] = True
+        found += flows.size
+        links, _ = _gather(flow_ptr, flow_links, flows)
+        frontier = _distinct(links[~seen_link[links]], seen_link.size)
+        seen_link[frontier] = True
+    return np.flatnonzero(seen_flow & active)
+
+
+def simulate_flows(model, src, dst, nbytes, link_bw="12GB/s", xbar_bw=None, nic_bw=None,
+                   merge_tol=1e-6):
+    """
+    Completion time in seconds of every node-level flow under max-min fair
+    sharing. Flows finishing within merge_tol (relative) of the next
+    completion are completed together.
+
+    Returns a dict with "finish" (per flow), "events", "rate_updates" (flow
+    rates recomputed over all events) and "links".
+    """
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    remaining = np.broadcast_to(np.asarray(nbytes, dtype=np.float64), src.shape).copy()
+    link_bw = parse_bandwidth(link_bw)
+    xbar_bw = parse_bandwidth(xbar_bw) if xbar_bw is not None else link_bw
+    nic_bw = parse_bandwidth(nic_bw) if nic_bw is not None else link_bw
+
+    # Links: router links, then one injection and one ejection link per node
+    router_links = num_links(model)
+    nodes = model.num_nodes
+    capacity = np.concatenate([np.full(router_links, min(link_bw, xbar_bw)),
+                               np.full(nodes, nic_bw), np.full(nodes, min(nic_bw, xbar_bw))])
+    finish = np.zeros(src.size)
+    network = np.flatnonzero((src != dst) & (remaining > 0))
+    pair, link = route_incidence(model, model.router_of(src[network]), model.router_of(dst[network]))
+    rows = np.concatenate([network[pair], network, network])
+    cols = np.concatenate([link, router_links + src[network], router_links + nodes + dst[network]])
+    flow_ptr, flow_links = _csr(rows, cols, src.size)
+    link_ptr, link_flows = _csr(cols, rows, capacity.size)
+
+    active = np.zeros(src.size, dtype=bool)
+    active[network] = True
+    rates = np.zeros(src.size)
+    rates[network] = max_min_rates(network, flow_ptr, flow_links, link_ptr, link_flows, capacity)
+    updates = network.size
+    events = 0
+    now = 0.0
+    while network.size:
+        left = remaining[network] / rates[network]
+        step = left.min()
+        done = left <= step * (1 + merge_tol)
+        now += step
+        events += 1
+        finished, network = network[done], network[~done]
+        remaining[network] -= rates[network] * step
+        finish[finished] = now
+        active[finished] = False
+        rates[finished] = 0
+        if not network.size:
+            break
+        freed, _ = _gather(flow_ptr, flow_links, finished)
+        affected = _component(freed, active, flow_ptr, flow_links, link_ptr, link_flows)
+        if affected.size:
+            rates[affected] = max_min_rates(affected, flow_ptr, flow_links, link_ptr, link_flows, capacity)
+            updates += affected.size
+    return {"finish": finish, "events": events, "rate_updates": updates, "links": capacity.size}
+
+
+def simulate_jobs(model, jobs, maps, link_bw="12GB/s", xbar_bw=None, nic_bw=None, merge_tol=1e-6):
+    """
+    Per-job completion times of jobs running together, ranks placed by the
+    rank -> node maps. Returns (list of per-job dicts, simulate_flows result).
+    """
+    src, dst, nbytes, owner = [], [], [], []
+    for idx, traffic in enumerate(placed_traffic(jobs, maps, model.num_nodes)):
+        s, d, w = traffic.to_coo()
+        src.append(s)
+        dst.append(d)
+        nbytes.append(w)
+        owner.append(np.full(s.size, idx, dtype=np.int64))
+    src, dst, nbytes, owner = (np.concatenate(a) if a else np.zeros(0, dtype=np.int64)
+                               for a in (src, dst, nbytes, owner))
+    result = simulate_flows(model, src, dst, nbytes, link_bw, xbar_bw, nic_bw, merge_tol)
+
+    comm = np.zeros(len(jobs))
+    np.maximum.at(comm, owner, result["finish"])
+    per_job = []
+    for idx, job in enumerate(jobs):
+        compute = iterations(job) * compute_time(job)
+        per_job.append({"job": idx, "pattern": job["pattern"], "size": job["size"],
+                        "flows": int((owner == idx).sum()), "bytes": int(nbytes[owner == idx].sum()),
+                        "comm_time": float(comm[idx]), "compute_time": compute,
+                        "completion_time": float(comm[idx]) + compute})
+    return per_job, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flow-level max-min fair simulation of a job mix")
+    parser.add_argument("spec", help="spec with 'topology', 'router', 'nic' and 'jobs' (sweep format)")
+    parser.add_argument("--allocation", default=None, help="allocation JSON from sst_analysis.placement")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    model = model_from_topology(spec["topology"])
+    jobs = spec["jobs"]
+    if args.allocation:
+        with open(args.allocation) as f:
+            maps = [np.array(entry["nodes"], dtype=np.int64) for entry in json.load(f)]
+    else:
+        from sst_analysis.allocation import allocate
+        maps = allocate(jobs, model.num_nodes, spec.get("allocation", "linear"), seed=args.seed)
+
+    router = spec.get("router", {})
+    per_job, result = simulate_jobs(model, jobs, maps, router.get("link_bw", "12GB/s"),
+                                    router.get("xbar_bw"), spec.get("nic", {}).get("link_bw"))
+    print(f"Flows: {result['finish'].size}  events: {result['events']}  "
+          f"rate updates: {result['rate_updates']}")
+    for entry in per_job:
+        print(f"  Job {entry['job'] + 1}: {entry['pattern']} (size={entry['size']})  "
+              f"comm {entry['comm_time'] * 1e6:.3f} us  compute {entry['compute_time'] * 1e6:.3f} us  "
+              f"total {entry['completion_time'] * 1e6:.3f} us")
@@ -0,0 +1,24 @@
+"""
+Helpers shared by the per-topology hop-count engines.
+"""
+from collections import Counter
+
+# NIC->router and router->NIC hops added to every router-to-router distance
+ENDPOINT_HOPS = 2
+
+
+def counter_from_bincount(hist, endpoint_hops=ENDPOINT_HOPS):
+    """
+    Hop Counter from a bincount over router distances (zero bins dropped).
+    """
+    return Counter({d + endpoint_hops: int(c) for d, c in enumerate(hist) if c > 0})
+
+
+def histogram_average(hop_counter):
+    """
+    Average hop count of a hop Counter (0 when it is empty).
+    """
+    pairs = sum(hop_counter.values())
+    if pairs == 0:
+        return 0
+    return sum(h * c for h, c in hop_counter.items()) / pairs
@@ -0,0 +1,164 @@
+"""
+Inter-job interference of a placed job mix from shared links.
+
+Every job's traffic (traffic.placed_traffic, all iterations) is routed with
+linkload.route_incidence and summed per link into a sparse job x link
+matrix L. As in flowsim, the links are the router links (capacity
+min(link_bw, xbar_bw)) plus one injection (nic link_bw) and one ejection
+link (min(nic link_bw, xbar_bw)) per node. Jobs never share NIC links, but
+those links often bound a job on its own (e.g. a Bcast root).
+
+From L, with c the link capacities:
+
+    overlap[i, j]        bytes job i sends over links that job j also uses
+                         (L @ (L > 0).T; the diagonal is job i's link bytes)
+    shared_links[i, j]   number of links used by both jobs
+    alone[i]             max_l L[i, l] / c[l], the job's time on its own
+                         bottleneck
+    pair_slowdown[i, j]  max over i's links of (L[i, l] + L[j, l]) / c[l],
+                         divided by alone[i]: job i next to job j only
+    slowdown[i]          max over i's links of sum_j L[j, l] / c[l], divided
+                         by alone[i]: job i in the whole mix
+
+The slowdowns are a fluid bound: a link carrying several jobs' bytes takes
+as long as all of them together, and a job is as slow as its slowest link.
+They ignore when jobs actually overlap in time; flowsim simulates that with
+max-min fair sharing. The products only visit links that carry traffic, one
+cell per pair of jobs on the same link.
+
+    python -m sst_analysis.interference spec.json [--allocation allocation.json]
+"""
+import argparse
+import json
+
+import numpy as np
+
+from sst_analysis.linkload import num_links, route_incidence
+from sst_analysis.sweep import parse_bandwidth
+from sst_analysis.topology import model_from_topology
+from sst_analysis.traffic import placed_traffic
+
+
+def link_capacities(model, link_bw="12GB/s", xbar_bw=None, nic_bw=None):
+    """
+    Bytes/s of the router links, then the injection and ejection link of
+    every node (flowsim's link numbering).
+    """
+    link_bw = parse_bandwidth(link_bw)
+    xbar_bw = parse_bandwidth(xbar_bw) if xbar_bw is not None else link_bw
+    nic_bw = parse_bandwidth(nic_bw) if nic_bw is not None else link_bw
+    nodes = model.num_nodes
+    return np.concatenate([np.full(num_links(model), min(link_bw, xbar_bw)),
+                           np.full(nodes, nic_bw), np.full(nodes, min(nic_bw, xbar_bw))])
+
+
+def job_link_matrix(model, jobs, maps):
+    """
+    Sparse job x link byte matrix as (job, link, bytes) arrays, one entry per
+    used (job, link), sorted by link.
+    """
+    router_links = num_links(model)
+    entries = []
+    for idx, traffic in enumerate(placed_traffic(jobs, maps, model.num_nodes)):
+        src, dst, nbytes = traffic.to_coo()
+        nbytes = nbytes.astype(np.float64)
+        pair, link = route_incidence(model, model.router_of(src), model.router_of(dst))
+        links = np.concatenate([link, router_links + src, router_links + model.num_nodes + dst])
+        weights = np.concatenate([nbytes[pair], nbytes, nbytes])
+        used, inverse = np.unique(links, return_inverse=True)
+        entries.append((np.full(used.size, idx, dtype=np.int64), used,
+                        np.bincount(inverse.ravel(), weights=weights)))
+    if not entries:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0)
+    job, link, nbytes = (np.concatenate(parts) for parts in zip(*entries))
+    order = np.argsort(link, kind="stable")
+    return job[order], link[order], nbytes[order]
+
+
+def _link_pairs(link):
+    # (a, b) entry index pairs of every two entries (a == b included) on the same link
+    _, starts, counts = np.unique(link, return_index=True, return_counts=True)
+    group = np.repeat(np.arange(counts.size), counts)
+    per_entry = counts[group]
+    a = np.repeat(np.arange(link.size), per_entry)
+    within = np.arange(a.size) - np.repeat(np.cumsum(per_entry) - per_entry, per_entry)
+    return a, starts[group[a]] + within
+
+
+def interference_matrix(model, jobs, maps, capacity=None):
+    """
+    Interference of the jobs placed by the rank -> node maps. capacity is
+    the per-link bandwidth from link_capacities() (default: 12GB/s
+    everywhere). Returns a dict of NumPy arrays "overlap", "shared_links",
+    "pair_slowdown" (num_jobs x num_jobs), "alone" and "shared" (seconds)
+    and "slowdown" (per job).
+    """
+    if capacity is None:
+        capacity = link_capacities(model)
+    num_jobs = len(jobs)
+    job, link, nbytes = job_link_matrix(model, jobs, maps)
+    time = nbytes / capacity[link]
+    a, b = _link_pairs(link)
+
+    overlap = np.zeros((num_jobs, num_jobs))
+    np.add.at(overlap, (job[a], job[b]), nbytes[a])
+    shared_links = np.zeros((num_jobs, num_jobs), dtype=np.int64)
+    np.add.at(shared_links, (job[a], job[b]), 1)
+
+    alone = np.zeros(num_jobs)
+    np.maximum.at(alone, job, time)
+    # Both jobs' time on every shared link; links only one of them uses give alone[i] at most
+    pair_peak = np.zeros((num_jobs, num_jobs))
+    np.maximum.at(pair_peak, (job[a], job[b]), np.where(a != b, time[a] + time[b], 0.0))
+    pair_peak = np.maximum(pair_peak, alone[:, None])
+    shared = np.zeros(num_jobs)
+    np.maximum.at(shared, job, np.bincount(link, weights=time)[link] if link.size else time)
+
+    safe = np.where(alone > 0, alone, 1.0)
+    return {
+        "overlap": overlap,
+        "shared_links": shared_links,
+        "pair_slowdown": np.where(alone[:, None] > 0, pair_peak / safe[:, None], 1.0),
+        "alone": alone,
+        "shared": shared,
+        "slowdown": np.where(alone > 0, shared / safe, 1.0),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared-link interference between the jobs of a spec")
+    parser.add_argument("spec", help="spec with 'topology', 'router', 'nic' and 'jobs' (sweep format)")
+    parser.add_argument("--allocation", default=None, help="allocation JSON from sst_analysis.placement")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    model = model_from_topology(spec["topology"])
+    jobs = spec["jobs"]
+    if args.allocation:
+        with open(args.allocation) as f:
+            maps = [np.array(entry["nodes"], dtype=np.int64) for entry in json.load(f)]
+    else:
+        from sst_analysis.allocation import allocate
+        maps = allocate(jobs, model.num_nodes, spec.get("allocation", "linear"), seed=args.seed)
+
+    router = spec.get("router", {})
+    capacity = link_capacities(model, router.get("link_bw", "12GB/s"), router.get("xbar_bw"),
+                               spec.get("nic", {}).get("link_bw"))
+    result = interference_matrix(model, jobs, maps, capacity)
+    labels = [f"Job {idx + 1}" for idx in range(len(jobs))]
+    print("Shared-link byte overlap (row job's bytes on links the column job also uses):")
+    print(" " * 12 + "".join(f"{label:>12}" for label in labels))
+    for label, row in zip(labels, result["overlap"]):
+        print(f"{label:>12}" + "".join(f"{v:12.4g}" for v in row))
+    print("\nPairwise slowdown (row job next to column job):")
+    print(" " * 12 + "".join(f"{label:>12}" for label in labels))
+    for label, row in zip(labels, result["pair_slowdown"]):
+        print(f"{label:>12}" + "".join(f"{v:12.3f}" for v in row))
+    print()
+    for idx, job in enumerate(jobs):
+        print(f"  Job {idx + 1}: {job['pattern']} (size={job['size']})  "
+              f"alone {result['alone'][idx] * 1e6:.3f} us  in mix {result['shared'][idx] * 1e6:.3f} us  "
+              f"slowdown {result['slowdown'][idx]:.3f}")
@@ -0,0 +1,106 @@
+"""
+Traffic of the ember job definitions used in the configs.
+
+A job is a dict like {"size": 32, "start": 0, "pattern": "Allreduce",
+"params": "arg.count=2048 arg.iterations=20"}. pair_traffic() turns it into
+rank-level (src, dst, bytes) arrays using the same communication pairs as the
+hop scripts: all ordered pairs for Allreduce and Alltoall, root -> others for
+Scatter and Bcast, ranks 0 <-> 1 for PingPong and the dissemination rounds
+for Barrier.
+
+Byte counts are per pair over all iterations. Each pattern is sized by the
+argument its ember motif reads (PAYLOAD_ARGS), with the motif's default when
+it is missing: arg.count elements of DATATYPE_BYTES for the collectives,
+arg.bytes for Alltoall and arg.messageSize only for PingPong. Other size
+arguments are ignored, as ember ignores them: "Allreduce messageSize=1024"
+reduces a single 8 B element. Barrier messages carry CONTROL_BYTES.
+"""
+import numpy as np
+
+from sst_analysis.sweep import parse_time
+
+DATATYPE_BYTES = 8
+CONTROL_BYTES = 8
+
+# Patterns in which only the root (job_root) talks to the other ranks
+ROOT_PATTERNS = ("Scatter", "Bcast")
+
+# Size argument of each ember motif: (argument, default, bytes per unit)
+PAYLOAD_ARGS = {
+    "Allreduce": ("count", 1, DATATYPE_BYTES),
+    "Bcast": ("count", 1, DATATYPE_BYTES),
+    "Scatter": ("count", 1, DATATYPE_BYTES),
+    "Alltoall": ("bytes", 1, 1),
+    "PingPong": ("messageSize", 128, 1),
+}
+
+
+def parse_params(params):
+    """
+    {"count": "2048", "iterations": "20", ...} from an ember motif argument string.
+    """
+    args = {}
+    for token in (params or "").split():
+        key, _, value = token.partition("=")
+        args[key[4:] if key.startswith("arg.") else key] = value
+    return args
+
+
+def compute_time(job):
+    """
+    Seconds of compute per iteration from arg.compute ("50ns"; plain numbers are ns).
+    """
+    return parse_time(parse_params(job.get("params")).get("compute", "0"), "ns")
+
+
+def iterations(job):
+    return int(parse_params(job.get("params")).get("iterations", 1))
+
+
+def job_root(job):
+    return int(parse_params(job.get("params")).get("root", 0))
+
+
+def message_bytes(job):
+    """
+    Bytes of one message of the job's pattern, for a single iteration.
+    """
+    if job["pattern"] not in PAYLOAD_ARGS:
+        return CONTROL_BYTES
+    name, default, unit = PAYLOAD_ARGS[job["pattern"]]
+    return int(parse_params(job.get("params")).get(name, default)) * unit
+
+
+def pair_traffic(job):
+    """
+    (src, dst, bytes) int64 arrays over the job's ranks, one entry per
+    communicating ordered pair.
+    """
+    size = job["size"]
+    pattern = job["pattern"]
+    repeat = iterations(job)
+    ranks = np.arange(size, dtype=np.int64)
+
+    if pattern in ("Allreduce", "Alltoall"):
+        src = np.repeat(ranks, size)
+        dst = np.tile(ranks, size)
+        keep = src != dst
+        src, dst = src[keep], dst[keep]
+    elif pattern in ROOT_PATTERNS:
+        root = job_root(job)
+        dst = ranks[ranks != root]
+        src = np.full(dst.size, root, dtype=np.int64)
+    elif pattern == "PingPong":
+        src = np.array([0, 1], dtype=np.int64)
+        dst = np.array([1, 0], dtype=np.int64)
+    elif pattern == "Barrier":
+        # Dissemination barrier: in round k rank i signals rank (i + 2**k) % size
+        rounds = int(np.ceil(np.log2(size))) if size > 1 else 0
+        steps = 1 << np.arange(rounds, dtype=np.int64)
+        src = np.repeat(ranks, rounds)
+        dst = (src + np.tile(steps, size)) % size
+        return src, dst, np.full(src.size, CONTROL_BYTES * repeat, dtype=np.int64)
+    else:
+        raise ValueError(f"no traffic model for pattern {pattern!r}")
+
+    return src, dst, np.full(src.size, message_bytes(job) * repeat, dtype=np.int64)
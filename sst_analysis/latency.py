@@ -0,0 +1,277 @@
+"""
+Completion latency of SST runs from their statOutputCSV files.
+
+Every file is read in one streaming pass (statcsv.aggregate) that keeps only
+the statistics needed here, per component and port:
+
+    packet_latency      merlin link control of every NIC (ns per packet)
+    idle_time           every router port and NIC link (ps per idle period)
+    send_bit_count      bits sent
+    send_packet_count   packets sent
+    sentByteCount       ember.nic bytes sent / received, when enabled
+    rcvdByteCount
+
+A run's latency is its final SimTime. A port that stops sending early sits
+idle until the end of the simulation, and that trailing idle period is
+normally its longest one (idle_time Max). SimTime - idle Max therefore
+estimates when each NIC or used router port last sent. The run's
+"active_us" is the latest of these, and a job's "completion_us" the latest
+over its NICs (nicN:... components, N the node id).
+
+NIC values need the linkcontrol statistics
+(enableAllStatisticsForComponentType("merlin.linkcontrol")). Runs without
+them, like the single-job runs in Singlejob_sst that record only router
+statistics, get "nic_stats": False and no packet latency. job_latencies()
+refuses them, and the CLI says so. Their run-level times come from the
+router ports alone.
+
+LatencyIndex keeps the per-file summaries in an SQLite index keyed by path,
+modification time and size. update() reparses only new or changed files, so
+hundreds of runs can be rescanned cheaply. comparison_table() produces the
+{"Simulation Type": [...], "Latency (us)": [...]} table of
+Singlejob_sst/latency_comparison/latency_comparison.py.
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+
+import numpy as np
+
+from sst_analysis.statcsv import aggregate
+
+STATISTICS = ("packet_latency", "idle_time", "send_bit_count", "send_packet_count",
+              "sentByteCount", "rcvdByteCount")
+
+# Version of the summary layout; index entries of older versions are reparsed
+SUMMARY_VERSION = 2
+
+# SimTime and idle_time are in the default SST time base
+PS_PER_US = 1e6
+
+_NIC = re.compile(r"nic(\d+)[:.]")
+
+
+def _nic_node(component):
+    m = _NIC.match(component)
+    return int(m.group(1)) if m else None
+
+
+def scan_stats(path):
+    """
+    Latency summary of one statistics file (JSON-serializable dict): run-level
+    "sim_time_us", "active_us", "packet_latency_ns" (mean), "packet_latency_max_ns",
+    "bytes", "nic_stats" (whether the file has NIC statistics; without them
+    the packet latencies are None) and per-NIC lists under "nics".
+    """
+    records = aggregate(path, by=("ComponentName", "StatisticName", "StatisticSubId"),
+                        statistics=list(STATISTICS), fields=("Sum", "Count", "Max"))
+    sim_time = max((r["SimTime"] for r in records.values()), default=0)
+    nics = {}
+    active = 0.0
+    latency_sum = latency_count = 0
+    latency_max = 0
+    total_bits = 0
+    sent = {}
+    for (component, statistic, subid), r in records.items():
+        node = _nic_node(component)
+        if statistic == "send_packet_count" or statistic == "send_bit_count":
+            sent[component, subid] = sent.get((component, subid), 0) + int(r["Sum"])
+        if node is None:
+            continue
+        nic = nics.setdefault(node, {"latency_sum": 0, "latency_count": 0, "latency_max": 0,
+                                     "bits": 0, "bytes_sent": 0, "bytes_rcvd": 0, "idle_max": None})
+        if statistic == "packet_latency":
+            nic["latency_sum"] += int(r["Sum"])
+            nic["latency_count"] += int(r["Count"])
+            nic["latency_max"] = max(nic["latency_max"], int(r["Max"]))
+        elif statistic == "send_bit_count":
+            nic["bits"] += int(r["Sum"])
+        elif statistic == "sentByteCount":
+            nic["bytes_sent"] += int(r["Sum"])
+        elif statistic == "rcvdByteCount":
+            nic["bytes_rcvd"] += int(r["Sum"])
+
+    for (component, statistic, subid), r in records.items():
+        if statistic != "idle_time" or not sent.get((component, subid)):
+            continue
+        # Ports that never sent are idle for the whole run and say nothing
+        last = float(r["SimTime"] - r["Max"]) if r["Count"] else float(r["SimTime"])
+        active = max(active, last)
+        node = _nic_node(component)
+        if node is not None:
+            nic = nics[node]
+            nic["idle_max"] = int(r["Max"]) if nic["idle_max"] is None else max(nic["idle_max"], int(r["Max"]))
+
+    for nic in nics.values():
+        latency_sum += nic["latency_sum"]
+        latency_count += nic["latency_count"]
+        latency_max = max(latency_max, nic["latency_max"])
+        total_bits += nic["bits"]
+    nodes = sorted(nics)
+    has_nics = bool(nodes)
+    return {
+        "sim_time_us": sim_time / PS_PER_US,
+        "active_us": active / PS_PER_US,
+        "packet_latency_ns": (latency_sum / latency_count if latency_count else 0.0) if has_nics else None,
+        "packet_latency_max_ns": latency_max if has_nics else None,
+        "bytes": total_bits // 8,
+        "nic_stats": has_nics,
+        "version": SUMMARY_VERSION,
+        "nics": {
+            "node": nodes,
+            "latency_sum": [nics[n]["latency_sum"] for n in nodes],
+            "latency_count": [nics[n]["latency_count"] for n in nodes],
+            "latency_max": [nics[n]["latency_max"] for n in nodes],
+            "bytes": [nics[n]["bytes_sent"] or nics[n]["bits"] // 8 for n in nodes],
+            "last_send_us": [(sim_time - nics[n]["idle_max"]) / PS_PER_US if nics[n]["idle_max"] is not None
+                             else 0.0 for n in nodes],
+        },
+    }
+
+
+def job_latencies(summary, jobs, maps):
+    """
+    Per-job dicts with "completion_us" (latest NIC last-send time),
+    "packet_latency_ns" (mean), "packet_latency_max_ns" and "bytes", ranks
+    placed by the rank -> node maps. Raises ValueError for a run without
+    NIC statistics.
+    """
+    if not summary.get("nic_stats"):
+        raise ValueError("the run has no NIC (merlin.linkcontrol) statistics, so per-job latencies are unknown")
+    nics = summary["nics"]
+    node = np.asarray(nics["node"], dtype=np.int64)
+    columns = {k: np.asarray(v, dtype=np.float64) for k, v in nics.items() if k != "node"}
+    result = []
+    for idx, (job, nodes) in enumerate(zip(jobs, maps)):
+        mine = np.isin(node, np.asarray(nodes, dtype=np.int64))
+        count = columns["latency_count"][mine].sum()
+        result.append({
+            "job": idx, "pattern": job["pattern"], "size": job["size"],
+            "completion_us": float(columns["last_send_us"][mine].max(initial=0.0)),
+            "packet_latency_ns": float(columns["latency_sum"][mine].sum() / count) if count else 0.0,
+            "packet_latency_max_ns": float(columns["latency_max"][mine].max(initial=0.0)),
+            "bytes": int(columns["bytes"][mine].sum()),
+        })
+    return result
+
+
+class LatencyIndex:
+    """
+    Incrementally maintained latency summaries of many statistics files.
+    """
+
+    def __init__(self, db_path):
+        self._db = sqlite3.connect(db_path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, summary TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def update(self, paths):
+        """
+        {path: summary} for the given files, parsing only those that are new,
+        whose modification time or size changed since the last update, or
+        whose stored summary predates SUMMARY_VERSION.
+        Returns (summaries, number of files parsed).
+        """
+        summaries = {}
+        parsed = 0
+        for path in paths:
+            key = os.path.abspath(path)
+            st = os.stat(key)
+            row = self._db.execute("SELECT mtime_ns, size, summary FROM runs WHERE path = ?", (key,)).fetchone()
+            if row is not None and row[0] == st.st_mtime_ns and row[1] == st.st_size:
+                summary = json.loads(row[2])
+                if summary.get("version") == SUMMARY_VERSION:
+                    summaries[path] = summary
+                    continue
+            summaries[path] = scan_stats(key)
+            parsed += 1
+            self._db.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?)",
+                             (key, st.st_mtime_ns, st.st_size, json.dumps(summaries[path])))
+        self._db.commit()
+        return summaries, parsed
+
+    def forget_missing(self):
+        """
+        Drop the entries of files that no longer exist; returns how many.
+        """
+        gone = [p for (p,) in self._db.execute("SELECT path FROM runs") if not os.path.exists(p)]
+        self._db.executemany("DELETE FROM runs WHERE path = ?", [(p,) for p in gone])
+        self._db.commit()
+        return len(gone)
+
+
+def run_label(path):
+    """
+    Default chart label of a statistics file: its directory and file name.
+    """
+    parent = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    return f"{parent}/{os.path.splitext(os.path.basename(path))[0]}"
+
+
+def comparison_table(summaries, labels=None, metric="sim_time_us"):
+    """
+    {"Simulation Type": [...], "Latency (us)": [...]} table for
+    plot_latency_comparison() from {path: summary}; metric is "sim_time_us"
+    or "active_us".
+    """
+    labels = labels or {}
+    return {
+        "Simulation Type": [labels.get(p, run_label(p)) for p in summaries],
+        "Latency (us)": [summaries[p][metric] for p in summaries],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract run and job latencies from SST statistics files")
+    parser.add_argument("stats", nargs="+", help="statOutputCSV files")
+    parser.add_argument("--index", default="latency_index.sqlite", help="incremental index database")
+    parser.add_argument("--metric", choices=("sim_time_us", "active_us"), default="sim_time_us")
+    parser.add_argument("--spec", default=None, help="spec with 'topology' and 'jobs' for per-job latencies")
+    parser.add_argument("--allocation", default=None, help="allocation JSON from sst_analysis.placement")
+    parser.add_argument("--table", default=None, help="write the comparison table as JSON")
+    args = parser.parse_args()
+
+    index = LatencyIndex(args.index)
+    summaries, parsed = index.update(args.stats)
+    index.close()
+    print(f"{len(summaries)} runs, {parsed} parsed")
+    for path, s in summaries.items():
+        line = f"  {run_label(path)}: sim time {s['sim_time_us']:.3f} us  active {s['active_us']:.3f} us  "
+        if s["nic_stats"]:
+            line += f"packet latency {s['packet_latency_ns']:.1f} ns (max {s['packet_latency_max_ns']})"
+        else:
+            line += "no NIC statistics (enable merlin.linkcontrol): no packet latency or per-job times"
+        print(line)
+
+    if args.spec:
+        from sst_analysis.topology import model_from_topology
+        with open(args.spec) as f:
+            spec = json.load(f)
+        if args.allocation:
+            with open(args.allocation) as f:
+                maps = [entry["nodes"] for entry in json.load(f)]
+        else:
+            from sst_analysis.allocation import allocate
+            maps = allocate(spec["jobs"], model_from_topology(spec["topology"]).num_nodes,
+                            spec.get("allocation", "linear"))
+        for path, s in summaries.items():
+            print(run_label(path))
+            if not s["nic_stats"]:
+                print("  skipped: no NIC statistics")
+                continue
+            for entry in job_latencies(s, spec["jobs"], maps):
+                print(f"  Job {entry['job'] + 1}: {entry['pattern']} (size={entry['size']})  "
+                      f"completion {entry['completion_us']:.3f} us  "
+                      f"packet latency {entry['packet_latency_ns']:.1f} ns  {entry['bytes']} B")
+
+    if args.table:
+        with open(args.table, "w") as f:
+            json.dump(comparison_table(summaries, metric=args.metric), f, indent=2)
@@ -0,0 +1,306 @@
+"""
+Per-link traffic load under deterministic minimal routing.
+
+Every communicating pair is routed along the topology's minimal path:
+
+    MeshModel       dimension order (X, then Y, ...)
+    TorusModel      dimension order, shorter wrap direction per axis
+                    (ties go in the + direction)
+    DragonflyModel  local hop to the gateway router, global link, local hop
+                    to the destination, over the shortest of the
+                    intergroup_links parallel global links (ties rotate with
+                    the destination router)
+    DistanceMatrixModel with an adjacency (PolarFly)
+                    at every router, the lowest-numbered neighbour one hop
+                    closer to the destination
+
+Routes are expanded for whole pair arrays at once into a pair -> link
+incidence list, and bytes per directed router-to-router link are
+bincount(link, weights=bytes[pair]), i.e. the incidence matrix times the
+pair byte vector. Pairs are processed in chunks of at most `chunk_links`
+incidences. NIC links are not included.
+
+Link ids:
+
+    mesh / torus  router * 2 * ndim + 2 * dim + (0 for +, 1 for -)
+    dragonfly     local:  router * routers_per_group + destination index in group
+                  global: num_routers * routers_per_group + group * slots + slot
+                  (slot as in DragonflyModel.gateway_slots)
+    adjacency     position of the edge in the CSR indices array
+"""
+import argparse
+import json
+
+import numpy as np
+
+from sst_analysis.topology import (DistanceMatrixModel, DragonflyModel, MeshModel, TorusModel,
+                                   model_from_topology)
+from sst_analysis.traffic import placed_traffic
+
+
+def supports_routing(model):
+    if isinstance(model, DistanceMatrixModel):
+        return model.adjacency is not None
+    return isinstance(model, (MeshModel, DragonflyModel))
+
+
+def num_links(model):
+    if isinstance(model, MeshModel):
+        return model.num_routers * 2 * len(model.shape)
+    if isinstance(model, DragonflyModel):
+        return model.num_routers * (model.routers_per_group + model.global_ports)
+    if supports_routing(model):
+        return int(model.adjacency[0][-1])
+    raise ValueError(f"no routing for {type(model).__name__}")
+
+
+def _expand(steps, dtype=np.int64):
+    # Pair index and step number of every hop, for per-pair hop counts `steps`
+    pair = np.repeat(np.arange(steps.size, dtype=dtype), steps)
+    starts = np.cumsum(steps) - steps
+    return pair, np.arange(pair.size, dtype=dtype) - np.repeat(starts.astype(dtype), steps)
+
+
+def _grid_incidence(model, ra, rb, wrap):
+    shape = model.shape
+    ndim = len(shape)
+    # int32 arithmetic halves the memory traffic of the expanded hop arrays
+    dtype = np.int32 if num_links(model) < 2 ** 31 and ra.size < 2 ** 31 else np.int64
+    cur = [c.astype(np.int64) for c in model.router_coords(ra)]
+    dst = [c.astype(np.int64) for c in model.router_coords(rb)]
+    strides = np.cumprod((1,) + shape[:-1])
+    pairs, links = [], []
+    for d, n in enumerate(shape):
+        delta = dst[d] - cur[d]
+        if wrap:
+            delta = np.mod(delta, n)
+            delta = np.where(delta > n // 2, delta - n, delta)
+        negative = delta < 0
+        steps = np.abs(delta)
+        port_stride = int(strides[d]) * 2 * ndim
+        # Link id of each pair's first hop in this dimension; dims before d are
+        # already at dst, dims after d still at src
+        first = sum(c * int(st) for c, st in zip(cur, strides)) * (2 * ndim) + 2 * d + negative
+        pair, k = _expand(steps, dtype)
+        k *= np.repeat(np.where(negative, -port_stride, port_stride).astype(dtype), steps)
+        link = np.repeat(first.astype(dtype), steps)
+        link += k
+        if wrap:
+            # Hops past the edge of the ring continue from the other side
+            crossing = np.where(negative, cur[d] - steps < 0, cur[d] + steps >= n)
+            if crossing.any():
+                edge = np.where(negative, cur[d] + 1, n - cur[d])
+                jump = np.where(negative, n, -n) * port_stride
+                wraps = np.flatnonzero(crossing)
+                wpair, wk = _expand(steps[wraps] - edge[wraps])
+                wk += np.repeat(edge[wraps], steps[wraps] - edge[wraps])
+                starts = np.cumsum(steps) - steps
+                link[starts[wraps][wpair] + wk] += np.repeat(jump[wraps], steps[wraps] - edge[wraps]).astype(dtype)
+        links.append(link)
+        pairs.append(pair)
+        cur[d] = dst[d]
+    return np.concatenate(pairs), np.concatenate(links)
+
+
+def _dragonfly_incidence(model, ra, rb):
+    rpg = model.routers_per_group
+    ga, gb = ra // rpg, rb // rpg
+    pair = np.arange(ra.size, dtype=np.int64)
+    pairs, links = [], []
+
+    def local(mask, src, dst):
+        hop = mask & (src != dst)
+        pairs.append(pair[hop])
+        links.append(src[hop] * rpg + dst[hop] % rpg)
+
+    local(ga == gb, ra, rb)
+    inter = ga != gb
+    gb_safe = np.where(inter, gb, (ga + 1) % model.num_groups)
+    # Shortest of the parallel global links; ties rotate with the destination router
+    links_per_pair = model.intergroup_links
+    rotation = (np.arange(links_per_pair) - rb[:, None]) % links_per_pair
+    k = np.argmin(model.via_links(ra, rb, ga, gb_safe) * links_per_pair + rotation, axis=1)
+    out_gw, in_gw = model.gateway_routers(ga, gb_safe, k)
+    slots = model.gateway_slots()[ga, gb_safe, k]
+    local(inter, ra, out_gw)
+    pairs.append(pair[inter])
+    links.append(model.num_routers * rpg + ga[inter] * rpg * model.global_ports + slots[inter])
+    local(inter, in_gw, rb)
+    return np.concatenate(pairs), np.concatenate(links)
+
+
+def _matrix_incidence(model, ra, rb):
+    indptr = model.adjacency[0]
+    neighbours = model.neighbour_table()
+    n = model.num_routers
+    pair = np.arange(ra.size, dtype=np.int64)
+    cur = ra.copy()
+    pairs, links = [], []
+    active = cur != rb
+    while active.any():
+        idx = pair[active]
+        here, there = cur[idx], rb[idx]
+        cand = neighbours[here]
+        remaining = np.asarray(model.dist[here, there], dtype=np.int64)
+        # Padding slots (id n) never qualify as the next hop
+        cand_dist = np.where(cand < n, np.asarray(model.dist[np.minimum(cand, n - 1), there[:, None]],
+                                                  dtype=np.int64), -1)
+        slot = np.argmax(cand_dist == (remaining - 1)[:, None], axis=1)
+        pairs.append(idx)
+        links.append(indptr[here] + slot)
+        cur[idx] = cand[np.arange(idx.size), slot]
+        active = cur != rb
+    if not pairs:
+        return pair[:0], pair[:0]
+    return np.concatenate(pairs), np.concatenate(links)
+
+
+def route_incidence(model, ra, rb):
+    """
+    (pair, link) arrays: pair index into ra/rb of every link the pair's
+    minimal route uses.
+    """
+    ra = np.asarray(ra, dtype=np.int64)
+    rb = np.asarray(rb, dtype=np.int64)
+    if isinstance(model, TorusModel):
+        return _grid_incidence(model, ra, rb, wrap=True)
+    if isinstance(model, MeshModel):
+        return _grid_incidence(model, ra, rb, wrap=False)
+    if isinstance(model, DragonflyModel):
+        return _dragonfly_incidence(model, ra, rb)
+    if supports_routing(model):
+        return _matrix_incidence(model, ra, rb)
+    raise ValueError(f"no routing for {type(model).__name__}")
+
+
+def link_loads(model, src_nodes, dst_nodes, nbytes, chunk_links=1 << 24):
+    """
+    Bytes carried by every directed link (float64 array indexed by link id).
+    """
+    ra = model.router_of(src_nodes)
+    rb = model.router_of(dst_nodes)
+    nbytes = np.broadcast_to(np.asarray(nbytes, dtype=np.float64), ra.shape)
+    loads = np.zeros(num_links(model))
+    # Cut the pairs so that each chunk expands to about chunk_links incidences
+    hops = np.cumsum(model.router_distance(ra, rb))
+    cuts = np.searchsorted(hops, np.arange(chunk_links, hops[-1] if hops.size else 0, chunk_links))
+    bounds = np.unique(np.concatenate([[0], cuts, [ra.size]]))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        pair, link = route_incidence(model, ra[lo:hi], rb[lo:hi])
+        chunk = nbytes[lo:hi]
+        if chunk.size and chunk.min() == chunk.max():
+            # Uniform message size (the usual case within a job): count hops only
+            loads += np.bincount(link, minlength=loads.size) * chunk[0]
+        else:
+            loads += np.bincount(link, weights=chunk[pair], minlength=loads.size)
+    return loads
+
+
+def job_link_loads(model, jobs, maps, chunk_links=1 << 24):
+    """
+    Link loads of all jobs together, ranks placed by the rank -> node maps.
+    """
+    loads = np.zeros(num_links(model))
+    for traffic in placed_traffic(jobs, maps, model.num_nodes):
+        loads += link_loads(model, *traffic.to_coo(), chunk_links)
+    return loads
+
+
+def link_endpoints(model, links):
+    """
+    (kind, src_router, dst_router) arrays for link ids; kind is "x", "y", ...
+    per grid dimension, "local"/"global" for the dragonfly, else "link".
+    """
+    links = np.asarray(links, dtype=np.int64)
+    if isinstance(model, DistanceMatrixModel):
+        indptr, indices = model.adjacency
+        src = np.searchsorted(indptr, links, side="right") - 1
+        return np.full(links.size, "link"), src, indices[links].astype(np.int64)
+    if isinstance(model, MeshModel):
+        ndim = len(model.shape)
+        router, port = links // (2 * ndim), links % (2 * ndim)
+        dim, sign = port // 2, np.where(port % 2 == 1, -1, 1)
+        coords = np.array(model.router_coords(router))
+        coords[dim, np.arange(links.size)] += sign
+        if isinstance(model, TorusModel):
+            coords = np.mod(coords, np.array(model.shape)[:, None])
+        dst = np.ravel_multi_index(tuple(coords), model.shape, order="F", mode="clip")
+        kind = np.array(["xyzwuv"[d] if d < 6 else f"d{d}" for d in range(ndim)])[dim]
+        return kind, router, dst
+
+    rpg = model.routers_per_group
+    local_count = model.num_routers * rpg
+    is_local = links < local_count
+    src = np.where(is_local, links // rpg, 0)
+    dst = np.where(is_local, (links // rpg) // rpg * rpg + links % rpg, 0)
+
+    glob = links[~is_local] - local_count
+    slots_per_group = rpg * model.global_ports
+    group, slot = glob // slots_per_group, glob % slots_per_group
+    # Invert the gateway table: destination group and link number of every slot
+    table = model.gateway_slots()
+    g_idx, h_idx, k_idx = np.nonzero(table >= 0)
+    far_group = np.full((model.num_groups, slots_per_group), -1, dtype=np.int64)
+    far_link = np.zeros_like(far_group)
+    far_group[g_idx, table[g_idx, h_idx, k_idx]] = h_idx
+    far_link[g_idx, table[g_idx, h_idx, k_idx]] = k_idx
+    h, k = far_group[group, slot], far_link[group, slot]
+    _, in_gw = model.gateway_routers(group, np.maximum(h, 0), k)
+    src[~is_local] = group * rpg + slot // model.global_ports
+    dst[~is_local] = np.where(h < 0, -1, in_gw)
+    return np.where(is_local, "local", "global"), src, dst
+
+
+def hotspots(model, loads, top=10):
+    """
+    The `top` most loaded links as dicts, heaviest first, with their share of
+    the total link traffic.
+    """
+    order = np.argsort(-loads, kind="stable")[:top]
+    order = order[loads[order] > 0]
+    kind, src, dst = link_endpoints(model, order)
+    total = loads.sum()
+    return [{"link": int(l), "kind": str(kd), "src_router": int(s), "dst_router": int(d),
+             "bytes": float(loads[l]), "share": float(loads[l] / total) if total else 0.0}
+            for l, kd, s, d in zip(order, kind, src, dst)]
+
+
+def load_summary(loads):
+    """
+    Max, mean over used links, and imbalance (max / mean) of a link-load vector.
+    """
+    used = loads[loads > 0]
+    mean = float(used.mean()) if used.size else 0.0
+    peak = float(loads.max()) if loads.size else 0.0
+    return {"max": peak, "max_link": int(np.argmax(loads)) if loads.size else -1,
+            "mean": mean, "used_links": int(used.size),
+            "imbalance": peak / mean if mean else 0.0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate per-link loads under minimal routing")
+    parser.add_argument("spec", help="spec with 'topology' and 'jobs' (sweep format)")
+    parser.add_argument("--allocation", default=None,
+                        help="allocation JSON from sst_analysis.placement (default: linear)")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    model = model_from_topology(spec["topology"])
+    jobs = spec["jobs"]
+    if args.allocation:
+        with open(args.allocation) as f:
+            maps = [np.array(entry["nodes"], dtype=np.int64) for entry in json.load(f)]
+    else:
+        from sst_analysis.allocation import allocate
+        maps = allocate(jobs, model.num_nodes, spec.get("allocation", "linear"))
+
+    loads = job_link_loads(model, jobs, maps)
+    summary = load_summary(loads)
+    print(f"Links used: {summary['used_links']}  max: {summary['max']:.0f} B  "
+          f"mean: {summary['mean']:.0f} B  imbalance: {summary['imbalance']:.2f}")
+    print(f"{'Link':>8} {'Kind':<7} {'From':>6} {'To':>6} {'Bytes':>14} {'Share':>7}")
+    for spot in hotspots(model, loads, args.top):
+        print(f"{spot['link']:>8} {spot['kind']:<7} {spot['src_router']:>6} {spot['dst_router']:>6} "
+              f"{spot['bytes']:>14.0f} {spot['share']:>7.2%}")
@@ -0,0 +1,144 @@
+"""
+LogGP-style analytical latency of the ember collectives.
+
+A message of m bytes between nodes d router-to-router hops apart takes
+
+    T(m, d) = 2 * o + L(d) + m * G
+
+    o     nic2host_lat, paid on the sending and on the receiving side
+    L(d)  (d + 2) * (link_latency + flit_size / link_bw)     NIC and router links
+          + (d + 1) * (input_latency + output_latency)       routers traversed
+    G     1 / link_bw (cut-through: the body is serialized once)
+
+Collectives are the per-step schedules of sst_analysis.schedules (binomial
+trees, dissemination barrier and pairwise Alltoall by default, as ember runs
+them; recursive doubling, Rabenseifner or ring Allreduce on request), one
+round per step. Message sizes come from jobs.message_bytes, i.e. from the
+size argument the pattern's ember motif reads.
+
+A round lasts as long as its slowest message. With a distance model and the
+job's rank -> node map every message gets its exact distance; with only a
+hop histogram (as printed by the hopcount scripts) all messages use the
+histogram's mean distance. Latencies are per job in microseconds, over all
+arg.iterations including arg.compute. Contention is not modelled; see
+flowsim for bandwidth-bound estimates.
+"""
+import argparse
+import json
+
+import numpy as np
+
+from sst_analysis.allocation import allocate
+from sst_analysis.hops import ENDPOINT_HOPS, histogram_average
+from sst_analysis.jobs import compute_time, iterations
+from sst_analysis.schedules import schedule_steps
+from sst_analysis.sweep import expand_sweep, parse_bandwidth, parse_size, parse_time
+from sst_analysis.topology import model_from_topology
+
+
+def network_params(router, topology=None, nic2host_lat="100ns"):
+    """
+    LogGP parameters in seconds and bytes/s from the hr_router settings, the
+    topology's link_latency and the NIC's nic2host_lat.
+    """
+    topology = topology or {}
+    link_bw = parse_bandwidth(router.get("link_bw", "4GB/s"))
+    return {
+        "o": parse_time(nic2host_lat),
+        "link": parse_time(topology.get("link_latency", router.get("link_latency", "20ns"))),
+        "router": parse_time(router.get("input_latency", "20ns")) + parse_time(router.get("output_latency", "20ns")),
+        "flit": parse_size(router.get("flit_size", "8B")) / link_bw,
+        "G": 1.0 / link_bw,
+    }
+
+
+def message_time(nbytes, router_hops, net):
+    """
+    Seconds for messages of nbytes over router_hops router-to-router links
+    (arrays broadcast).
+    """
+    d = np.asarray(router_hops, dtype=np.float64)
+    return (2 * net["o"] + (d + 2) * (net["link"] + net["flit"]) + (d + 1) * net["router"]
+            + np.asarray(nbytes, dtype=np.float64) * net["G"])
+
+
+def predict_latency(job, net, model=None, nodes=None, hop_histogram=None, algorithm=None):
+    """
+    Predicted latency of the job in microseconds.
+
+    Message distances come from model and nodes (the job's rank -> node
+    map, default start..start+size) when a model is given, else from the
+    mean of hop_histogram (node hops, Counter). algorithm selects the
+    collective algorithm (see schedules.ALGORITHMS).
+    """
+    if model is not None:
+        if nodes is None:
+            nodes = np.arange(job.get("start", 0), job.get("start", 0) + job["size"])
+        nodes = np.asarray(nodes, dtype=np.int64)
+        ra = model.router_of(nodes)
+        mean_hops = None
+    elif hop_histogram:
+        mean_hops = max(histogram_average(hop_histogram) - ENDPOINT_HOPS, 0.0)
+    else:
+        raise ValueError("predict_latency needs a model or a hop histogram")
+
+    total = 0.0
+    for src, dst, nbytes in schedule_steps(job, algorithm):
+        hops = model.router_distance(ra[src], ra[dst]) if mean_hops is None else mean_hops
+        total += float(np.max(message_time(nbytes, hops, net)))
+    return iterations(job) * (total + compute_time(job)) * 1e6
+
+
+def predict_spec(spec, maps=None, model=None):
+    """
+    Predicted latency (us) of every job of a sweep-format spec.
+    """
+    if model is None:
+        model = model_from_topology(spec["topology"])
+    net = network_params(spec.get("router", {}), spec["topology"], spec.get("nic2host_lat", "100ns"))
+    jobs = spec["jobs"]
+    if maps is None:
+        maps = allocate(jobs, model.num_nodes, spec.get("allocation", "linear"))
+    return [predict_latency(job, net, model, nodes) for job, nodes in zip(jobs, maps)]
+
+
+def screen_sweep(spec, seed=None):
+    """
+    Predicted job latencies at every point of the spec's sweep, as a list of
+    (point, latencies) sorted by the slowest job. Topology models and
+    allocations are built once per distinct topology and job list.
+    """
+    cache = {}
+    results = []
+    for point, config in expand_sweep(spec):
+        key = json.dumps([config["topology"], config["jobs"], config.get("allocation")], sort_keys=True)
+        if key not in cache:
+            model = model_from_topology(config["topology"])
+            cache[key] = model, allocate(config["jobs"], model.num_nodes, config.get("allocation", "linear"),
+                                         seed=seed)
+        model, maps = cache[key]
+        results.append((point, predict_spec(config, maps, model)))
+    results.sort(key=lambda entry: max(entry[1], default=0.0))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analytical (LogGP) latency of the jobs in a spec")
+    parser.add_argument("spec", nargs="+", help="specs with 'topology', 'router' and 'jobs' (sweep format)")
+    parser.add_argument("--sweep", action="store_true", help="rank the points of each spec's sweep")
+    parser.add_argument("--top", type=int, default=10, help="points to print with --sweep")
+    parser.add_argument("--seed", type=int, default=None, help="seed for random allocation")
+    args = parser.parse_args()
+
+    for path in args.spec:
+        with open(path) as f:
+            spec = json.load(f)
+        print(spec.get("name", path))
+        if args.sweep:
+            results = screen_sweep(spec, args.seed)
+            print(f"  {len(results)} points, fastest first:")
+            for point, latencies in results[:args.top]:
+                print(f"  {max(latencies, default=0.0):10.3f} us  {point}")
+            continue
+        for idx, (job, latency) in enumerate(zip(spec["jobs"], predict_spec(spec))):
+            print(f"  Job {idx + 1}: {job['pattern']} (size={job['size']})  {latency:.3f} us")
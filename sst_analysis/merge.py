@@ -0,0 +1,155 @@
+"""
+Parallel k-way merge of per-rank SST statistics shards.
+
+Parallel SST runs write one statOutputCSV file per MPI rank (e.g.
+dragonfly_multi_job_stats_0..3.csv). merge_shards() combines them into one
+file ordered by (ComponentName, StatisticName, StatisticSubId, SimTime):
+
+1. Every shard is cut into sorted runs of at most `chunk_rows` lines in a
+   process pool, one task per shard.
+2. Runs are merged with heapq.merge in groups of `fan_in`, also in the pool,
+   until a single final k-way merge writes the output.
+
+Only one chunk per worker plus one buffered line per open run is held in
+memory. Records with the same (component, statistic, subid, SimTime) key are
+written once; the copy from the earliest shard wins.
+"""
+import argparse
+import heapq
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from sst_analysis.statcsv import SEPARATOR
+
+
+def record_key(line, separator=SEPARATOR):
+    """
+    Sort key (component, statistic, subid, SimTime) of one statOutputCSV line.
+    """
+    parts = line.split(separator.strip() or separator, 5)
+    return parts[0].strip(), parts[1].strip(), parts[2].strip(), int(parts[4])
+
+
+def _read_header(path):
+    with open(path) as f:
+        return f.readline()
+
+
+def _header_columns(header):
+    return [c.strip() for c in header.split(",")]
+
+
+def _write_run(lines, separator, tmp_dir, tag):
+    lines.sort(key=lambda line: record_key(line, separator))
+    fd, path = tempfile.mkstemp(prefix=f"run-{tag}-", suffix=".csv", dir=tmp_dir)
+    with os.fdopen(fd, "w") as f:
+        f.writelines(lines)
+    return path
+
+
+def _sort_shard(args):
+    # Pool task: split one shard into sorted run files
+    shard, order, chunk_rows, separator, tmp_dir = args
+    runs = []
+    lines = []
+    with open(shard) as f:
+        f.readline()
+        for line in f:
+            if not line.strip():
+                continue
+            if not line.endswith("\n"):
+                line += "\n"
+            lines.append(line)
+            if len(lines) >= chunk_rows:
+                runs.append(_write_run(lines, separator, tmp_dir, order))
+                lines = []
+    if lines:
+        runs.append(_write_run(lines, separator, tmp_dir, order))
+    return runs
+
+
+def _keyed(f, pos, separator):
+    # (key, run position, line) of every line of one run
+    for line in f:
+        yield record_key(line, separator), pos, line
+
+
+def _merge_runs(runs, out, separator, header=None, dedupe=True):
+    # Stable k-way merge: the tie-break on run position keeps earlier shards first
+    files = [open(path) for path in runs]
+    try:
+        streams = [_keyed(f, pos, separator) for pos, f in enumerate(files)]
+        written = 0
+        last_key = None
+        with open(out, "w") as dst:
+            if header is not None:
+                dst.write(header)
+            for key, _, line in heapq.merge(*streams):
+                if dedupe and key == last_key:
+                    continue
+                last_key = key
+                dst.write(line)
+                written += 1
+        return written
+    finally:
+        for f in files:
+            f.close()
+
+
+def _merge_group(args):
+    # Pool task: merge a group of runs into one intermediate run
+    runs, out, separator = args
+    _merge_runs(runs, out, separator)
+    return out
+
+
+def merge_shards(shards, out_path, workers=None, chunk_rows=1 << 20, fan_in=64,
+                 separator=SEPARATOR, dedupe=True):
+    """
+    Merge statOutputCSV shards into one sorted, deduplicated file.
+
+    Shards are passed in rank order and that order decides which copy of a
+    duplicated record is kept. Returns the number of records written.
+    """
+    shards = list(shards)
+    if not shards:
+        raise ValueError("no shards to merge")
+    header = _read_header(shards[0])
+    for shard in shards[1:]:
+        if _header_columns(_read_header(shard)) != _header_columns(header):
+            raise ValueError(f"{shard}: header differs from {shards[0]}")
+
+    tmp_dir = tempfile.mkdtemp(prefix="sstmerge-", dir=os.path.dirname(os.path.abspath(out_path)))
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            tasks = [(shard, f"{i:05d}", chunk_rows, separator, tmp_dir) for i, shard in enumerate(shards)]
+            runs = [run for shard_runs in pool.map(_sort_shard, tasks) for run in shard_runs]
+
+            # Merge groups of fan_in runs in parallel until one final merge remains.
+            # Intermediate merges keep duplicates; the final pass drops them in shard order.
+            level = 0
+            while len(runs) > fan_in:
+                groups = [runs[i:i + fan_in] for i in range(0, len(runs), fan_in)]
+                tasks = [(group, os.path.join(tmp_dir, f"merge-{level}-{i:05d}.csv"), separator)
+                         for i, group in enumerate(groups)]
+                runs = list(pool.map(_merge_group, tasks))
+                level += 1
+
+        return _merge_runs(runs, out_path, separator, header=header, dedupe=dedupe)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge per-rank SST statistics shards")
+    parser.add_argument("out", help="merged CSV to write")
+    parser.add_argument("shards", nargs="+", help="per-rank statistics CSV files, in rank order")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-rows", type=int, default=1 << 20)
+    parser.add_argument("--keep-duplicates", action="store_true")
+    args = parser.parse_args()
+    n = merge_shards(args.shards, args.out, workers=args.workers, chunk_rows=args.chunk_rows,
+                     dedupe=not args.keep_duplicates)
+    print(f"Merged {len(args.shards)} shards into {args.out} ({n} records)")
@@ -0,0 +1,117 @@
+"""
+Batch hop-count engine for 2D mesh topologies.
+
+Manhattan distance splits per axis, so the all-pairs hop sum is computed from
+the sorted x and y coordinate marginals in O(n log n), and the full hop
+histogram from the 2D autocorrelation of the rank occupancy grid (one FFT)
+instead of a Python loop over every rank pair.
+"""
+from collections import Counter
+
+import numpy as np
+
+from sst_analysis.hops import ENDPOINT_HOPS, counter_from_bincount
+
+
+def axis_pair_sum(values):
+    """
+    Sum of |v_i - v_j| over all unordered pairs i < j, in O(n log n).
+    """
+    v = np.sort(np.asarray(values, dtype=np.int64))
+    n = v.size
+    weights = 2 * np.arange(n, dtype=np.int64) - (n - 1)
+    return int(np.dot(v, weights))
+
+
+def _occupancy_grid(x, y):
+    # Shift to the bounding box of the ranks so the grid stays small
+    x = x - x.min()
+    y = y - y.min()
+    grid = np.zeros((int(x.max()) + 1, int(y.max()) + 1), dtype=np.float64)
+    np.add.at(grid, (x, y), 1.0)
+    return grid
+
+
+def _distance_counts_fft(x, y):
+    grid = _occupancy_grid(x, y)
+    dim_x, dim_y = grid.shape
+    # Zero-pad so the circular autocorrelation equals the linear one
+    pad = (2 * dim_x - 1, 2 * dim_y - 1)
+    spectrum = np.fft.rfft2(grid, pad)
+    auto = np.fft.irfft2(spectrum * np.conj(spectrum), pad)
+    counts = np.rint(auto).astype(np.int64)
+
+    ix = np.arange(pad[0])
+    iy = np.arange(pad[1])
+    dx = np.minimum(ix, pad[0] - ix)
+    dy = np.minimum(iy, pad[1] - iy)
+    dist = dx[:, None] + dy[None, :]
+    hist = np.bincount(dist.ravel(), weights=counts.ravel())
+    hist = np.rint(hist).astype(np.int64)
+    hist[0] -= x.size  # drop the i == j pairs
+    return hist
+
+
+def _distance_counts_direct(x, y):
+    dist = np.abs(x[:, None] - x[None, :]) + np.abs(y[:, None] - y[None, :])
+    hist = np.bincount(dist.ravel())
+    hist[0] -= x.size
+    return hist
+
+
+def manhattan_hop_histogram(x, y, endpoint_hops=ENDPOINT_HOPS):
+    """
+    Counter of hop count -> number of ordered rank pairs (i != j).
+
+    Uses a direct NumPy broadcast for small jobs and an FFT autocorrelation of
+    the occupancy grid when the job is large compared to the area it covers.
+    """
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    if x.size < 2:
+        return Counter()
+
+    span_x = int(x.max() - x.min()) + 1
+    span_y = int(y.max() - y.min()) + 1
+    if x.size * x.size <= 4 * span_x * span_y:
+        hist = _distance_counts_direct(x, y)
+    else:
+        hist = _distance_counts_fft(x, y)
+
+    return counter_from_bincount(hist, endpoint_hops)
+
+
+def all_pairs_hop_stats(x, y, endpoint_hops=ENDPOINT_HOPS, histogram=True):
+    """
+    Average hop count and histogram over all ordered rank pairs (i != j).
+
+    Returns (avg, hop_counter), like calculate_job_hop_count() in the
+    torus and dragonfly scripts.
+    """
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    n = x.size
+    if n < 2:
+        return 0, Counter()
+
+    pairs = n * (n - 1)
+    total = 2 * (axis_pair_sum(x) + axis_pair_sum(y)) + endpoint_hops * pairs
+    avg = total / pairs
+    hop_counter = manhattan_hop_histogram(x, y, endpoint_hops) if histogram else Counter()
+    return avg, hop_counter
+
+
+def root_hop_stats(x, y, root, endpoint_hops=ENDPOINT_HOPS):
+    """
+    Average hop count and histogram from one root rank to every other rank.
+    """
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    if x.size < 2:
+        return 0, Counter()
+
+    dist = np.abs(x - x[root]) + np.abs(y - y[root]) + endpoint_hops
+    dist = np.delete(dist, root)
+    hist = np.bincount(dist)
+    hop_counter = counter_from_bincount(hist, 0)
+    return dist.sum() / dist.size, hop_counter
@@ -0,0 +1,258 @@
+"""
+Multi-process hop histograms of many jobs, with the distance table and the
+allocation in shared memory.
+
+hop_histograms() places three arrays in multiprocessing.shared_memory blocks
+that every worker maps instead of receiving a copy:
+
+    table       router x router distance table (uint8 unless the topology
+                needs more), filled in row blocks by the workers
+    nodes       the concatenated rank -> node maps of all jobs
+    occupancy   per job, its occupied routers and members on each
+
+The work then runs in three phases of pool tasks:
+
+1. rows of the distance table, from model.router_distance (PolarFly's
+   matrix is copied in directly);
+2. router occupancy of chunks of `rank_chunk` ranks of every job, summed
+   per job;
+3. histograms of blocks of occupied router rows of every job, about
+   `block_pairs` router pairs each, weighted by the occupancy products (as in
+   polarfly.all_pairs_hop_histogram), or one row from the root's router.
+
+Per-task histograms are summed per job at the end. A large job is spread
+over all workers, and many small jobs are too. The tasks are independent and
+return only bincounts; workers=1 runs them in this process, which avoids the
+pool's start-up cost on small mixes.
+
+Patterns follow the dragonfly and torus hop scripts: Scatter and Bcast count
+arg.root -> every other rank, all others every ordered pair of distinct
+ranks.
+
+    python -m sst_analysis.parallel spec.json [more specs] --workers 64
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from sst_analysis.hops import counter_from_bincount, histogram_average
+from sst_analysis.jobs import ROOT_PATTERNS, job_root
+from sst_analysis.topology import DistanceMatrixModel, DragonflyModel, MeshModel, TorusModel
+
+# Shared blocks attached by this process, by block name
+_attached = {}
+# Topology model of the current pool, set by the pool initializer
+_model = None
+
+
+class SharedArrays:
+    """
+    Numpy arrays in shared memory blocks owned by this process. spec(name)
+    is a picklable handle that view() turns back into the array in any
+    process; close() releases and removes all blocks.
+    """
+
+    def __init__(self):
+        self._blocks = {}
+        self._specs = {}
+
+    def create(self, name, shape, dtype):
+        dtype = np.dtype(dtype)
+        shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+        self._blocks[name] = shm
+        self._specs[name] = (shm.name, tuple(shape), dtype.str)
+        return np.ndarray(shape, dtype, buffer=shm.buf)
+
+    def spec(self, name):
+        return self._specs[name]
+
+    def close(self):
+        for shm in self._blocks.values():
+            shm.close()
+            shm.unlink()
+        self._blocks.clear()
+        self._specs.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def view(spec):
+    """
+    The array behind a SharedArrays spec, attaching its block on first use.
+    """
+    name, shape, dtype = spec
+    if name not in _attached:
+        _attached[name] = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, np.dtype(dtype), buffer=_attached[name].buf)
+
+
+def _set_model(model):
+    global _model
+    _model = model
+
+
+def distance_dtype(model):
+    """
+    Smallest unsigned dtype holding every router distance of the model.
+    """
+    if isinstance(model, TorusModel):
+        bound = sum(d // 2 for d in model.shape)
+    elif isinstance(model, MeshModel):
+        bound = sum(d - 1 for d in model.shape)
+    elif isinstance(model, DragonflyModel):
+        bound = 3
+    elif isinstance(model, DistanceMatrixModel):
+        return model.dist.dtype
+    else:
+        bound = 1 << 16
+    return np.min_scalar_type(bound)
+
+
+def _fill_rows(task):
+    # Pool task: rows lo..hi of the distance table
+    table, lo, hi = task
+    out = view(table)
+    out[lo:hi] = _model.router_distance(np.arange(lo, hi)[:, None], np.arange(out.shape[1])[None, :])
+
+
+def _count_routers(task):
+    # Pool task: members per router of ranks lo..hi of one job
+    job, nodes, lo, hi, hosts_per_router, num_routers = task
+    return job, np.bincount(view(nodes)[lo:hi] // hosts_per_router, minlength=num_routers)
+
+
+def _pair_block(task):
+    # Pool task: distance bincount of occupied router rows lo..hi against all of the job's routers
+    job, table, occupancy, start, end, lo, hi, root_router = task
+    dist = view(table)
+    occupied, mult = view(occupancy)[:, start:end]
+    if root_router is not None:
+        return job, np.bincount(dist[root_router, occupied], weights=mult)
+    sub = dist[occupied[lo:hi, None], occupied[None, :]]
+    return job, np.bincount(sub.ravel(), weights=np.outer(mult[lo:hi], mult).ravel())
+
+
+def _run(pool, function, tasks):
+    return pool.map(function, tasks) if pool is not None else map(function, tasks)
+
+
+def _add(total, counts):
+    if counts.size > total.size:
+        counts = counts.astype(np.float64)
+        counts[:total.size] += total
+        return counts
+    total[:counts.size] += counts
+    return total
+
+
+def _totals(shared, pool, model, jobs, maps, block_pairs, rank_chunk):
+    # The three phases; returns the router distance bincount of every job
+    num_routers = model.num_routers
+    hosts = model.hosts_per_router
+    table = shared.create("table", (num_routers, num_routers), distance_dtype(model))
+    if isinstance(model, DistanceMatrixModel):
+        table[:] = model.dist
+    else:
+        rows = max(1, block_pairs // max(num_routers, 1))
+        list(_run(pool, _fill_rows, [(shared.spec("table"), lo, min(lo + rows, num_routers))
+                                     for lo in range(0, num_routers, rows)]))
+
+    offsets = np.concatenate([[0], np.cumsum([m.size for m in maps])]).astype(np.int64)
+    nodes = shared.create("nodes", (int(offsets[-1]),), np.int64)
+    for m, lo in zip(maps, offsets):
+        nodes[lo:lo + m.size] = m
+    tasks = [(job, shared.spec("nodes"), lo, min(lo + rank_chunk, offsets[job + 1]), hosts, num_routers)
+             for job in range(len(maps)) for lo in range(offsets[job], offsets[job + 1], rank_chunk)]
+    counts = [np.zeros(num_routers, dtype=np.int64) for _ in maps]
+    for job, c in _run(pool, _count_routers, tasks):
+        counts[job] += c
+
+    occupied = [np.flatnonzero(c) for c in counts]
+    bounds = np.concatenate([[0], np.cumsum([o.size for o in occupied])]).astype(np.int64)
+    occupancy = shared.create("occupancy", (2, int(bounds[-1])), np.int64)
+    for job, o in enumerate(occupied):
+        occupancy[0, bounds[job]:bounds[job + 1]] = o
+        occupancy[1, bounds[job]:bounds[job + 1]] = counts[job][o]
+
+    tasks = []
+    for job, (spec, o) in enumerate(zip(jobs, occupied)):
+        if maps[job].size < 2:
+            continue
+        common = (job, shared.spec("table"), shared.spec("occupancy"), bounds[job], bounds[job + 1])
+        if spec["pattern"] in ROOT_PATTERNS:
+            tasks.append(common + (0, 0, int(maps[job][job_root(spec)]) // hosts))
+        else:
+            rows = max(1, block_pairs // o.size)
+            tasks += [common + (lo, min(lo + rows, o.size), None) for lo in range(0, o.size, rows)]
+    # Biggest blocks first, so the pool does not finish on a straggler
+    tasks.sort(key=lambda t: -(t[6] - t[5]) * (t[4] - t[3]))
+    totals = [np.zeros(1) for _ in maps]
+    for job, hist in _run(pool, _pair_block, tasks):
+        totals[job] = _add(totals[job], hist)
+    return totals
+
+
+def hop_histograms(model, jobs, maps, workers=None, block_pairs=1 << 24, rank_chunk=1 << 22):
+    """
+    Hop Counter of every job (ranks placed by the rank -> node maps) under
+    minimal routing, computed by `workers` processes (default: all cores;
+    1 runs in this process).
+    """
+    maps = [np.asarray(nodes, dtype=np.int64) for nodes in maps]
+    _set_model(model)
+    # PolarFly's matrix is copied into shared memory by this process, so workers need no model
+    shipped = None if isinstance(model, DistanceMatrixModel) else model
+    pool = None if workers == 1 else ProcessPoolExecutor(max_workers=workers, initializer=_set_model,
+                                                         initargs=(shipped,))
+    with SharedArrays() as shared:
+        try:
+            totals = _totals(shared, pool, model, jobs, maps, block_pairs, rank_chunk)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            for shm in _attached.values():
+                shm.close()
+            _attached.clear()
+
+    result = []
+    for spec, nodes, hist in zip(jobs, maps, totals):
+        if nodes.size < 2:
+            result.append(counter_from_bincount([]))
+            continue
+        hist = np.rint(hist).astype(np.int64)
+        # Drop each rank's pair with itself (the root's, for root patterns)
+        hist[0] -= 1 if spec["pattern"] in ROOT_PATTERNS else nodes.size
+        result.append(counter_from_bincount(hist))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel hop histograms of the jobs in one or more specs")
+    parser.add_argument("spec", nargs="+", help="specs with 'topology' and 'jobs' (sweep format)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for random allocation")
+    args = parser.parse_args()
+
+    from sst_analysis.allocation import allocate
+    from sst_analysis.topology import model_from_topology
+
+    for path in args.spec:
+        with open(path) as f:
+            spec = json.load(f)
+        model = model_from_topology(spec["topology"])
+        jobs = spec["jobs"]
+        maps = allocate(jobs, model.num_nodes, spec.get("allocation", "linear"), seed=args.seed)
+        started = time.perf_counter()
+        histograms = hop_histograms(model, jobs, maps, workers=args.workers)
+        print(f"{spec.get('name', path)}  ({time.perf_counter() - started:.3f} s)")
+        for idx, (job, hist) in enumerate(zip(jobs, histograms)):
+            print(f"  Job {idx + 1}: {job['pattern']} (size={job['size']})  "
+                  f"Average Hop Count: {histogram_average(hist):.2f}  {dict(sorted(hist.items()))}")
@@ -0,0 +1,354 @@
+"""
+Job placement optimizer minimizing total byte-hops over all jobs, or the
+load of the busiest link.
+
+Byte-hops of a placement is sum(bytes * hops) over every communicating pair
+of every job (traffic from traffic.TrafficMatrix, hops from a topology.py
+distance model). The max-link-load objective routes the same pairs with
+linkload.py. optimize_placement() works in two stages:
+
+1. Greedy seeding: jobs are placed in order of decreasing traffic volume, each
+   on the free nodes nearest to the lowest-numbered free node. The
+   heaviest-communicating ranks (e.g. a Bcast root) get the nearest nodes.
+   If the "linear" allocation scores better, annealing starts from it instead,
+   so the result is never worse than linear.
+2. Simulated annealing over two moves: swapping the nodes of two ranks from
+   any jobs, and moving a rank to a free node. The cost change of a move only
+   involves the moved ranks' communication partners, so one move costs
+   O(job size) distance lookups (plus one pass over the link loads for the
+   max-link-load objective).
+
+The result is one node list per job, in rank order. It can be handed to
+merlin as system.allocateNodes(ep, "indexed", nodes); write_allocation()
+stores the lists as JSON. compare_placements() reports byte-hops against the
+"linear" and "random" policies of allocation.py.
+
+    python -m sst_analysis.placement spec.json --out allocation.json
+
+The spec uses the sweep-spec format (see sweep.py) with "topology" and "jobs";
+PolarFly topologies also need "adjacency": "path/to/PolarFly.q_25.txt".
+"""
+import argparse
+import json
+
+import numpy as np
+
+from sst_analysis.allocation import allocate
+from sst_analysis.linkload import job_link_loads, num_links, route_incidence, supports_routing
+from sst_analysis.topology import model_from_topology
+from sst_analysis.traffic import TrafficMatrix
+
+
+def comm_graph(jobs):
+    """
+    Symmetric communication graph over the ranks of all jobs, in CSR form.
+
+    Rank r of job j has the global index offsets[j] + r. Returns (offsets,
+    indptr, neighbours, weights) where weights[k] is the bytes sent in both
+    directions between a rank and its k-th neighbour.
+    """
+    traffic = TrafficMatrix.from_jobs(jobs)
+    offsets = traffic.offsets
+    total = traffic.size
+
+    src, dst, nbytes = traffic.to_coo()
+    rows = np.concatenate([src, dst])
+    cols = np.concatenate([dst, src])
+    weights = np.concatenate([nbytes, nbytes])
+
+    # Sum duplicate (row, col) entries, e.g. the two directions of a pair
+    keys, inverse = np.unique(rows * total + cols, return_inverse=True)
+    summed = np.bincount(inverse, weights=weights).astype(np.float64)
+    rows, cols = keys // total, keys % total
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=total))]).astype(np.int64)
+    return offsets, indptr, cols.astype(np.int64), summed
+
+
+def byte_hops(model, jobs, maps):
+    """
+    Total byte-hops of each job for the given rank -> node maps.
+    """
+    return [TrafficMatrix.from_job(job).map_ranks(nodes, model.num_nodes).byte_hops(model)
+            for job, nodes in zip(jobs, maps)]
+
+
+def placement_cost(model, jobs, maps, objective="byte_hops"):
+    """
+    Total byte-hops, or the bytes on the busiest link, of a placement.
+    """
+    if objective == "byte_hops":
+        return float(sum(byte_hops(model, jobs, maps)))
+    if objective == "max_link_load":
+        loads = job_link_loads(model, jobs, maps)
+        return float(loads.max()) if loads.size else 0.0
+    raise ValueError(f"unknown objective {objective!r}")
+
+
+def greedy_placement(jobs, model, indptr=None, weights=None, offsets=None):
+    """
+    Place jobs one at a time, largest traffic first, on compact node sets.
+    """
+    if indptr is None:
+        offsets, indptr, _, weights = comm_graph(jobs)
+    if sum(job["size"] for job in jobs) > model.num_nodes:
+        raise ValueError(f"jobs need more than the {model.num_nodes} nodes of the topology")
+
+    volume = np.bincount(np.repeat(np.arange(indptr.size - 1), np.diff(indptr)), weights=weights,
+                         minlength=indptr.size - 1)
+    job_volume = [volume[offsets[j]:offsets[j + 1]].sum() for j in range(len(jobs))]
+
+    free = np.ones(model.num_nodes, dtype=bool)
+    maps = [None] * len(jobs)
+    for j in sorted(range(len(jobs)), key=lambda j: -job_volume[j]):
+        candidates = np.flatnonzero(free)
+        near = model.distance(np.full(candidates.size, candidates[0]), candidates)
+        nodes = candidates[np.argsort(near, kind="stable")[:jobs[j]["size"]]]
+        # Heaviest ranks on the nodes closest to the seed node
+        ranks = np.argsort(-volume[offsets[j]:offsets[j + 1]], kind="stable")
+        placed = np.empty(jobs[j]["size"], dtype=np.int64)
+        placed[ranks] = nodes
+        maps[j] = placed
+        free[nodes] = False
+    return maps
+
+
+class ByteHopCost:
+    """
+    Total byte-hops as an annealing cost. graph is (indptr, neighbours,
+    weights) from comm_graph(); the model's distance must be symmetric.
+    """
+
+    def __init__(self, model, graph, assign):
+        self.model = model
+        self.indptr, self.nbrs, self.weights = graph
+        self.assign = assign
+        self.active = np.flatnonzero(np.diff(self.indptr) > 0)
+
+    def _partial(self, rank, node, skip):
+        lo, hi = self.indptr[rank], self.indptr[rank + 1]
+        partners = self.nbrs[lo:hi]
+        d = self.model.distance(np.full(partners.size, node), self.assign[partners])
+        w = self.weights[lo:hi]
+        if skip >= 0:
+            w = np.where(partners == skip, 0.0, w)
+        return float(np.dot(w, d))
+
+    def delta(self, a, target, b):
+        # Cost change of putting rank a on node `target` and rank b (if any) on a's node
+        p = self.assign[a]
+        delta = self._partial(a, target, b) - self._partial(a, p, b)
+        if b >= 0:
+            delta += self._partial(b, p, a) - self._partial(b, target, a)
+        return delta
+
+    def commit(self):
+        pass
+
+
+class MaxLinkLoadCost:
+    """
+    Bytes on the most loaded link under minimal routing (see linkload.py) as
+    an annealing cost. A move re-routes only the pairs of the moved ranks.
+    """
+
+    def __init__(self, model, jobs, assign):
+        self.model = model
+        self.assign = assign
+        src, dst, nbytes = TrafficMatrix.from_jobs(jobs).to_coo()
+        self.src = src.astype(np.int64)
+        self.dst = dst.astype(np.int64)
+        self.nbytes = nbytes.astype(np.float64)
+        num_ranks = assign.size
+        self.out_order = np.argsort(self.src, kind="stable")
+        self.out_ptr = np.concatenate([[0], np.cumsum(np.bincount(self.src, minlength=num_ranks))])
+        self.in_order = np.argsort(self.dst, kind="stable")
+        self.in_ptr = np.concatenate([[0], np.cumsum(np.bincount(self.dst, minlength=num_ranks))])
+        self.active = np.flatnonzero((np.diff(self.out_ptr) + np.diff(self.in_ptr)) > 0)
+
+        self.num_links = num_links(model)
+        self.loads = self._loads(np.arange(self.src.size))
+        self.cost = self.loads.max() if self.loads.size else 0.0
+        self._pending = None
+
+    def _loads(self, edges):
+        ra = self.model.router_of(self.assign[self.src[edges]])
+        rb = self.model.router_of(self.assign[self.dst[edges]])
+        pair, link = route_incidence(self.model, ra, rb)
+        return np.bincount(link, weights=self.nbytes[edges][pair], minlength=self.num_links)
+
+    def _edges(self, rank):
+        return np.concatenate([self.out_order[self.out_ptr[rank]:self.out_ptr[rank + 1]],
+                               self.in_order[self.in_ptr[rank]:self.in_ptr[rank + 1]]])
+
+    def delta(self, a, target, b):
+        edges = self._edges(a) if b < 0 else np.unique(np.concatenate([self._edges(a), self._edges(b)]))
+        p = self.assign[a]
+        old = self._loads(edges)
+        self.assign[a] = target
+        if b >= 0:
+            self.assign[b] = p
+        new = self._loads(edges)
+        self.assign[a] = p
+        if b >= 0:
+            self.assign[b] = target
+        loads = self.loads - old + new
+        cost = loads.max()
+        self._pending = (loads, cost)
+        return float(cost - self.cost)
+
+    def commit(self):
+        self.loads, self.cost = self._pending
+
+
+def anneal(cost, assign, num_nodes, iterations=100000, seed=None, free_move_prob=0.2,
+           t_start=None, t_end_ratio=1e-3):
+    """
+    Simulated annealing over a global rank -> node array, modified in place.
+
+    cost is a ByteHopCost or MaxLinkLoadCost built on the same assign array.
+    assign ends up holding the best placement seen; returns its change in cost.
+    """
+    rng = np.random.default_rng(seed)
+    num_ranks = assign.size
+    owner = np.full(num_nodes, -1, dtype=np.int64)
+    owner[assign] = np.arange(num_ranks)
+    free = np.flatnonzero(owner < 0)
+    free_pos = np.full(num_nodes, -1, dtype=np.int64)
+    free_pos[free] = np.arange(free.size)
+    active = cost.active
+    if active.size == 0 or iterations <= 0:
+        return 0.0
+
+    def draw_target(u):
+        if free.size and u < free_move_prob:
+            return free[rng.integers(free.size)]
+        return assign[rng.integers(num_ranks)]
+
+    if t_start is None:
+        # Start at a fraction of a typical random move's cost change
+        samples = [abs(cost.delta(a, t, owner[t])) for a, t in
+                   ((a, draw_target(u)) for a, u in zip(rng.choice(active, 200), rng.random(200)))
+                   if t != assign[a]]
+        t_start = max(0.05 * np.mean(samples), 1e-9) if samples else 1e-9
+    cooling = t_end_ratio ** (1.0 / iterations)
+
+    temperature = t_start
+    total = best_total = 0.0
+    best = assign.copy()
+    picks = rng.choice(active, iterations)
+    kinds = rng.random(iterations)
+    accept = rng.random(iterations)
+    for it in range(iterations):
+        a = picks[it]
+        target = draw_target(kinds[it])
+        temperature *= cooling
+        if target == assign[a]:
+            continue
+        b = owner[target]
+        delta = cost.delta(a, target, b)
+        if delta > 0 and accept[it] >= np.exp(-delta / temperature):
+            continue
+        cost.commit()
+        p = assign[a]
+        assign[a] = target
+        owner[target] = a
+        if b >= 0:
+            assign[b] = p
+            owner[p] = b
+        else:
+            owner[p] = -1
+            k = free_pos[target]
+            free[k] = p
+            free_pos[p] = k
+            free_pos[target] = -1
+        total += delta
+        if total < best_total:
+            best_total = total
+            best[:] = assign
+    assign[:] = best
+    return best_total
+
+
+def optimize_placement(jobs, model, iterations=100000, seed=None, objective="byte_hops"):
+    """
+    Greedy-seeded, annealed rank -> node maps (one int64 array per job).
+
+    objective is "byte_hops" or "max_link_load" (mesh, torus and dragonfly
+    only, as it needs the routes of linkload.py).
+    """
+    offsets, indptr, nbrs, weights = comm_graph(jobs)
+    starts = [greedy_placement(jobs, model, indptr, weights, offsets), allocate(jobs, model.num_nodes, "linear")]
+    maps = min(starts, key=lambda start: placement_cost(model, jobs, start, objective))
+    assign = np.concatenate(maps) if maps else np.zeros(0, dtype=np.int64)
+    if objective == "byte_hops":
+        cost = ByteHopCost(model, (indptr, nbrs, weights), assign)
+    elif objective == "max_link_load":
+        cost = MaxLinkLoadCost(model, jobs, assign)
+    else:
+        raise ValueError(f"unknown objective {objective!r}")
+    anneal(cost, assign, model.num_nodes, iterations, seed)
+    return [assign[offsets[j]:offsets[j + 1]].copy() for j in range(len(jobs))]
+
+
+def compare_placements(jobs, model, maps, seed=None):
+    """
+    Byte-hops of `maps` next to the linear and random policies.
+
+    Returns {policy: {"byte_hops", "avg_hops", "per_job", "max_link_load",
+    "reduction"}} where avg_hops is the byte-weighted mean hop count and
+    reduction the fraction of the policy's byte-hops saved by `maps` (only for
+    the baselines). max_link_load is None for topologies without routes.
+    """
+    total_bytes = float(TrafficMatrix.from_jobs(jobs).total_bytes())
+    policies = {
+        "optimized": maps,
+        "linear": allocate(jobs, model.num_nodes, "linear"),
+        "random": allocate(jobs, model.num_nodes, "random", seed),
+    }
+    report = {}
+    for name, policy_maps in policies.items():
+        per_job = byte_hops(model, jobs, policy_maps)
+        report[name] = {"byte_hops": sum(per_job), "per_job": per_job,
+                        "avg_hops": sum(per_job) / total_bytes if total_bytes else 0.0,
+                        "max_link_load": (float(job_link_loads(model, jobs, policy_maps).max())
+                                          if supports_routing(model) else None)}
+    best = report["optimized"]["byte_hops"]
+    for name in ("linear", "random"):
+        base = report[name]["byte_hops"]
+        report[name]["reduction"] = (base - best) / base if base else 0.0
+    return report
+
+
+def write_allocation(path, jobs, maps):
+    """
+    JSON list of {"job", "pattern", "size", "nodes"} entries, nodes in rank order.
+    """
+    entries = [{"job": i, "pattern": job["pattern"], "size": job["size"],
+                "nodes": [int(n) for n in nodes]} for i, (job, nodes) in enumerate(zip(jobs, maps))]
+    with open(path, "w") as f:
+        json.dump(entries, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimize job placement for byte-weighted hop count")
+    parser.add_argument("spec", help="spec with 'topology' and 'jobs' (sweep format)")
+    parser.add_argument("--out", default="allocation.json")
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--objective", choices=("byte_hops", "max_link_load"), default="byte_hops")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    model = model_from_topology(spec["topology"])
+    jobs = spec["jobs"]
+    maps = optimize_placement(jobs, model, args.iterations, args.seed, args.objective)
+    write_allocation(args.out, jobs, maps)
+
+    report = compare_placements(jobs, model, maps, args.seed)
+    print(f"{'Policy':<10} {'Byte-hops':>16} {'Avg hops':>9} {'Reduction':>10} {'Max link load':>14}")
+    for name, row in report.items():
+        reduction = f"{row['reduction']:.1%}" if "reduction" in row else ""
+        peak = f"{row['max_link_load']:.0f}" if row["max_link_load"] is not None else "-"
+        print(f"{name:<10} {row['byte_hops']:>16.0f} {row['avg_hops']:>9.3f} {reduction:>10} {peak:>14}")
+    print(f"Allocation written to {args.out}; use system.allocateNodes(ep, \"indexed\", nodes) per job")
@@ -0,0 +1,303 @@
+"""
+PolarFly adjacency files and all-pairs router distances.
+
+The PolarFly.q_*.txt files list the router count and edge count on the first
+line, then the neighbours of router i on line i + 1. They are parsed into a
+CSR adjacency (indptr, indices). All-pairs distances come from a bitset-
+parallel BFS that advances 64 sources per uint64 word. The matrix is stored as
+a uint8 .npy cache keyed by the file's SHA-256, and later runs memory-map it
+instead of recomputing.
+
+polarfly_adjacency(q) builds the same graph for any prime power q without a
+file: ER_q, whose routers are the points of the projective plane over GF(q)
+and whose links join points u, v with u . v = 0. write_adjacency() stores it
+in the file format above.
+
+    python -m sst_analysis.polarfly 127 [-o PolarFly.q_127.txt]
+"""
+import argparse
+import hashlib
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+from sst_analysis.hops import ENDPOINT_HOPS, counter_from_bincount
+
+# Distance stored for router pairs that are not connected
+UNREACHABLE = 255
+
+# uint64 words of sources advanced together by one BFS sweep (64 sources per word)
+BFS_BLOCK_WORDS = 64
+
+
+def read_adjacency(path):
+    """
+    Parse a PolarFly adjacency file into CSR arrays (indptr, indices) of int32.
+    """
+    with open(path) as f:
+        header = f.readline().split()
+        num_routers = int(header[0])
+        rows = [np.array(line.split(), dtype=np.int32) for _, line in zip(range(num_routers), f)]
+
+    if len(rows) != num_routers:
+        raise ValueError(f"{path}: expected {num_routers} adjacency lines, found {len(rows)}")
+
+    degrees = np.array([r.size for r in rows], dtype=np.int64)
+    indptr = np.zeros(num_routers + 1, dtype=np.int64)
+    np.cumsum(degrees, out=indptr[1:])
+    indices = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32)
+    return indptr, indices
+
+
+def write_adjacency(path, indptr, indices):
+    """
+    Write CSR adjacency arrays as a PolarFly adjacency file (the format
+    read_adjacency() parses).
+    """
+    values = indices.tolist()
+    bounds = indptr.tolist()
+    lines = [f"{indptr.size - 1} {indices.size // 2}"]
+    lines += [" ".join(map(str, values[lo:hi])) + " " for lo, hi in zip(bounds[:-1], bounds[1:])]
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _prime_power(q):
+    # (p, m) with q = p ** m
+    if q < 2:
+        raise ValueError(f"q={q} is not a prime power")
+    p = next(d for d in range(2, q + 1) if q % d == 0)
+    m, rest = 0, q
+    while rest % p == 0:
+        rest //= p
+        m += 1
+    if rest != 1:
+        raise ValueError(f"q={q} is not a prime power")
+    return p, m
+
+
+def _poly_products(digits, p, low):
+    # Coefficients of the products of all element pairs, reduced modulo x^m + low(x)
+    m = digits.shape[1]
+    prod = np.zeros((digits.shape[0], digits.shape[0], 2 * m - 1), dtype=np.int64)
+    for i in range(m):
+        for j in range(m):
+            prod[:, :, i + j] += np.outer(digits[:, i], digits[:, j])
+    for k in range(2 * m - 2, m - 1, -1):
+        top = prod[:, :, k] % p
+        prod[:, :, k - m:k] -= top[:, :, None] * low
+    return prod[:, :, :m] % p
+
+
+def field_tables(q):
+    """
+    Arithmetic of GF(q), q = p^m, as (add, mul, neg, inv) arrays: add and
+    mul are q x q tables, neg and inv map each element to its negative and
+    inverse (inv[0] = 0).
+
+    Element c0 + c1 p + ... + c(m-1) p^(m-1) stands for the polynomial
+    c0 + c1 x + ... modulo p and the monic irreducible polynomial of degree m
+    with the smallest such code, which gives the numbering of the shipped
+    PolarFly.q_25.txt.
+    """
+    p, m = _prime_power(q)
+    weights = p ** np.arange(m, dtype=np.int64)
+    digits = np.arange(q, dtype=np.int64)[:, None] // weights % p
+    add = ((digits[:, None, :] + digits[None, :, :]) % p) @ weights
+    for code in range(q):
+        # x^m + low(x) is irreducible iff no two non-zero elements multiply to zero
+        mul = _poly_products(digits, p, digits[code]) @ weights
+        if np.all(mul[1:, 1:]):
+            break
+    neg = np.argmax(add == 0, axis=1)
+    inv = np.argmax(mul == 1, axis=1)
+    return add, mul, neg, inv
+
+
+def polarfly_adjacency(q):
+    """
+    CSR adjacency (indptr, indices) of the PolarFly graph ER_q for a prime
+    power q, numbered like the PolarFly.q_*.txt files: point [x, y, 1] is
+    router x * q + y, [x, 1, 0] is q^2 + x and [1, 0, 0] is q^2 + q.
+
+    Every router's q + 1 neighbour candidates (its polar line) are solved
+    for directly, all routers at once; a router on its own line (u . u = 0)
+    keeps the other q.
+    """
+    add, mul, neg, inv = field_tables(q)
+    n = q * q + q + 1
+    router = np.arange(n, dtype=np.int64)
+    u = np.zeros((3, n), dtype=np.int64)
+    u[0, :q * q], u[1, :q * q], u[2, :q * q] = router[:q * q] // q, router[:q * q] % q, 1
+    u[0, q * q:n - 1], u[1, q * q:n - 1] = np.arange(q), 1
+    u[0, n - 1] = 1
+
+    line = np.empty((n, q + 1), dtype=np.int64)
+    free = np.arange(q)
+    # u0 != 0: [x, y, 1] with x = -(u1 y + u2) / u0 for every y, and [-u1 / u0, 1, 0]
+    rows = np.flatnonzero(u[0])
+    u0_inv = inv[u[0, rows]][:, None]
+    x = mul[neg[add[mul[u[1, rows, None], free], u[2, rows, None]]], u0_inv]
+    line[rows, :q] = x * q + free
+    line[rows, q] = q * q + mul[neg[u[1, rows, None]], u0_inv][:, 0]
+    # u0 == 0, u1 != 0: [x, -u2 / u1, 1] for every x, and [1, 0, 0]
+    rows = np.flatnonzero((u[0] == 0) & (u[1] != 0))
+    y = mul[neg[u[2, rows]], inv[u[1, rows]]]
+    line[rows, :q] = free * q + y[:, None]
+    line[rows, q] = n - 1
+    # u = [0, 0, 1]: the line at infinity
+    rows = np.flatnonzero((u[0] == 0) & (u[1] == 0))
+    line[rows, :q] = q * q + free
+    line[rows, q] = n - 1
+
+    line.sort(axis=1)
+    keep = line != router[:, None]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(keep.sum(axis=1), out=indptr[1:])
+    return indptr, line[keep].astype(np.int32)
+
+
+def _padded_neighbours(indptr, indices):
+    # (n, max_degree) neighbour table; missing slots point at the zero row n
+    n = indptr.size - 1
+    degrees = np.diff(indptr)
+    table = np.full((n, int(degrees.max(initial=0))), n, dtype=np.int64)
+    rows = np.repeat(np.arange(n), degrees)
+    slots = np.arange(indices.size) - np.repeat(indptr[:-1], degrees)
+    table[rows, slots] = indices
+    return table
+
+
+def all_pairs_distances(indptr, indices, out=None):
+    """
+    Router-to-router hop counts for every pair, as an (n, n) uint8 matrix.
+
+    Sources are processed in blocks of BFS_BLOCK_WORDS * 64. Source s is bit
+    (s % 64) of word s // 64 in every router's frontier row, and one BFS step
+    ORs the frontier rows of each router's neighbours. Unreachable pairs are
+    set to UNREACHABLE. `out` may be a preallocated (e.g. memory-mapped)
+    uint8 array.
+    """
+    n = indptr.size - 1
+    dist = np.full((n, n), UNREACHABLE, dtype=np.uint8) if out is None else out
+    if out is not None:
+        dist[:] = UNREACHABLE
+    neighbours = _padded_neighbours(indptr, indices)
+    num_words = (n + 63) // 64
+
+    for w0 in range(0, num_words, BFS_BLOCK_WORDS):
+        w1 = min(num_words, w0 + BFS_BLOCK_WORDS)
+        s0, s1 = 64 * w0, min(n, 64 * w1)
+        sources = np.arange(s0, s1)
+
+        # Row n stays zero so padded neighbour slots contribute nothing
+        frontier = np.zeros((n + 1, w1 - w0), dtype=np.uint64)
+        frontier[sources, (sources - s0) // 64] = np.left_shift(
+            np.uint64(1), ((sources - s0) % 64).astype(np.uint64))
+        visited = frontier[:n].copy()
+        dist[sources, sources] = 0
+        unreached = n * (s1 - s0) - (s1 - s0)
+
+        level = 0
+        while unreached and frontier.any():
+            level += 1
+            if level >= UNREACHABLE:
+                raise ValueError("graph diameter exceeds uint8 distance range")
+            reached = np.zeros((n, w1 - w0), dtype=np.uint64)
+            for k in range(neighbours.shape[1]):
+                reached |= np.take(frontier, neighbours[:, k], axis=0)
+            reached &= ~visited
+            visited |= reached
+            frontier[:n] = reached
+            bits = np.unpackbits(reached.view(np.uint8), axis=1, bitorder="little")
+            bits = bits[:, :s1 - s0].view(bool)
+            np.copyto(dist[:, s0:s1], level, where=bits)
+            unreached -= np.count_nonzero(bits)
+
+    return dist
+
+
+def file_digest(path):
+    """
+    SHA-256 hex digest of a file's contents.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def distance_cache_path(path, cache_dir=None):
+    """
+    Location of the cached distance matrix for an adjacency file.
+    """
+    cache_dir = cache_dir or os.path.dirname(os.path.abspath(path))
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}.{file_digest(path)[:16]}.dist.npy")
+
+
+def load_distance_matrix(path, cache_dir=None):
+    """
+    All-pairs router distances for a PolarFly adjacency file, memory-mapped.
+
+    The first call computes the matrix and writes it to the cache; later calls
+    with an unchanged file return the cached .npy opened with mmap_mode="r".
+    """
+    cache = distance_cache_path(path, cache_dir)
+    if not os.path.exists(cache):
+        indptr, indices = read_adjacency(path)
+        n = indptr.size - 1
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        tmp = cache + f".{os.getpid()}.tmp"
+        out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.uint8, shape=(n, n))
+        all_pairs_distances(indptr, indices, out=out)
+        out.flush()
+        del out
+        os.replace(tmp, cache)
+    return np.load(cache, mmap_mode="r")
+
+
+def all_pairs_hop_histogram(nodes, dist, hosts_per_router, endpoint_hops=ENDPOINT_HOPS):
+    """
+    Counter of hop count -> number of ordered node pairs (i != j) of a job,
+    built from router occupancy and the router distance matrix.
+    """
+    routers = np.asarray(nodes, dtype=np.int64) // hosts_per_router
+    if routers.size < 2:
+        return Counter()
+
+    occupied, mult = np.unique(routers, return_counts=True)
+    sub = np.asarray(dist[np.ix_(occupied, occupied)], dtype=np.int64)
+    hist = np.bincount(sub.ravel(), weights=np.outer(mult, mult).ravel())
+    hist = np.rint(hist).astype(np.int64)
+    hist[0] -= routers.size  # drop the i == j pairs
+    return counter_from_bincount(hist, endpoint_hops)
+
+
+def root_hop_histogram(nodes, root, dist, hosts_per_router, endpoint_hops=ENDPOINT_HOPS):
+    """
+    Counter of hop count -> number of nodes reached from root (root excluded).
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    others = nodes[nodes != root] // hosts_per_router
+    if others.size == 0:
+        return Counter()
+    hops = np.asarray(dist[root // hosts_per_router, others], dtype=np.int64)
+    return counter_from_bincount(np.bincount(hops), endpoint_hops)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the PolarFly adjacency file of a prime power q")
+    parser.add_argument("q", type=int, help="prime power; the graph has q^2 + q + 1 routers of radix q + 1")
+    parser.add_argument("-o", "--output", default=None, help="output file (default: PolarFly.q_<q>.txt)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    indptr, indices = polarfly_adjacency(args.q)
+    elapsed = time.perf_counter() - started
+    output = args.output or f"PolarFly.q_{args.q}.txt"
+    write_adjacency(output, indptr, indices)
+    print(f"q={args.q}: {indptr.size - 1} routers, {indices.size // 2} links in {elapsed:.3f} s -> {output}")
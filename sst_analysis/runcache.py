@@ -0,0 +1,241 @@
+"""
+Content-addressed cache of SST statistics output.
+
+A run is identified by the SHA-256 of its effective configuration in the
+sweep format (see sweep.py): topology fields, router and ReorderLinkControl
+fields, the jobs list, allocation policy, NIC latency and statistic load
+level, plus the version of the sst that ran it, serialized as canonical
+JSON. Before hashing, the settings render_config() defaults are filled in,
+sizes, bandwidths and times are rewritten in bytes, bytes/s and seconds
+("12 GB/s" and "12GB/s" are both "12000000000B/s"), numeric strings become
+numbers and job params become {argument: value} maps. Cosmetic keys such as
+"name" are left out. A hit returns the stored statistics file without
+running SST.
+
+Only configurations in the sweep format can be cached: the hand-written
+configs such as Multijob_2/dragonfly/dragonfly.py are not parsed, so run
+them through a sweep spec (Multijob_2/dragonfly/link_bw_sweep.json
+describes dragonfly.py) to use the cache. Defaults applied inside merlin
+itself are not known here, so leaving out a router setting and writing
+merlin's default for it still give different keys.
+
+Entries live under <root>/<key[:2]>/<key>/ and are tracked in an SQLite index
+with their size and last access time. put() evicts least-recently-used
+entries once the total exceeds max_bytes.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import time
+
+from sst_analysis.sweep import parse_bandwidth, parse_size, parse_time, with_defaults
+
+# Spec keys that do not change simulation results
+COSMETIC_KEYS = ("name", "sweep", "resources")
+
+STATS_NAME = "stats.csv"
+
+
+def _number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def canonical_value(value):
+    """
+    A setting with its units normalized: sizes in B, bandwidths in B/s,
+    times in s, numeric strings as numbers; containers are normalized
+    element-wise.
+    """
+    if isinstance(value, dict):
+        return {k: canonical_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [canonical_value(v) for v in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return _number(value)
+    if re.fullmatch(r"\s*[-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?\s*", value):
+        return _number(value)
+    parsers = ((parse_bandwidth, "B/s"),) if re.search(r"/\s*s\s*$", value) else ((parse_time, "s"), (parse_size, "B"))
+    for parse, unit in parsers:
+        try:
+            return f"{parse(value):.12g}{unit}"
+        except ValueError:
+            pass
+    return value
+
+
+def effective_config(config, version=None):
+    """
+    The configuration a run actually gets: defaults filled in, cosmetic keys
+    dropped, units normalized (canonical_value) and the sst version added.
+    """
+    config = with_defaults(config)
+    effective = {k: canonical_value(v) for k, v in config.items() if k not in COSMETIC_KEYS + ("jobs",)}
+    effective["jobs"] = []
+    for job in config.get("jobs", []):
+        canonical = canonical_value({k: v for k, v in job.items() if k != "params"})
+        canonical["params"] = {key: canonical_value(value) for key, _, value
+                               in (token.partition("=") for token in job["params"].split())}
+        effective["jobs"].append(canonical)
+    effective["sst_version"] = version
+    return effective
+
+
+def canonical_config(config, version=None):
+    """
+    Canonical JSON text of the effective configuration (sorted keys, no
+    whitespace).
+    """
+    return json.dumps(effective_config(config, version), sort_keys=True, separators=(",", ":"))
+
+
+def config_key(config, version=None):
+    """
+    Cache key of a configuration run by sst `version`: SHA-256 hex digest
+    of its canonical JSON.
+    """
+    return hashlib.sha256(canonical_config(config, version).encode()).hexdigest()
+
+
+def flatten_config(config, prefix=""):
+    """
+    {"topology.algorithm": [...], "router.link_bw": "12GB/s", ...} view of a
+    nested configuration. Lists are leaves.
+    """
+    flat = {}
+    for key, value in config.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_config(value, path + "."))
+        else:
+            flat[path] = value
+    return flat
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of statistics files keyed by configuration hash.
+    """
+
+    def __init__(self, root, max_bytes="50GB"):
+        self.root = root
+        self.max_bytes = parse_size(max_bytes)
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"))
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, config TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, config, version=None):
+        """
+        Path of the cached statistics file for config run by sst `version`
+        (see sweep.sst_version), or None on a miss.
+        """
+        key = config_key(config, version)
+        row = self._db.execute("SELECT key FROM entries WHERE key = ?", (key,)).fetchone()
+        path = os.path.join(self._entry_dir(key), STATS_NAME)
+        if row is None or not os.path.exists(path):
+            return None
+        self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        return path
+
+    def put(self, config, stats_path, version=None):
+        """
+        Copy a run's statistics file into the cache and return the cached path.
+        """
+        key = config_key(config, version)
+        text = canonical_config(config, version)
+        entry = self._entry_dir(key)
+        os.makedirs(entry, exist_ok=True)
+        tmp = os.path.join(entry, STATS_NAME + ".tmp")
+        shutil.copyfile(stats_path, tmp)
+        os.replace(tmp, os.path.join(entry, STATS_NAME))
+        with open(os.path.join(entry, "config.json"), "w") as f:
+            f.write(text)
+
+        size = os.path.getsize(os.path.join(entry, STATS_NAME))
+        self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                         (key, text, size, time.time()))
+        self._db.commit()
+        self._evict(keep=key)
+        return os.path.join(entry, STATS_NAME)
+
+    def total_bytes(self):
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _remove(self, keys):
+        for key in keys:
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+        self._db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in keys])
+        self._db.commit()
+
+    def _evict(self, keep=None):
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            victims.append(key)
+            total -= size
+        self._remove(victims)
+
+    def invalidate(self, partial):
+        """
+        Drop every entry whose configuration matches all items of `partial`,
+        given as dotted paths, e.g. {"topology.algorithm": ["ugal"]}. Values
+        are compared after canonical_value(), so "12 GB/s" matches "12GB/s".
+        A list value also matches a configuration list containing only that
+        value repeated, so ["ugal"] matches ["ugal", "ugal"]. Returns the
+        number of entries removed.
+        """
+        partial = {path: canonical_value(value) for path, value in partial.items()}
+        victims = []
+        for key, text in self._db.execute("SELECT key, config FROM entries"):
+            flat = flatten_config(json.loads(text))
+            if all(_matches(flat.get(path), value) for path, value in partial.items()):
+                victims.append(key)
+        self._remove(victims)
+        return len(victims)
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+def _matches(actual, wanted):
+    if actual == wanted:
+        return True
+    if isinstance(actual, list) and isinstance(wanted, list) and len(wanted) == 1:
+        return bool(actual) and all(a == wanted[0] for a in actual)
+    return False
+
+
+def run_cached(cache, config, runner, version=None):
+    """
+    Return the cached statistics path for config, calling runner(config) and
+    storing its statistics file on a miss. runner returns a path or None.
+    """
+    hit = cache.get(config, version)
+    if hit is not None:
+        return hit
+    stats = runner(config)
+    if stats is None:
+        return None
+    return cache.put(config, stats, version)
@@ -0,0 +1,232 @@
+"""
+Monte Carlo hop statistics for jobs too large to enumerate.
+
+sample_hops() estimates the average hop count and the hop histogram of a
+job's communicating pairs (every ordered pair of distinct ranks, or root ->
+every other rank for Scatter/Bcast) from random pairs, measured with a
+topology.py distance model. Pairs are drawn in batches until the confidence
+interval of the average is narrower than `tol` hops (and, with hist_tol,
+every histogram bin's interval narrower than hist_tol). The cost depends on
+the tolerance and the spread of the distances, not on the job size.
+
+    strata=None      pairs drawn uniformly
+    strata="router"  pairs stratified by the routers of both ends
+    strata="group"   by the dragonfly groups of both ends
+    strata=labels    by any per-rank label array
+
+Stratified sampling splits the pairs into cells (source stratum, destination
+stratum) and draws from every cell in proportion to its number of pairs, so
+only the spread within cells counts. Within a router pair a dragonfly,
+mesh or torus distance is constant, and within a group pair it takes at
+most three values. With more than max_cells stratum pairs the cells are
+source strata only, and more strata than max_cells are merged in label
+order. In root mode the cells are destination strata.
+
+Every cell is sampled MIN_CELL_SAMPLES times in the first batch, then in
+proportion to its pairs. The average's interval is the normal interval of
+the stratified estimator.
+Histogram bins use Wilson intervals at their effective sample size. Uniform
+sampling accepts `nodes` as a range and then needs O(1) memory; strata need
+the node array.
+"""
+from collections import Counter
+from statistics import NormalDist
+
+import numpy as np
+
+
+# Samples every cell gets before the proportional ones, so that no cell's
+# share of the pairs goes unmeasured and every cell has a variance estimate
+MIN_CELL_SAMPLES = 2
+
+
+def _take(nodes, index):
+    # nodes[index] for node arrays and ranges alike
+    if isinstance(nodes, range):
+        return nodes.start + index * nodes.step
+    return nodes[index]
+
+
+def _labels(model, nodes, strata):
+    if isinstance(strata, str):
+        if strata == "router":
+            return model.router_of(nodes)
+        if strata == "group":
+            if not hasattr(model, "routers_per_group"):
+                raise ValueError("strata='group' needs a dragonfly model")
+            return model.router_of(nodes) // model.routers_per_group
+        raise ValueError(f"unknown strata {strata!r}, expected 'router', 'group' or a label array")
+    labels = np.asarray(strata)
+    if labels.shape != (len(nodes),):
+        raise ValueError(f"strata has {labels.size} labels for {len(nodes)} ranks")
+    return labels
+
+
+class _Cells:
+    """
+    Sampling cells: every cell draws a source from one segment of `members`
+    and a different destination from another. A segment is a stratum's
+    ranks, all ranks or the root; label[] tells whether a source lies in the
+    destination segment (-1: the all-ranks segment).
+    """
+
+    def __init__(self, size, root, labels, max_cells):
+        self.size = size
+        self.members = None
+        if labels is None:
+            self.label = None
+            a_lo, a_len = (np.array([0]), np.array([size])) if root is None else (np.array([root]), np.array([1]))
+            self._set(a_lo, a_len, np.array([0]), np.array([size]), np.array([-1]))
+            return
+
+        # Stratum of every rank, at most max_cells strata, merged in label order
+        _, label = np.unique(labels, return_inverse=True)
+        label = label.ravel().astype(np.int64)
+        num = int(label.max()) + 1
+        if num > max_cells:
+            label = label * max_cells // num
+            num = max_cells
+        counts = np.bincount(label, minlength=num)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        order = np.argsort(label, kind="stable")
+        self.label = label
+        self.position = np.empty(size, dtype=np.int64)
+        self.position[order] = np.arange(size) - starts[label[order]]
+        # members: ranks by stratum, then every rank in rank order (the all-ranks segment)
+        self.members = np.concatenate([order, np.arange(size, dtype=np.int64)])
+        strata = np.arange(num)
+
+        if root is not None:
+            self._set(np.full(num, size + root), np.ones(num, dtype=np.int64), starts, counts, strata)
+        elif num * num <= max_cells:
+            a = np.repeat(strata, num)
+            b = np.tile(strata, num)
+            self._set(starts[a], counts[a], starts[b], counts[b], b)
+        else:
+            self._set(starts, counts, np.full(num, size), np.full(num, size), np.full(num, -1))
+
+    def _set(self, a_lo, a_len, b_lo, b_len, b_label):
+        a_lo, a_len, b_lo, b_len, b_label = (np.asarray(v, dtype=np.int64) for v in (a_lo, a_len, b_lo, b_len, b_label))
+        # Pairs per cell: sources times destinations, less the source itself when
+        # the source segment lies inside the destination segment
+        if self.label is None:
+            inside = a_len
+        else:
+            # A source segment is one stratum (or the root), labelled by its first rank
+            inside = np.where((b_label == -1) | (self.label[self.members[a_lo]] == b_label), a_len, 0)
+        pairs = a_len * b_len - inside
+        keep = pairs > 0
+        self.a_lo, self.a_len, self.b_lo, self.b_len, self.b_label = (
+            v[keep] for v in (a_lo, a_len, b_lo, b_len, b_label))
+        self.pairs = pairs[keep]
+
+    def _rank(self, index):
+        return index if self.members is None else self.members[index]
+
+    def draw(self, cells, rng):
+        """
+        (src, dst) rank arrays of one random pair from each of `cells`.
+        """
+        a = self.a_lo[cells] + (rng.random(cells.size) * self.a_len[cells]).astype(np.int64)
+        src = self._rank(a)
+        b_len = self.b_len[cells]
+        b_label = self.b_label[cells]
+        if self.label is None:
+            inside = np.ones(cells.size, dtype=bool)
+            position = src
+        else:
+            inside = (b_label == -1) | (self.label[src] == b_label)
+            position = np.where(b_label == -1, src, self.position[src])
+        u = rng.random(cells.size)
+        # Skip the source itself: a uniform offset among the other b_len - 1
+        other = (position + 1 + (u * (b_len - 1)).astype(np.int64)) % np.maximum(b_len, 1)
+        b = np.where(inside, other, (u * b_len).astype(np.int64))
+        return src, self._rank(self.b_lo[cells] + b)
+
+
+def _wilson(p, n, z):
+    # Wilson score interval of proportions p observed over n samples
+    n = np.maximum(n, 1.0)
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return np.clip(centre - half, 0.0, 1.0), np.clip(centre + half, 0.0, 1.0)
+
+
+def sample_hops(model, nodes, root=None, strata=None, tol=0.01, confidence=0.95, hist_tol=None,
+                batch=1 << 16, max_samples=1 << 24, max_cells=1 << 12, seed=None):
+    """
+    Estimated hop statistics of a job's pairs: all ordered pairs of distinct
+    ranks, or root -> every other rank when root (a rank) is given.
+
+    nodes is the job's rank -> node map (array or range). Sampling stops when
+    the average's interval half-width is at most tol hops (and every bin's
+    at most hist_tol, if given) or after max_samples proportional pairs (on
+    top of the MIN_CELL_SAMPLES per cell).
+
+    Returns a dict with "avg_hops", "avg_ci" (lo, hi), "half_width",
+    "histogram" {hops: (fraction, lo, hi)}, "counts" (Counter of estimated
+    pairs per hop count), "pairs" (total), "samples", "cells",
+    "confidence" and "converged".
+    """
+    size = len(nodes)
+    if not isinstance(nodes, range):
+        nodes = np.asarray(nodes, dtype=np.int64)
+    if root is not None and not 0 <= root < size:
+        raise ValueError(f"root {root} is not a rank of a {size}-rank job")
+    labels = None if strata is None else _labels(model, nodes, strata)
+    cells = _Cells(size, root, labels, max_cells)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    result = {"pairs": int(cells.pairs.sum()), "cells": int(cells.pairs.size), "confidence": confidence}
+    if not cells.pairs.size:
+        return dict(result, avg_hops=0.0, avg_ci=(0.0, 0.0), half_width=0.0, histogram={}, counts=Counter(),
+                    samples=0, converged=True)
+
+    rng = np.random.default_rng(seed)
+    share = cells.pairs / cells.pairs.sum()
+    # Randomized systematic allocation: cell c gets floor(N * share + offset) of the first N
+    # proportional samples, and every cell MIN_CELL_SAMPLES more in the first batch
+    offset = rng.random(share.size)
+    num = np.zeros(share.size)
+    total = np.zeros(share.size)
+    squares = np.zeros(share.size)
+    hist = np.zeros((share.size, 0))
+    position = drawn = 0
+    while True:
+        target = min(position + batch, max_samples)
+        quota = (np.floor(target * share + offset) - np.floor(position * share + offset)).astype(np.int64)
+        if position == 0:
+            quota += MIN_CELL_SAMPLES
+        which = np.repeat(np.arange(share.size), quota)
+        position = target
+        drawn += int(quota.sum())
+        src, dst = cells.draw(which, rng)
+        hops = np.asarray(model.distance(_take(nodes, src), _take(nodes, dst)), dtype=np.int64)
+        num += quota
+        total += np.bincount(which, weights=hops, minlength=share.size)
+        squares += np.bincount(which, weights=hops * hops, minlength=share.size)
+        bins = max(hist.shape[1], int(hops.max(initial=0)) + 1)
+        if bins > hist.shape[1]:
+            hist = np.pad(hist, ((0, 0), (0, bins - hist.shape[1])))
+        hist += np.bincount(which * bins + hops, minlength=share.size * bins).reshape(share.size, bins)
+
+        w = share
+        n = num
+        mean_c = total / n
+        var_c = np.maximum(squares / n - mean_c ** 2, 0.0) * n / (n - 1)
+        mean = float(np.dot(w, mean_c))
+        half = z * float(np.sqrt(np.sum(w * w * var_c / n)))
+
+        p_c = hist / n[:, None]
+        p = w @ p_c
+        p_var = (w * w / n) @ (p_c * (1 - p_c))
+        effective = np.where(p_var > 0, p * (1 - p) / np.where(p_var > 0, p_var, 1.0), drawn)
+        lo, hi = _wilson(p, effective, z)
+        converged = half <= tol and (hist_tol is None or float(np.max(hi - lo)) / 2 <= hist_tol)
+        if converged or position >= max_samples:
+            break
+
+    pairs = result["pairs"]
+    return dict(result, avg_hops=mean, avg_ci=(mean - half, mean + half), half_width=half,
+                histogram={h: (float(p[h]), float(lo[h]), float(hi[h])) for h in range(p.size) if p[h] > 0},
+                counts=Counter({h: int(round(p[h] * pairs)) for h in range(p.size) if p[h] > 0}),
+                samples=drawn, converged=converged)
@@ -0,0 +1,285 @@
+"""
+Per-step traffic schedules of the MPI collective algorithms.
+
+A job's pattern and params (jobs.message_bytes, arg.root, arg.iterations)
+expand into the steps of one iteration. Each step is a (src, dst, bytes)
+triple of int64 rank arrays, in which every rank sends at most one message:
+
+    Allreduce  "binomial"            reduce to rank 0, then broadcast (ember's tree)
+               "recursive_doubling"  log2 P exchanges of the whole buffer
+               "rabenseifner"        recursive-halving reduce-scatter, then
+                                     recursive-doubling allgather
+               "ring"                P - 1 reduce-scatter and P - 1 allgather
+                                     steps of one 1/P chunk to the right neighbour
+    Alltoall   "pairwise"            P - 1 steps, rank i -> i XOR k (P a power
+                                     of two) or i + k
+    Bcast      "binomial"            from arg.root
+    Scatter    "binomial"            halving distances from arg.root, every message
+                                     carrying the shares of the receiver's subtree
+    Barrier    "dissemination"       rank i -> i + 2**k, CONTROL_BYTES
+    PingPong   "pingpong"            0 -> 1, 1 -> 0
+
+For a non-power-of-two P, recursive doubling and Rabenseifner fold the
+P - p2 extra ranks onto ranks 0.. first (p2 the largest power of two <= P)
+and send them the result at the end.
+
+The first algorithm listed is the default; a job can pick another with an
+"algorithm" key. schedule_steps() yields the steps lazily, so the O(P**2)
+algorithms (ring, pairwise) can be streamed at any size. The engines below
+consume steps in batches of about `batch` messages and are byte-weighted
+and step-resolved.
+"""
+from collections import Counter
+
+import numpy as np
+
+from sst_analysis.jobs import CONTROL_BYTES, iterations, job_root, message_bytes
+from sst_analysis.linkload import num_links, route_incidence
+
+ALGORITHMS = {
+    "Allreduce": ("binomial", "recursive_doubling", "rabenseifner", "ring"),
+    "Alltoall": ("pairwise",),
+    "Bcast": ("binomial",),
+    "Scatter": ("binomial",),
+    "Barrier": ("dissemination",),
+    "PingPong": ("pingpong",),
+}
+
+
+def job_algorithm(job, algorithm=None):
+    """
+    The algorithm used for a job: `algorithm`, the job's "algorithm" key or
+    the pattern's default.
+    """
+    pattern = job["pattern"]
+    if pattern not in ALGORITHMS:
+        raise ValueError(f"no schedule for pattern {pattern!r}")
+    algorithm = algorithm or job.get("algorithm") or ALGORITHMS[pattern][0]
+    if algorithm not in ALGORITHMS[pattern]:
+        raise ValueError(f"unknown {pattern} algorithm {algorithm!r}, expected one of {ALGORITHMS[pattern]}")
+    return algorithm
+
+
+def _step(src, dst, nbytes):
+    src = np.asarray(src, dtype=np.int64)
+    return src, np.asarray(dst, dtype=np.int64), np.broadcast_to(np.asarray(nbytes, dtype=np.int64), src.shape)
+
+
+def _binomial(size, root, nbytes):
+    # Broadcast tree rounds from root: in the round of distance d every rank rel < d sends to rel + d
+    step = 1
+    rounds = []
+    while step < size:
+        rel = np.arange(min(step, size - step), dtype=np.int64)
+        rounds.append(_step((rel + root) % size, (rel + step + root) % size, nbytes))
+        step *= 2
+    return rounds
+
+
+def _binomial_scatter(size, root, nbytes):
+    # Scatter tree rounds from root: the distance d falls from the largest power of two, and
+    # every rel that is a multiple of 2d sends rel + d the shares of ranks rel + d .. rel + 2d - 1
+    d = 1 << ((size - 1).bit_length() - 1)
+    rounds = []
+    while d >= 1:
+        rel = np.arange(0, size - d, 2 * d, dtype=np.int64)
+        rounds.append(_step((rel + root) % size, (rel + d + root) % size, np.minimum(d, size - rel - d) * nbytes))
+        d //= 2
+    return rounds
+
+
+def _chunk(total, parts, index):
+    # Bytes of chunk `index` when `total` bytes are split into `parts` near-equal chunks
+    return total // parts + (index < total % parts)
+
+
+def _folded(size, nbytes, core_steps):
+    # Fold the ranks above the largest power of two onto the first ones
+    p2 = 1 << (size.bit_length() - 1)
+    extra = np.arange(p2, size, dtype=np.int64)
+    if extra.size:
+        yield _step(extra, extra - p2, nbytes)
+    yield from core_steps(p2)
+    if extra.size:
+        yield _step(extra - p2, extra, nbytes)
+
+
+def schedule_steps(job, algorithm=None):
+    """
+    Yield the (src ranks, dst ranks, bytes) arrays of each step of one
+    iteration of the job's collective.
+    """
+    algorithm = job_algorithm(job, algorithm)
+    size = job["size"]
+    m = message_bytes(job)
+    if size < 2:
+        return
+    ranks = np.arange(size, dtype=np.int64)
+
+    if algorithm == "pingpong":
+        yield _step([0], [1], m)
+        yield _step([1], [0], m)
+    elif algorithm == "dissemination":
+        step = 1
+        while step < size:
+            yield _step(ranks, (ranks + step) % size, CONTROL_BYTES)
+            step *= 2
+    elif algorithm == "pairwise":
+        power_of_two = size & (size - 1) == 0
+        for k in range(1, size):
+            yield _step(ranks, ranks ^ k if power_of_two else (ranks + k) % size, m)
+    elif job["pattern"] == "Scatter":
+        yield from _binomial_scatter(size, job_root(job), m)
+    elif job["pattern"] == "Bcast":
+        yield from _binomial(size, job_root(job), m)
+    elif algorithm == "binomial":
+        tree = _binomial(size, 0, m)
+        for src, dst, nbytes in reversed(tree):
+            yield dst, src, nbytes
+        yield from tree
+    elif algorithm == "recursive_doubling":
+        def core(p2):
+            core_ranks = ranks[:p2]
+            mask = 1
+            while mask < p2:
+                yield _step(core_ranks, core_ranks ^ mask, m)
+                mask *= 2
+        yield from _folded(size, m, core)
+    elif algorithm == "rabenseifner":
+        def core(p2):
+            core_ranks = ranks[:p2]
+            levels = p2.bit_length() - 1
+            for k in range(levels):
+                yield _step(core_ranks, core_ranks ^ (p2 >> (k + 1)), -(-m >> (k + 1)))
+            for k in range(levels):
+                yield _step(core_ranks, core_ranks ^ (1 << k), -(-m >> (levels - k)))
+        yield from _folded(size, m, core)
+    elif algorithm == "ring":
+        right = (ranks + 1) % size
+        for s in range(size - 1):
+            yield _step(ranks, right, _chunk(m, size, (ranks - s) % size))
+        for s in range(size - 1):
+            yield _step(ranks, right, _chunk(m, size, (ranks + 1 - s) % size))
+
+
+def collective_schedule(job, algorithm=None):
+    """
+    (step, src, dst, bytes) int64 arrays of all messages of one iteration,
+    ordered by step.
+    """
+    steps, src, dst, nbytes = [], [], [], []
+    for k, (s, d, w) in enumerate(schedule_steps(job, algorithm)):
+        steps.append(np.full(s.size, k, dtype=np.int64))
+        src.append(s)
+        dst.append(d)
+        nbytes.append(w)
+    if not steps:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty
+    return np.concatenate(steps), np.concatenate(src), np.concatenate(dst), np.concatenate(nbytes)
+
+
+def _batches(job, algorithm, batch):
+    # (step within batch, src, dst, bytes) over groups of whole steps of about `batch` messages
+    pending, count = [], 0
+    for step in schedule_steps(job, algorithm):
+        pending.append(step)
+        count += step[0].size
+        if count >= batch:
+            yield _concat(pending)
+            pending, count = [], 0
+    if pending:
+        yield _concat(pending)
+
+
+def _concat(steps):
+    index = np.repeat(np.arange(len(steps), dtype=np.int64), [s.size for s, _, _ in steps])
+    return (index, np.concatenate([s for s, _, _ in steps]), np.concatenate([d for _, d, _ in steps]),
+            np.concatenate([w for _, _, w in steps]))
+
+
+def schedule_traffic(job, algorithm=None, batch=1 << 22):
+    """
+    (src, dst, bytes) over all iterations, summed per ordered rank pair: a
+    schedule-based replacement for jobs.pair_traffic.
+    """
+    size = job["size"]
+    keys, totals = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    for _, src, dst, nbytes in _batches(job, algorithm, batch):
+        merged = np.concatenate([keys, src * size + dst])
+        keys, inverse = np.unique(merged, return_inverse=True)
+        totals = np.bincount(inverse.ravel(), weights=np.concatenate([totals, nbytes]),
+                             minlength=keys.size).astype(np.int64)
+    return keys // size, keys % size, totals * iterations(job)
+
+
+def schedule_hops(model, job, nodes, algorithm=None, batch=1 << 22):
+    """
+    Hop statistics of a job's schedule with ranks on `nodes` (rank -> node).
+
+    Returns a dict with per-step arrays of one iteration "step_messages",
+    "step_bytes", "step_avg_hops" (byte-weighted) and "step_max_hops", and
+    over all iterations "histogram" (hops -> bytes), "message_histogram"
+    (hops -> messages), "avg_hops" (per message) and "byte_avg_hops".
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    repeat = iterations(job)
+    messages, volume, weighted, longest = [], [], [], []
+    hist, message_hist = Counter(), Counter()
+    for index, src, dst, nbytes in _batches(job, algorithm, batch):
+        hops = model.distance(nodes[src], nodes[dst])
+        steps = int(index[-1]) + 1 if index.size else 0
+        messages.append(np.bincount(index, minlength=steps))
+        volume.append(np.bincount(index, weights=nbytes, minlength=steps))
+        weighted.append(np.bincount(index, weights=nbytes * hops, minlength=steps))
+        peak = np.zeros(steps, dtype=np.int64)
+        np.maximum.at(peak, index, hops)
+        longest.append(peak)
+        for h, c in enumerate(np.bincount(hops, weights=nbytes)):
+            if c > 0:
+                hist[h] += int(c) * repeat
+        for h, c in enumerate(np.bincount(hops)):
+            if c > 0:
+                message_hist[h] += int(c) * repeat
+
+    messages = np.concatenate(messages) if messages else np.zeros(0, dtype=np.int64)
+    volume = np.concatenate(volume) if volume else np.zeros(0)
+    weighted = np.concatenate(weighted) if weighted else np.zeros(0)
+    total_messages = sum(message_hist.values())
+    total_bytes = sum(hist.values())
+    return {
+        "step_messages": messages,
+        "step_bytes": volume,
+        "step_avg_hops": np.divide(weighted, volume, out=np.zeros_like(volume), where=volume > 0),
+        "step_max_hops": np.concatenate(longest) if longest else np.zeros(0, dtype=np.int64),
+        "histogram": hist,
+        "message_histogram": message_hist,
+        "avg_hops": sum(h * c for h, c in message_hist.items()) / total_messages if total_messages else 0.0,
+        "byte_avg_hops": sum(h * c for h, c in hist.items()) / total_bytes if total_bytes else 0.0,
+    }
+
+
+def schedule_link_loads(model, job, nodes, algorithm=None, batch=1 << 20, max_cells=1 << 25):
+    """
+    (loads, step_max): bytes per link over all iterations under minimal
+    routing, and the heaviest link load of every step of one iteration.
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    links = num_links(model)
+    loads = np.zeros(links)
+    step_max = []
+    for index, src, dst, nbytes in _batches(job, algorithm, batch):
+        pair, link = route_incidence(model, model.router_of(nodes[src]), model.router_of(nodes[dst]))
+        weight = nbytes[pair].astype(np.float64)
+        loads += np.bincount(link, weights=weight, minlength=links)
+        steps = int(index[-1]) + 1
+        # Per-step loads as one bincount over (step, link) cells, a few steps at a time
+        span = max(1, max_cells // links)
+        step_of = index[pair]
+        for lo in range(0, steps, span):
+            mask = (step_of >= lo) & (step_of < lo + span)
+            cells = np.bincount((step_of[mask] - lo) * links + link[mask], weights=weight[mask],
+                                minlength=min(span, steps - lo) * links)
+            step_max.append(cells.reshape(-1, links).max(axis=1))
+    step_max = np.concatenate(step_max) if step_max else np.zeros(0)
+    return loads * iterations(job), step_max
@@ -0,0 +1,197 @@
+"""
+Incremental hop and link-load analysis of a job mix that is edited
+repeatedly.
+
+A JobMixSession caches, per job, its hop histogram (pairs per hop count),
+byte-hops and link-load contribution, keyed by the job's canonical JSON and
+a digest of its rank -> node map. evaluate() takes the whole current jobs
+list. Jobs whose key was seen before are not recomputed. System totals and
+link loads are updated by subtracting the contributions of the jobs that
+left the mix and adding those of the jobs that joined it, so an edit costs
+only the edited jobs. Byte counts are integers, so the float64 totals stay
+exact however many deltas are applied.
+
+Placement defaults to the analysis scripts' start..start+size ranges, which
+keeps an edit of one job from moving the others. With an allocation method
+(see allocation.py) the jobs are allocated in order as SST does, and an
+edit moves every later job.
+
+Per-job values come from the job's traffic.TrafficMatrix: the histogram
+counts communicating ordered pairs, byte-hops are sum(bytes * hops) over all
+iterations, and link loads come from linkload.link_loads when the model
+supports routing.
+
+    python -m sst_analysis.session spec.json
+"""
+import argparse
+import hashlib
+import json
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from sst_analysis.allocation import allocate
+from sst_analysis.hops import histogram_average
+from sst_analysis.linkload import link_loads, load_summary, num_links, supports_routing
+from sst_analysis.topology import model_from_topology
+from sst_analysis.traffic import TrafficMatrix
+
+
+def job_key(job, nodes):
+    """
+    Cache key of a job at a placement: SHA-256 of its canonical JSON and node map.
+    """
+    digest = hashlib.sha256(json.dumps(job, sort_keys=True, separators=(",", ":")).encode())
+    digest.update(np.ascontiguousarray(nodes, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def job_contribution(model, job, nodes, routing=True):
+    """
+    Hop histogram, byte-hops and link loads of one placed job, as a dict with
+    "histogram" (Counter), "byte_hops", "bytes" and "links"/"loads" (the
+    used link ids and their bytes, empty without routing).
+    """
+    traffic = TrafficMatrix.from_job(job).map_ranks(nodes, model.num_nodes)
+    links = np.zeros(0, dtype=np.int64)
+    loads = np.zeros(0)
+    if routing and traffic.nnz:
+        full = link_loads(model, *traffic.to_coo())
+        links = np.flatnonzero(full)
+        loads = full[links]
+    return {
+        "histogram": traffic.hop_histogram(model, weight="pairs"),
+        "byte_hops": traffic.byte_hops(model),
+        "bytes": traffic.total_bytes(),
+        "links": links,
+        "loads": loads,
+    }
+
+
+class JobMixSession:
+    """
+    Cached per-job analysis and delta-maintained totals of a job mix.
+    """
+
+    def __init__(self, model, allocation=None, seed=None, routing=None, max_entries=256):
+        self.model = model
+        self.allocation = allocation
+        self.seed = seed
+        self.routing = supports_routing(model) if routing is None else routing
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._mix = Counter()
+        self.histogram = Counter()
+        self.byte_hops = 0.0
+        self.bytes = 0
+        self.loads = np.zeros(num_links(model) if self.routing else 0)
+
+    def placement(self, jobs):
+        """
+        Rank -> node maps of the jobs under the session's placement policy.
+        """
+        if self.allocation is None:
+            return [np.arange(job["start"], job["start"] + job["size"], dtype=np.int64) for job in jobs]
+        return allocate(jobs, self.model.num_nodes, self.allocation, seed=self.seed)
+
+    def _contribution(self, key, job, nodes):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key], False
+        entry = job_contribution(self.model, job, nodes, self.routing)
+        self._cache[key] = entry
+        return entry, True
+
+    def _apply(self, entry, sign):
+        if sign > 0:
+            self.histogram.update(entry["histogram"])
+        else:
+            self.histogram.subtract(entry["histogram"])
+        self.byte_hops += sign * entry["byte_hops"]
+        self.bytes += sign * entry["bytes"]
+        if self.routing:
+            self.loads[entry["links"]] += sign * entry["loads"]
+
+    def evaluate(self, jobs, maps=None):
+        """
+        Analyse the current jobs list (placed by maps, or by the session's
+        policy). Returns a dict with per-job results under "jobs", the mix
+        totals "histogram", "avg_hops", "byte_hops", "bytes" and "links"
+        (load_summary of the link loads), and "recomputed" (the number of
+        jobs not found in the cache).
+        """
+        if maps is None:
+            maps = self.placement(jobs)
+        keys = [job_key(job, nodes) for job, nodes in zip(jobs, maps)]
+        mix = Counter(keys)
+        recomputed = 0
+        per_job = []
+        for idx, (job, nodes, key) in enumerate(zip(jobs, maps, keys)):
+            entry, fresh = self._contribution(key, job, nodes)
+            recomputed += fresh
+            per_job.append({"job": idx, "pattern": job["pattern"], "size": job["size"],
+                            "avg_hops": histogram_average(entry["histogram"]),
+                            "histogram": entry["histogram"], "byte_hops": entry["byte_hops"]})
+
+        # Deltas: jobs that left the mix, then jobs that joined it
+        for key, count in (self._mix - mix).items():
+            for _ in range(count):
+                self._apply(self._cache[key], -1)
+        for key, count in (mix - self._mix).items():
+            for _ in range(count):
+                self._apply(self._cache[key], +1)
+        self._mix = mix
+        self.histogram = +self.histogram
+
+        # Evict least recently used entries that are not part of the mix
+        for key in list(self._cache):
+            if len(self._cache) <= self.max_entries:
+                break
+            if key not in mix:
+                del self._cache[key]
+
+        return {
+            "jobs": per_job,
+            "histogram": Counter(self.histogram),
+            "avg_hops": histogram_average(self.histogram),
+            "byte_hops": self.byte_hops,
+            "bytes": self.bytes,
+            "links": load_summary(self.loads) if self.routing else None,
+            "recomputed": recomputed,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-analyse a spec's job mix whenever the file changes")
+    parser.add_argument("spec", help="spec with 'topology' and 'jobs' (sweep format)")
+    parser.add_argument("--allocation", default=None,
+                        help="allocation method (default: each job's start..start+size)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between checks of the spec")
+    args = parser.parse_args()
+
+    session = None
+    seen = None
+    topology = None
+    while True:
+        with open(args.spec) as f:
+            text = f.read()
+        if text != seen:
+            seen = text
+            spec = json.loads(text)
+            if spec["topology"] != topology:
+                topology = spec["topology"]
+                session = JobMixSession(model_from_topology(topology), args.allocation, args.seed)
+            started = time.perf_counter()
+            result = session.evaluate(spec["jobs"])
+            elapsed = (time.perf_counter() - started) * 1e3
+            print(f"{len(spec['jobs'])} jobs, {result['recomputed']} recomputed in {elapsed:.1f} ms")
+            for entry in result["jobs"]:
+                print(f"  Job {entry['job'] + 1}: {entry['pattern']} (size={entry['size']})  "
+                      f"Average Hop Count: {entry['avg_hops']:.2f}  byte-hops {entry['byte_hops']:.4g}")
+            summary = f"  Mix: Average Hop Count {result['avg_hops']:.2f}  byte-hops {result['byte_hops']:.4g}"
+            if result["links"] is not None:
+                summary += f"  max link {result['links']['max']:.4g} B (imbalance {result['links']['imbalance']:.2f})"
+            print(summary)
+        time.sleep(args.interval)
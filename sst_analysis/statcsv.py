@@ -0,0 +1,211 @@
+"""
+Streaming reader for SST statOutputCSV files.
+
+SST writes one header line such as
+
+    ComponentName, StatisticName, StatisticSubId, StatisticType, SimTime, Rank, Sum.u32, SumSQ.u32, Count.u64, ...
+
+followed by one line per statistic record, separated by ", ". Typed columns
+(Sum.u32 and Sum.u64, ...) are merged into one value per field, because SST
+fills only the columns of the statistic's own type and writes 0 in the others.
+
+Component and statistic filters are applied to the first two fields of each
+line before the rest of it is parsed. Rows are handled in fixed-size chunks,
+so peak memory does not depend on the file size.
+"""
+import fnmatch
+
+import numpy as np
+
+SEPARATOR = ", "
+
+# Leading string columns of every statOutputCSV file
+KEY_COLUMNS = ("ComponentName", "StatisticName", "StatisticSubId", "StatisticType")
+
+# Accumulator fields and how they combine across records
+FIELDS = ("Sum", "SumSQ", "Count", "Min", "Max")
+
+_TYPE_DTYPES = {"u": np.uint64, "i": np.int64, "f": np.float64}
+
+
+class StatHeader:
+    """
+    Column layout of a statOutputCSV file.
+
+    `fields` maps each accumulator field ("Sum", "Count", ...) to the list of
+    (column index, type suffix) pairs that hold it, e.g. Sum -> [(6, "u32"), (11, "u64")].
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.index = {name: i for i, name in enumerate(columns)}
+        missing = [c for c in KEY_COLUMNS + ("SimTime",) if c not in self.index]
+        if missing:
+            raise ValueError(f"not an SST statistics header, missing columns: {missing}")
+
+        self.fields = {}
+        for i, name in enumerate(columns):
+            if "." in name:
+                field, typ = name.split(".", 1)
+                self.fields.setdefault(field, []).append((i, typ))
+
+    def field_dtype(self, field):
+        kinds = {typ[0] for _, typ in self.fields.get(field, [])}
+        if "f" in kinds:
+            return np.float64
+        if "i" in kinds:
+            return np.int64
+        return np.uint64
+
+
+def read_header(path, separator=SEPARATOR):
+    """
+    Parse the header line of a statOutputCSV file.
+    """
+    with open(path) as f:
+        line = f.readline()
+    if not line.strip():
+        raise ValueError(f"{path}: empty statistics file")
+    return StatHeader([c.strip() for c in line.rstrip("\n").split(separator.strip() or separator)])
+
+
+def _name_filter(patterns):
+    """
+    Memoized predicate for a name filter: None (accept all), a glob pattern,
+    a list of glob patterns, or any callable taking the stripped name.
+    """
+    if patterns is None:
+        return None
+    if callable(patterns):
+        predicate = patterns
+    else:
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        patterns = list(patterns)
+        predicate = lambda name: any(fnmatch.fnmatchcase(name, p) for p in patterns)
+
+    seen = {}
+
+    def match(name):
+        hit = seen.get(name)
+        if hit is None:
+            hit = seen[name] = bool(predicate(name))
+        return hit
+
+    return match
+
+
+def _merged_field(rows, header, field, dtype):
+    columns = header.fields[field]
+    out = np.zeros(len(rows), dtype=dtype)
+    for i, typ in columns:
+        raw = [r[i] for r in rows]
+        out += np.array(raw, dtype=_TYPE_DTYPES.get(typ[0], np.float64)).astype(dtype)
+    return out
+
+
+def _chunk_arrays(rows, header, fields):
+    chunk = {}
+    for name in KEY_COLUMNS:
+        i = header.index[name]
+        chunk[name] = np.array([r[i].strip() for r in rows], dtype=object)
+    for name in ("SimTime", "Rank"):
+        if name in header.index:
+            i = header.index[name]
+            chunk[name] = np.array([r[i] for r in rows], dtype=np.int64)
+    for field in fields:
+        if field in header.fields:
+            chunk[field] = _merged_field(rows, header, field, header.field_dtype(field))
+    return chunk
+
+
+def iter_chunks(path, components=None, statistics=None, fields=FIELDS,
+                chunk_rows=65536, separator=SEPARATOR):
+    """
+    Yield the matching records of a statOutputCSV file in chunks of at most
+    `chunk_rows` rows.
+
+    Each chunk is a dict of NumPy arrays: the KEY_COLUMNS as object arrays,
+    SimTime and Rank as int64, and one merged array per requested field.
+    `components` and `statistics` are glob patterns (e.g.
+    "polarfly_network.r*:topology", "hopcount*"), lists of patterns or
+    predicates. They are checked before a line is fully parsed.
+    """
+    header = read_header(path, separator)
+    split_sep = separator.strip() or separator
+    want_component = _name_filter(components)
+    want_statistic = _name_filter(statistics)
+
+    rows = []
+    with open(path) as f:
+        f.readline()
+        for line in f:
+            head = line.split(split_sep, 2)
+            if len(head) < 3:
+                continue
+            if want_component is not None and not want_component(head[0].strip()):
+                continue
+            if want_statistic is not None and not want_statistic(head[1].strip()):
+                continue
+            rows.append(line.rstrip("\n").split(split_sep))
+            if len(rows) >= chunk_rows:
+                yield _chunk_arrays(rows, header, fields)
+                rows = []
+    if rows:
+        yield _chunk_arrays(rows, header, fields)
+
+
+def _combine(total, field, values):
+    if field in ("Min", "Max") and values.size == 0:
+        return total
+    if field == "Min":
+        return values.min() if total is None else min(total, values.min())
+    if field == "Max":
+        return values.max() if total is None else max(total, values.max())
+    return values.sum() if total is None else total + values.sum()
+
+
+def aggregate(path, by="StatisticName", components=None, statistics=None,
+              fields=FIELDS, chunk_rows=65536, separator=SEPARATOR):
+    """
+    Stream a statOutputCSV file and aggregate the matching records by key.
+
+    Returns {key: {"Sum": ..., "SumSQ": ..., "Count": ..., "Min": ..., "Max": ...,
+    "SimTime": last SimTime, "Rows": records}}, where key is a tuple of the
+    `by` column values (a bare value when `by` is a single column name).
+    Sum, SumSQ and Count are added up, Min and Max combined over the records
+    with Count > 0 (SST writes Min = Max = 0 for a statistic without
+    samples), and 0 for a key with no such record. Memory is bounded by one
+    chunk plus the number of distinct keys.
+    """
+    single = isinstance(by, str)
+    by = (by,) if single else tuple(by)
+    extremes = [f for f in fields if f in ("Min", "Max")]
+    # Min and Max need Count to skip the records without samples
+    read = tuple(fields) + ("Count",) if extremes and "Count" not in fields else fields
+    result = {}
+
+    for chunk in iter_chunks(path, components, statistics, read, chunk_rows, separator):
+        sampled = chunk["Count"] > 0 if "Count" in chunk else None
+        keys = list(zip(*(chunk[c] for c in by)))
+        groups = {}
+        for row, key in enumerate(keys):
+            groups.setdefault(key, []).append(row)
+
+        for key, idx in groups.items():
+            idx = np.array(idx)
+            entry = result.setdefault(key[0] if single else key, {"Rows": 0, "SimTime": None})
+            entry["Rows"] += idx.size
+            entry["SimTime"] = _combine(entry["SimTime"], "Max", chunk["SimTime"][idx])
+            for field in fields:
+                if field in chunk:
+                    values = chunk[field][idx]
+                    if field in extremes and sampled is not None:
+                        values = values[sampled[idx]]
+                    entry[field] = _combine(entry.get(field), field, values)
+
+    for entry in result.values():
+        for field in extremes:
+            if field in entry and entry[field] is None:
+                entry[field] = 0
+    return result
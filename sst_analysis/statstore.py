@@ -0,0 +1,306 @@
+"""
+Indexed columnar store for SST statistics output.
+
+convert() streams a statOutputCSV file once (see statcsv.iter_chunks) into a
+directory of .npy columns:
+
+    meta.json             row count, column dtypes and the string dictionaries
+    ComponentName.npy     int32 dictionary codes (likewise StatisticName,
+    StatisticSubId.npy    StatisticSubId and StatisticType)
+    SimTime.npy, Rank.npy, Sum.npy, SumSQ.npy, Count.npy, Min.npy, Max.npy
+    index.npy             one entry per (component, statistic, subid) with its row range
+
+Dictionaries are sorted, and rows are sorted by (component, statistic,
+subid, SimTime). Every (component, statistic, subid) group is therefore one
+contiguous row range. A query resolves its glob patterns against the small
+dictionaries, picks the matching index entries and reads only those rows from
+the memory-mapped columns.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from sst_analysis.statcsv import KEY_COLUMNS, FIELDS, SEPARATOR, iter_chunks, read_header
+
+STORE_VERSION = 1
+STORE_SUFFIX = ".sststore"
+
+# Key columns that make up the index, in sort order
+INDEX_COLUMNS = ("ComponentName", "StatisticName", "StatisticSubId")
+
+INDEX_DTYPE = np.dtype([
+    ("ComponentName", np.int32),
+    ("StatisticName", np.int32),
+    ("StatisticSubId", np.int32),
+    ("start", np.int64),
+    ("stop", np.int64),
+])
+
+
+def _encode(values, dictionary):
+    # New values get the next free code; codes are remapped to sorted order at the end
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int32)
+    unique, inverse = np.unique(values, return_inverse=True)
+    codes = np.array([dictionary.setdefault(v, len(dictionary)) for v in unique], dtype=np.int32)
+    return codes[inverse.ravel()]
+
+
+def convert(csv_path, store_path=None, chunk_rows=1 << 20, separator=SEPARATOR):
+    """
+    Convert a statOutputCSV file into an indexed columnar store directory.
+
+    Rows are streamed to temporary column files and then sorted with one
+    lexsort over the integer codes, so memory stays at a few machine words
+    per row regardless of how wide the text lines are. Returns the store path.
+    """
+    store_path = store_path or os.path.splitext(csv_path)[0] + STORE_SUFFIX
+    header = read_header(csv_path, separator)
+    fields = [f for f in FIELDS if f in header.fields]
+    dtypes = {name: np.int32 for name in KEY_COLUMNS}
+    dtypes.update({"SimTime": np.int64, "Rank": np.int64})
+    dtypes.update({f: header.field_dtype(f) for f in fields})
+    if "Rank" not in header.index:
+        del dtypes["Rank"]
+
+    dictionaries = {name: {} for name in KEY_COLUMNS}
+    tmp_dir = tempfile.mkdtemp(prefix="sststore-", dir=os.path.dirname(os.path.abspath(store_path)))
+    try:
+        raw = {name: open(os.path.join(tmp_dir, name + ".raw"), "wb") for name in dtypes}
+        rows = 0
+        for chunk in iter_chunks(csv_path, fields=fields, chunk_rows=chunk_rows, separator=separator):
+            for name in KEY_COLUMNS:
+                _encode(chunk[name], dictionaries[name]).tofile(raw[name])
+            for name in dtypes:
+                if name not in KEY_COLUMNS:
+                    chunk[name].astype(dtypes[name]).tofile(raw[name])
+            rows += len(chunk["SimTime"])
+        for f in raw.values():
+            f.close()
+
+        def column(name):
+            return np.fromfile(os.path.join(tmp_dir, name + ".raw"), dtype=dtypes[name])
+
+        # Remap codes so that code order is lexical order
+        sorted_dicts = {}
+        for name in KEY_COLUMNS:
+            values = sorted(dictionaries[name], key=dictionaries[name].get)
+            order = np.argsort(np.array(values, dtype=object)) if values else np.zeros(0, dtype=np.int64)
+            remap = np.empty(len(values), dtype=np.int32)
+            remap[order] = np.arange(len(values), dtype=np.int32)
+            codes = remap[column(name)] if rows else column(name)
+            codes.tofile(os.path.join(tmp_dir, name + ".raw"))
+            sorted_dicts[name] = [values[i] for i in order]
+
+        keys = [column(name) for name in reversed(INDEX_COLUMNS)]
+        perm = np.lexsort([column("SimTime")] + keys)
+        del keys
+
+        out_dir = tmp_dir + ".out"
+        os.makedirs(out_dir)
+        for name, dtype in dtypes.items():
+            out = np.lib.format.open_memmap(os.path.join(out_dir, name + ".npy"), mode="w+",
+                                            dtype=dtype, shape=(rows,))
+            out[:] = column(name)[perm]
+            out.flush()
+            del out
+
+        np.save(os.path.join(out_dir, "index.npy"), _build_index(out_dir, rows))
+        meta = {
+            "version": STORE_VERSION,
+            "source": os.path.abspath(csv_path),
+            "rows": rows,
+            "columns": {name: np.dtype(dtype).name for name, dtype in dtypes.items()},
+            "dictionaries": sorted_dicts,
+        }
+        with open(os.path.join(out_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        if os.path.exists(store_path):
+            shutil.rmtree(store_path)
+        os.replace(out_dir, store_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        shutil.rmtree(tmp_dir + ".out", ignore_errors=True)
+    return store_path
+
+
+def _build_index(out_dir, rows):
+    keys = [np.load(os.path.join(out_dir, name + ".npy"), mmap_mode="r") for name in INDEX_COLUMNS]
+    if rows == 0:
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    change = np.zeros(rows, dtype=bool)
+    change[0] = True
+    for k in keys:
+        change[1:] |= k[1:] != k[:-1]
+    starts = np.flatnonzero(change)
+    index = np.empty(starts.size, dtype=INDEX_DTYPE)
+    for name, k in zip(INDEX_COLUMNS, keys):
+        index[name] = k[starts]
+    index["start"] = starts
+    index["stop"] = np.append(starts[1:], rows)
+    return index
+
+
+def _patterns(patterns):
+    if patterns is None:
+        return None
+    if isinstance(patterns, str):
+        return [patterns]
+    return list(patterns)
+
+
+class StatStore:
+    """
+    Read-only view of a store written by convert(). Columns are memory-mapped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != STORE_VERSION:
+            raise ValueError(f"{path}: unsupported store version {self.meta.get('version')}")
+        self.rows = self.meta["rows"]
+        self.dictionaries = {name: np.array(values, dtype=object)
+                             for name, values in self.meta["dictionaries"].items()}
+        self.index = np.load(os.path.join(path, "index.npy"))
+        self._columns = {}
+
+    @property
+    def columns(self):
+        return list(self.meta["columns"])
+
+    def column(self, name):
+        """
+        Full memory-mapped column (dictionary codes for the key columns).
+        """
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r")
+        return self._columns[name]
+
+    def codes(self, name, patterns):
+        """
+        Dictionary codes of a key column whose values match any glob pattern.
+        """
+        values = self.dictionaries[name]
+        patterns = _patterns(patterns)
+        hits = [i for i, v in enumerate(values) if any(fnmatch.fnmatchcase(v, p) for p in patterns)]
+        return np.array(hits, dtype=np.int32)
+
+    def select(self, components=None, statistics=None, subids=None):
+        """
+        Sorted row numbers of the records matching the filters, via the index.
+        """
+        mask = np.ones(self.index.size, dtype=bool)
+        for name, patterns in zip(INDEX_COLUMNS, (components, statistics, subids)):
+            if patterns is not None:
+                mask &= np.isin(self.index[name], self.codes(name, patterns))
+        entries = self.index[mask]
+        if entries.size == 0:
+            return np.zeros(0, dtype=np.int64)
+        lengths = entries["stop"] - entries["start"]
+        offsets = np.repeat(entries["start"] - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(lengths.sum())
+
+    def query(self, components=None, statistics=None, subids=None, columns=None, decode=True):
+        """
+        Dict of column arrays for the matching records.
+
+        Key columns are decoded to strings unless decode=False, in which case
+        their dictionary codes are returned (see self.dictionaries).
+        """
+        rows = self.select(components, statistics, subids)
+        result = {}
+        for name in columns or self.columns:
+            values = self.column(name)[rows]
+            if decode and name in self.dictionaries:
+                values = self.dictionaries[name][values]
+            result[name] = values
+        return result
+
+    def aggregate(self, by="StatisticName", components=None, statistics=None, subids=None,
+                  fields=FIELDS):
+        """
+        Same result layout as statcsv.aggregate(), computed from the store.
+        """
+        single = isinstance(by, str)
+        by = (by,) if single else tuple(by)
+        fields = [f for f in fields if f in self.meta["columns"]]
+        extra = ["Count"] if "Count" in self.meta["columns"] and "Count" not in fields else []
+        data = self.query(components, statistics, subids, columns=list(by) + ["SimTime"] + fields + extra,
+                          decode=False)
+        if data["SimTime"].size == 0:
+            return {}
+
+        group_codes = np.stack([data[c] for c in by], axis=1)
+        keys, inverse = np.unique(group_codes, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        n = keys.shape[0]
+
+        def reduce(op, values, init, rows=slice(None)):
+            out = np.full(n, init, dtype=values.dtype)
+            op.at(out, inverse[rows], values[rows])
+            return out
+
+        # Min and Max skip the records without samples, as in statcsv.aggregate()
+        sampled = data["Count"] > 0 if "Count" in data else np.ones(inverse.size, dtype=bool)
+        has_samples = np.bincount(inverse[sampled], minlength=n) > 0
+
+        rows = np.bincount(inverse, minlength=n)
+        last = reduce(np.maximum, data["SimTime"], np.iinfo(np.int64).min)
+        reduced = {}
+        for field in fields:
+            values = data[field]
+            if field == "Min":
+                reduced[field] = reduce(np.minimum, values, _dtype_max(values.dtype), sampled)
+                reduced[field][~has_samples] = 0
+            elif field == "Max":
+                reduced[field] = reduce(np.maximum, values, _dtype_min(values.dtype), sampled)
+                reduced[field][~has_samples] = 0
+            else:
+                reduced[field] = reduce(np.add, values, 0)
+
+        result = {}
+        for g in range(n):
+            key = tuple(self.dictionaries[c][keys[g, j]] if c in self.dictionaries else keys[g, j]
+                        for j, c in enumerate(by))
+            entry = {"Rows": int(rows[g]), "SimTime": last[g]}
+            entry.update({field: reduced[field][g] for field in fields})
+            result[key[0] if single else key] = entry
+        return result
+
+
+def _dtype_max(dtype):
+    return np.finfo(dtype).max if dtype.kind == "f" else np.iinfo(dtype).max
+
+
+def _dtype_min(dtype):
+    return np.finfo(dtype).min if dtype.kind == "f" else np.iinfo(dtype).min
+
+
+def open_store(csv_path, separator=SEPARATOR):
+    """
+    StatStore for a statistics CSV, converting it first if the store is
+    missing or older than the CSV.
+    """
+    store_path = os.path.splitext(csv_path)[0] + STORE_SUFFIX
+    meta = os.path.join(store_path, "meta.json")
+    if not os.path.exists(meta) or os.path.getmtime(meta) < os.path.getmtime(csv_path):
+        convert(csv_path, store_path, separator=separator)
+    return StatStore(store_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert SST statOutputCSV files to indexed columnar stores")
+    parser.add_argument("csv", nargs="+", help="statistics CSV files")
+    parser.add_argument("--separator", default=SEPARATOR)
+    args = parser.parse_args()
+    for path in args.csv:
+        out = convert(path, separator=args.separator)
+        print(f"{path} -> {out} ({StatStore(out).rows} rows)")
@@ -0,0 +1,383 @@
+"""
+Parameter-sweep driver for SST merlin/ember configurations.
+
+A sweep spec is one JSON/dict document describing a base configuration in the
+shape of the scripts in this repository, plus a "sweep" section of parameters
+to vary:
+
+    {
+      "name": "dragonfly_link_bw",
+      "topology": {"type": "topoDragonFly", "hosts_per_router": 4, "routers_per_group": 8,
+                   "num_groups": 16, "intergroup_links": 4, "algorithm": ["ugal", "ugal"],
+                   "link_latency": "25ns"},
+      "router": {"link_bw": "12GB/s", "flit_size": "16B", "xbar_bw": "20GB/s", ...},
+      "nic": {"link_bw": "12GB/s", "input_buf_size": "16kB", "output_buf_size": "16kB"},
+      "nic2host_lat": "100ns",
+      "jobs": [{"size": 16, "start": 0, "pattern": "Allreduce", "params": "..."}, ...],
+      "allocation": "random",
+      "statistic_load_level": 8,
+      "sweep": {"router.link_bw": ["12GB/s", "24GB/s"],
+                "router.input_buf_size": {"start": 16, "stop": 64, "step": 16, "unit": "kB"}},
+      "resources": {"cores_per_run": 1, "memory_per_run": "2GB"}
+    }
+
+Each point of the Cartesian product over "sweep" gets its own run directory
+with a generated config.py. The sst processes are run by a local work queue
+that keeps the sum of running cores and memory within the given limits.
+"""
+import argparse
+import copy
+import itertools
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+_SIZE_UNITS = {"": 1, "B": 1, "KB": 1e3, "MB": 1e6, "GB": 1e9, "TB": 1e12,
+               "KIB": 2 ** 10, "MIB": 2 ** 20, "GIB": 2 ** 30, "TIB": 2 ** 40}
+
+
+def parse_size(value):
+    """
+    Bytes in a size such as "2GB", "512MiB" or a plain number.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = re.fullmatch(r"\s*([0-9.]+)\s*([A-Za-z]*)\s*", value)
+    if not m or m.group(2).upper() not in _SIZE_UNITS:
+        raise ValueError(f"unrecognized size: {value!r}")
+    return float(m.group(1)) * _SIZE_UNITS[m.group(2).upper()]
+
+
+def parse_bandwidth(value):
+    """
+    Bytes per second in a bandwidth such as "12GB/s" or a plain number.
+    """
+    if isinstance(value, str):
+        value = re.sub(r"\s*/\s*s\s*$", "", value)
+    return parse_size(value)
+
+
+_TIME_UNITS = {"S": 1.0, "MS": 1e-3, "US": 1e-6, "NS": 1e-9, "PS": 1e-12}
+
+
+def parse_time(value, default_unit="s"):
+    """
+    Seconds in a time such as "20ns", or a plain number in default_unit.
+    """
+    if isinstance(value, (int, float)):
+        return float(value) * _TIME_UNITS[default_unit.upper()]
+    m = re.fullmatch(r"\s*([0-9.eE+-]+?)\s*([A-Za-z]*)\s*", value)
+    unit = (m.group(2) or default_unit).upper() if m else ""
+    if unit not in _TIME_UNITS:
+        raise ValueError(f"unrecognized time: {value!r}")
+    return float(m.group(1)) * _TIME_UNITS[unit]
+
+
+def sweep_values(values):
+    """
+    List of values for one swept parameter: a list as-is, or a
+    {"start", "stop", "step", "unit"} range with stop inclusive.
+    """
+    if isinstance(values, dict):
+        start, stop, step = values["start"], values["stop"], values.get("step", 1)
+        unit = values.get("unit", "")
+        count = int(round((stop - start) / step)) + 1
+        points = [start + i * step for i in range(count)]
+        return [f"{p:g}{unit}" if unit else p for p in points]
+    if isinstance(values, list):
+        return values
+    return [values]
+
+
+def _set_path(config, path, value):
+    keys = path.split(".")
+    node = config
+    for key in keys[:-1]:
+        node = node.setdefault(key, {})
+    node[keys[-1]] = value
+
+
+def expand_sweep(spec):
+    """
+    List of (point, config) pairs: point maps each swept path to its value,
+    config is the full configuration for that point.
+    """
+    sweep = spec.get("sweep", {})
+    paths = list(sweep)
+    base = {k: v for k, v in spec.items() if k not in ("sweep", "resources")}
+    points = []
+    for combo in itertools.product(*(sweep_values(sweep[p]) for p in paths)):
+        config = copy.deepcopy(base)
+        point = dict(zip(paths, combo))
+        for path, value in point.items():
+            _set_path(config, path, value)
+        points.append((point, config))
+    return points
+
+
+# Settings render_config() applies when a configuration leaves them out
+CONFIG_DEFAULTS = {
+    "platform": "firefly-defaults",
+    "nic2host_lat": "100ns",
+    "allocation": "linear",
+    "statistic_load_level": 8,
+}
+
+
+def with_defaults(config):
+    """
+    Copy of a configuration with the settings render_config() defaults
+    written out, including each job's "params" and the topology "args".
+    """
+    config = copy.deepcopy(config)
+    for key, value in CONFIG_DEFAULTS.items():
+        config.setdefault(key, value)
+    if "topology" in config:
+        config["topology"].setdefault("args", {})
+    for job in config.get("jobs", []):
+        job.setdefault("params", "")
+    return config
+
+
+def _assignments(var, section):
+    return "\n".join(f"{var}.{key} = {value!r}" for key, value in section.items())
+
+
+def _jobs_literal(jobs):
+    return "[\n" + ",\n".join(f"    {job!r}" for job in jobs) + "\n]"
+
+
+def render_config(config, stats_file="stats.csv"):
+    """
+    Text of an SST Python configuration for one sweep point, laid out like the
+    hand-written configs in Multijob_2/.
+    """
+    config = with_defaults(config)
+    topology = dict(config["topology"])
+    topo_type = topology.pop("type")
+    topo_args = topology.pop("args")
+    ctor = ", ".join(f"{k}={v!r}" for k, v in topo_args.items())
+
+    return f'''import sst
+from sst.merlin.base import *
+from sst.merlin.endpoint import *
+from sst.merlin.interface import *
+from sst.merlin.topology import *
+from sst.ember import *
+
+# Generated by sst_analysis.sweep for sweep "{config.get("name", "")}"
+
+PlatformDefinition.setCurrentPlatform({config["platform"]!r})
+
+# Topology
+topo = {topo_type}({ctor})
+{_assignments("topo", topology)}
+
+# Router configuration
+router = hr_router()
+{_assignments("router", config["router"])}
+topo.router = router
+
+# Network interface
+nic = ReorderLinkControl()
+{_assignments("nic", config["nic"])}
+
+# Create system
+system = System()
+system.setTopology(topo)
+
+# Job definitions
+jobs = {_jobs_literal(config["jobs"])}
+
+# Create and assign jobs
+endpoints = []
+for job in jobs:
+    ep = EmberMPIJob(job["start"], job["size"])
+    ep.network_interface = nic
+    ep.addMotif("Init")
+    ep.addMotif(f"{{job['pattern']}} {{job['params']}}")
+    ep.addMotif("Fini")
+    ep.nic.nic2host_lat = {config["nic2host_lat"]!r}
+    system.allocateNodes(ep, {config["allocation"]!r})
+    endpoints.append(ep)
+
+system.build()
+
+# Statistics configuration
+sst.setStatisticLoadLevel({int(config["statistic_load_level"])})
+sst.setStatisticOutput("sst.statOutputCSV", {{
+    "filepath": {stats_file!r},
+    "separator": ", "
+}})
+
+sst.enableAllStatisticsForComponentType("merlin.hr_router")
+sst.enableAllStatisticsForComponentType("merlin.linkcontrol")
+sst.enableAllStatisticsForComponentType("ember.nic")
+'''
+
+
+class LocalScheduler:
+    """
+    Work queue that runs commands concurrently while the sum of the cores and
+    memory claimed by running tasks stays within max_cores / max_memory.
+    A task larger than the limits runs alone.
+    """
+
+    def __init__(self, max_cores=None, max_memory=None, poll_interval=0.05):
+        self.max_cores = max_cores or os.cpu_count() or 1
+        self.max_memory = parse_size(max_memory) if max_memory is not None else _physical_memory()
+        self.poll_interval = poll_interval
+
+    def _fits(self, task, cores, memory, running):
+        if not running:
+            return True
+        return cores + task["cores"] <= self.max_cores and memory + task["memory"] <= self.max_memory
+
+    def run(self, tasks):
+        """
+        Run tasks, each a dict with "cmd", "cwd", "cores", "memory" and "log".
+        Adds "returncode" and "elapsed" to each task and returns them in order.
+        """
+        pending = list(tasks)
+        running = []
+        cores = memory = 0
+        try:
+            while pending or running:
+                while pending and self._fits(pending[0], cores, memory, running):
+                    task = pending.pop(0)
+                    log = open(task["log"], "w")
+                    try:
+                        task["_proc"] = subprocess.Popen(task["cmd"], cwd=task["cwd"], stdout=log,
+                                                         stderr=subprocess.STDOUT)
+                    except BaseException:
+                        log.close()
+                        raise
+                    task["_log"] = log
+                    task["_start"] = time.time()
+                    running.append(task)
+                    cores += task["cores"]
+                    memory += task["memory"]
+
+                time.sleep(self.poll_interval)
+                for task in [t for t in running if t["_proc"].poll() is not None]:
+                    running.remove(task)
+                    cores -= task["cores"]
+                    memory -= task["memory"]
+                    task["returncode"] = task.pop("_proc").returncode
+                    task["elapsed"] = time.time() - task.pop("_start")
+                    task.pop("_log").close()
+        finally:
+            # A failed launch or an interrupt must not leave orphaned runs or open logs behind
+            for task in running:
+                proc = task.pop("_proc")
+                proc.kill()
+                proc.wait()
+                task.pop("_log").close()
+                task.pop("_start")
+        return tasks
+
+
+def _physical_memory():
+    try:
+        return float(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES"))
+    except (ValueError, OSError, AttributeError):
+        return float("inf")
+
+
+def sst_version(sst="sst"):
+    """
+    Version line reported by `sst --version`, e.g. "SST-Core Version (14.1.0)".
+    The elements (merlin, ember) are released together with the core.
+    """
+    output = subprocess.run([sst, "--version"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            universal_newlines=True, check=True).stdout
+    return output.strip().splitlines()[0] if output.strip() else ""
+
+
+def run_sweep(spec, out_dir, sst="sst", max_cores=None, max_memory=None, stats_file="stats.csv",
+              cache=None):
+    """
+    Generate one config per sweep point under out_dir and run them all.
+
+    Returns one result dict per point (point values, run directory, return
+    code, elapsed seconds, whether it came from the cache and the stats file
+    path or None) and writes the same list to out_dir/sweep_results.json.
+    With a runcache.ResultCache, points whose configuration is already cached
+    get the stored statistics copied in instead of running SST, and new
+    successful runs are added to the cache, keyed with sst_version(sst) so
+    results of another SST release are not reused.
+    """
+    resources = spec.get("resources", {})
+    cores = int(resources.get("cores_per_run", 1))
+    memory = parse_size(resources.get("memory_per_run", 0))
+
+    version = sst_version(sst) if cache is not None else None
+    tasks = []
+    cached = []
+    for i, (point, config) in enumerate(expand_sweep(spec)):
+        run_dir = os.path.join(out_dir, f"point_{i:04d}")
+        os.makedirs(run_dir, exist_ok=True)
+        with open(os.path.join(run_dir, "config.py"), "w") as f:
+            f.write(render_config(config, stats_file))
+        with open(os.path.join(run_dir, "point.json"), "w") as f:
+            json.dump(point, f, indent=2)
+
+        hit = cache.get(config, version) if cache is not None else None
+        if hit is not None:
+            shutil.copyfile(hit, os.path.join(run_dir, stats_file))
+            cached.append({"index": i, "point": point, "cwd": run_dir, "returncode": 0,
+                           "elapsed": 0.0, "cached": True})
+            continue
+
+        cmd = [sst] + (["-n", str(cores)] if cores > 1 else []) + ["config.py"]
+        tasks.append({"index": i, "point": point, "config": config, "cmd": cmd, "cwd": run_dir,
+                      "cores": cores, "memory": memory, "log": os.path.join(run_dir, "sst.log"),
+                      "cached": False})
+
+    LocalScheduler(max_cores, max_memory).run(tasks)
+
+    results = []
+    for task in sorted(tasks + cached, key=lambda t: t["index"]):
+        stats = os.path.join(task["cwd"], stats_file)
+        ok = task["returncode"] == 0 and os.path.exists(stats)
+        if ok and cache is not None and not task["cached"]:
+            cache.put(task["config"], stats, version)
+        results.append({
+            "point": task["point"],
+            "run_dir": task["cwd"],
+            "returncode": task["returncode"],
+            "elapsed": task["elapsed"],
+            "cached": task["cached"],
+            "stats": stats if ok else None,
+        })
+    with open(os.path.join(out_dir, "sweep_results.json"), "w") as f:
+        json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate and run an SST parameter sweep")
+    parser.add_argument("spec", help="sweep spec (JSON)")
+    parser.add_argument("out_dir", help="directory for per-point run directories")
+    parser.add_argument("--sst", default="sst", help="sst executable")
+    parser.add_argument("--max-cores", type=int, default=None)
+    parser.add_argument("--max-memory", default=None, help="e.g. 64GB")
+    parser.add_argument("--cache", default=None, help="result cache directory (see runcache.py)")
+    parser.add_argument("--cache-size", default="50GB")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    cache = None
+    if args.cache:
+        from sst_analysis.runcache import ResultCache
+        cache = ResultCache(args.cache, args.cache_size)
+    results = run_sweep(spec, args.out_dir, sst=args.sst, max_cores=args.max_cores,
+                        max_memory=args.max_memory, cache=cache)
+    failed = [r for r in results if r["returncode"] != 0]
+    print(f"Ran {len(results)} points, {len(failed)} failed. Results: {os.path.join(args.out_dir, 'sweep_results.json')}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,267 @@
+"""
+Node-to-node hop-count models for the topologies used in this repository.
+
+Every model exposes `num_nodes`, `router_of(nodes)` and
+`distance(a, b)`. distance() gives elementwise hop counts between node
+arrays and counts the NIC->router and router->NIC hops like the hop
+scripts: 2 for two nodes on the same router, 0 for a node to itself.
+
+model_from_topology() builds a model from the "topology" section of a sweep
+spec (see sweep.py), i.e. the same fields the SST configs set on topoMesh,
+topoTorus, topoDragonFly and topoPolarFly.
+"""
+import numpy as np
+
+from sst_analysis import torus
+from sst_analysis.hops import ENDPOINT_HOPS
+
+
+def parse_shape(shape):
+    """
+    (32, 32) from merlin's "32x32" shape strings (tuples pass through).
+    """
+    if isinstance(shape, str):
+        return tuple(int(d) for d in shape.lower().split("x"))
+    return tuple(int(d) for d in shape)
+
+
+class _Model:
+    hosts_per_router = 1
+    num_routers = 0
+
+    @property
+    def num_nodes(self):
+        return self.num_routers * self.hosts_per_router
+
+    def router_of(self, nodes):
+        return np.asarray(nodes, dtype=np.int64) // self.hosts_per_router
+
+    def router_distance(self, ra, rb):
+        raise NotImplementedError
+
+    def distance(self, a, b):
+        a = np.asarray(a, dtype=np.int64)
+        b = np.asarray(b, dtype=np.int64)
+        hops = self.router_distance(self.router_of(a), self.router_of(b)) + ENDPOINT_HOPS
+        return np.where(a == b, 0, hops)
+
+
+class MeshModel(_Model):
+    """
+    topoMesh: dimension-ordered Manhattan distance, router = x + dim_x * y + ...
+    """
+
+    def __init__(self, shape, hosts_per_router=1):
+        self.shape = parse_shape(shape)
+        self.hosts_per_router = hosts_per_router
+        self.num_routers = int(np.prod(self.shape))
+
+    def router_coords(self, routers):
+        return torus.router_coords(routers, self.shape)
+
+    def router_distance(self, ra, rb):
+        ca = self.router_coords(ra)
+        cb = self.router_coords(rb)
+        return sum(np.abs(x - y) for x, y in zip(ca, cb))
+
+
+class TorusModel(MeshModel):
+    """
+    topoTorus: like the mesh, with the shorter wrap-around direction per axis.
+    """
+
+    def router_distance(self, ra, rb):
+        return torus.router_distance(ra, rb, self.shape)
+
+
+class DragonflyModel(_Model):
+    """
+    topoDragonFly with merlin's global wiring (see gateway_slots).
+
+    router_distance() follows merlin's minimal route: a local hop to a router
+    owning a global link to the destination group, the global link, and a
+    local hop to the destination router, using whichever of the
+    intergroup_links parallel links is shortest. valiant_router_distance()
+    does the same through an intermediate group. Both are a few table lookups
+    per pair.
+    """
+
+    def __init__(self, num_groups, routers_per_group, hosts_per_router, intergroup_links,
+                 global_routes="absolute"):
+        self.num_groups = num_groups
+        self.routers_per_group = routers_per_group
+        self.hosts_per_router = hosts_per_router
+        self.intergroup_links = intergroup_links
+        self.global_routes = global_routes
+        self.num_routers = num_groups * routers_per_group
+        # Global ports per router, as topoDragonFly derives intergroup_per_router
+        self.global_ports = -(-intergroup_links * (num_groups - 1) // routers_per_group)
+        self._gateway_slots = None
+
+    def gateway_slots(self):
+        """
+        (num_groups, num_groups, intergroup_links) table of global port slots:
+        entry [g, h, k] is the slot (router_in_group * global_ports + port) of
+        the k-th global link from group g to group h, and -1 for g == h.
+
+        Follows merlin's default global link map: slot s of every group
+        carries link s % (num_groups - 1), which leads to that group number
+        with the own group skipped ("absolute" routes) or to the group that
+        many steps ahead ("relative"). The k-th link from g to h is wired to
+        the k-th link from h to g.
+        """
+        if self._gateway_slots is not None:
+            return self._gateway_slots
+        groups = self.num_groups
+        slots = np.arange(self.routers_per_group * self.global_ports, dtype=np.int64)
+        used = slots[slots < self.intergroup_links * (groups - 1)]
+        link = used % (groups - 1)
+        g = np.repeat(np.arange(groups, dtype=np.int64), used.size)
+        link = np.tile(link, groups)
+        if self.global_routes == "absolute":
+            h = link + (link >= g)
+        else:
+            h = (g + link + 1) % groups
+        # Slots are in increasing order within each group, and repeat every
+        # (groups - 1) slots, so the k-th link to h is slot number k of that cycle
+        k = np.tile(used // (groups - 1), groups)
+        table = np.full((groups, groups, self.intergroup_links), -1, dtype=np.int64)
+        table[g, h, k] = np.tile(used, groups)
+        self._gateway_slots = table
+        return table
+
+    def gateway_routers(self, ga, gb, k=0):
+        """
+        Routers at both ends of the k-th global link between groups ga and gb.
+        """
+        table = self.gateway_slots()
+        out_slot = table[ga, gb, k]
+        in_slot = table[gb, ga, k]
+        rpg, ports = self.routers_per_group, self.global_ports
+        return ga * rpg + out_slot // ports, gb * rpg + in_slot // ports
+
+    def link_ends(self, ga, gb):
+        """
+        Routers at both ends of all parallel global links from ga to gb, with
+        a trailing axis of length intergroup_links (garbage where ga == gb).
+        """
+        table = self.gateway_slots()
+        ga = np.asarray(ga, dtype=np.int64)
+        gb = np.asarray(gb, dtype=np.int64)
+        rpg, ports = self.routers_per_group, self.global_ports
+        return (ga[..., None] * rpg + table[ga, gb] // ports,
+                gb[..., None] * rpg + table[gb, ga] // ports)
+
+    def via_links(self, ra, rb, ga, gb):
+        # Router hops of local-global-local through each parallel link
+        out_gw, in_gw = self.link_ends(ga, gb)
+        return 1 + (out_gw != ra[..., None]) + (in_gw != rb[..., None])
+
+    def router_distance(self, ra, rb):
+        ra, rb = np.broadcast_arrays(np.asarray(ra, dtype=np.int64), np.asarray(rb, dtype=np.int64))
+        ga = ra // self.routers_per_group
+        gb = rb // self.routers_per_group
+        inter = self.via_links(ra, rb, ga, np.where(ga == gb, (ga + 1) % self.num_groups, gb)).min(axis=-1)
+        return np.where(ga == gb, (ra != rb).astype(np.int64), inter)
+
+    def valiant_router_distance(self, ra, rb, mid_group):
+        """
+        Router hops of a Valiant route through mid_group: minimal route to any
+        router of mid_group, then minimal route on to rb. Pairs in one group,
+        or with mid_group equal to either end's group, take the minimal route.
+        """
+        ra, rb, mid = np.broadcast_arrays(np.asarray(ra, dtype=np.int64), np.asarray(rb, dtype=np.int64),
+                                          np.asarray(mid_group, dtype=np.int64))
+        ga = ra // self.routers_per_group
+        gb = rb // self.routers_per_group
+        detour = (ga != gb) & (mid != ga) & (mid != gb)
+        safe_mid = np.where(detour, mid, (ga + 1) % self.num_groups)
+        safe_gb = np.where(detour, gb, (safe_mid + 1) % self.num_groups)
+        out1, in1 = self.link_ends(ga, safe_mid)
+        out2, in2 = self.link_ends(safe_mid, safe_gb)
+        first = (out1 != ra[..., None])[..., :, None]
+        middle = in1[..., :, None] != out2[..., None, :]
+        last = (in2 != rb[..., None])[..., None, :]
+        hops = (2 + first + middle + last).reshape(ra.shape + (-1,)).min(axis=-1)
+        return np.where(detour, hops, self.router_distance(ra, rb))
+
+    def mean_valiant_router_distance(self, ra, rb):
+        """
+        Valiant router hops averaged over all intermediate groups other than
+        the two end groups (minimal hops for pairs within one group).
+        """
+        ra, rb = np.broadcast_arrays(np.asarray(ra, dtype=np.int64), np.asarray(rb, dtype=np.int64))
+        total = np.zeros(ra.shape)
+        for mid in range(self.num_groups):
+            total += self.valiant_router_distance(ra, rb, mid)
+        ga = ra // self.routers_per_group
+        gb = rb // self.routers_per_group
+        # The two end groups contributed minimal hops; take them out of the mean
+        minimal = self.router_distance(ra, rb)
+        mids = max(self.num_groups - 2, 1)
+        return np.where(ga == gb, minimal, (total - 2 * minimal) / mids)
+
+    def valiant_distance(self, a, b):
+        """
+        Mean Valiant node hop counts, counted like distance().
+        """
+        a = np.asarray(a, dtype=np.int64)
+        b = np.asarray(b, dtype=np.int64)
+        hops = self.mean_valiant_router_distance(self.router_of(a), self.router_of(b)) + ENDPOINT_HOPS
+        return np.where(a == b, 0, hops)
+
+
+class DistanceMatrixModel(_Model):
+    """
+    Any topology given as an all-pairs router distance matrix, e.g. PolarFly
+    from polarfly.load_distance_matrix(). The optional CSR adjacency
+    (indptr, indices) from polarfly.read_adjacency() enables routing in
+    linkload.py.
+    """
+
+    def __init__(self, dist, hosts_per_router=1, adjacency=None):
+        self.dist = dist
+        self.hosts_per_router = hosts_per_router
+        self.num_routers = dist.shape[0]
+        self.adjacency = adjacency
+        self._neighbours = None
+
+    def neighbour_table(self):
+        """
+        (num_routers, max_degree) neighbour ids, padded with num_routers.
+        """
+        if self._neighbours is None:
+            from sst_analysis.polarfly import _padded_neighbours
+            self._neighbours = _padded_neighbours(*self.adjacency)
+        return self._neighbours
+
+    def router_distance(self, ra, rb):
+        return np.asarray(self.dist[ra, rb], dtype=np.int64)
+
+
+def model_from_topology(topology):
+    """
+    Distance model from a sweep-spec "topology" section. PolarFly needs an
+    "adjacency" entry pointing at a PolarFly.q_*.txt file, or its "q" to
+    generate the graph.
+    """
+    kind = topology["type"]
+    if kind == "topoMesh":
+        return MeshModel(topology["shape"], topology.get("local_ports", 1))
+    if kind == "topoTorus":
+        return TorusModel(topology["shape"], topology.get("local_ports", 1))
+    if kind == "topoDragonFly":
+        return DragonflyModel(topology["num_groups"], topology["routers_per_group"],
+                              topology["hosts_per_router"], topology["intergroup_links"],
+                              topology.get("global_routes", "absolute"))
+    if kind == "topoPolarFly":
+        from sst_analysis.polarfly import (all_pairs_distances, load_distance_matrix, polarfly_adjacency,
+                                           read_adjacency)
+        if "adjacency" not in topology:
+            adjacency = polarfly_adjacency(topology["q"])
+            return DistanceMatrixModel(all_pairs_distances(*adjacency), topology.get("hosts_per_router", 1),
+                                       adjacency)
+        return DistanceMatrixModel(load_distance_matrix(topology["adjacency"]),
+                                   topology.get("hosts_per_router", 1),
+                                   read_adjacency(topology["adjacency"]))
+    raise ValueError(f"no distance model for topology type {kind!r}")
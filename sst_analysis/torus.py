@@ -0,0 +1,111 @@
+"""
+Closed-form hop histograms for N-dimensional torus topologies.
+
+Job members are first counted per router. The hop histogram then follows
+from router-pair multiplicities: either an explicit product over the
+occupied routers, or, for jobs spread over many routers, the cyclic
+autocorrelation of the occupancy grid (one FFT, O(routers log routers)).
+Neither path enumerates node pairs.
+"""
+from collections import Counter
+
+import numpy as np
+
+from sst_analysis.hops import ENDPOINT_HOPS, counter_from_bincount
+
+
+def wrap_distance(a, b, dim):
+    """
+    Per-axis wrap-around distance, vectorized over NumPy arrays.
+    """
+    d = np.abs(np.asarray(a) - np.asarray(b))
+    return np.minimum(d, dim - d)
+
+
+def router_coords(routers, shape):
+    """
+    Coordinates of router ids, x varying fastest (router = x + dim_x * y + ...).
+    """
+    return np.unravel_index(np.asarray(routers, dtype=np.int64), shape, order="F")
+
+
+def router_distance(router_i, router_j, shape):
+    """
+    Minimal router-to-router hops between router ids on a torus of the given shape.
+    """
+    ci = router_coords(router_i, shape)
+    cj = router_coords(router_j, shape)
+    return sum(wrap_distance(a, b, dim) for a, b, dim in zip(ci, cj, shape))
+
+
+def router_occupancy(nodes, shape, hosts_per_router):
+    """
+    Number of job members attached to each router, as an array of the torus shape.
+    """
+    routers = np.asarray(nodes, dtype=np.int64) // hosts_per_router
+    counts = np.bincount(routers, minlength=int(np.prod(shape)))
+    return counts.reshape(shape, order="F")
+
+
+def _displacement_distance(shape):
+    # Wrap distance for every cyclic displacement index of the grid
+    dist = np.zeros(shape, dtype=np.int64)
+    for axis, dim in enumerate(shape):
+        k = np.arange(dim)
+        view = [1] * len(shape)
+        view[axis] = dim
+        dist = dist + np.minimum(k, dim - k).reshape(view)
+    return dist
+
+
+def _router_distance_counts_fft(occupancy):
+    grid = occupancy.astype(np.float64)
+    spectrum = np.fft.rfftn(grid)
+    auto = np.fft.irfftn(spectrum * np.conj(spectrum), grid.shape)
+    counts = np.rint(auto).astype(np.int64)
+    dist = _displacement_distance(grid.shape)
+    hist = np.bincount(dist.ravel(), weights=counts.ravel())
+    return np.rint(hist).astype(np.int64)
+
+
+def _router_distance_counts_pairs(occupancy):
+    shape = occupancy.shape
+    flat = occupancy.ravel(order="F")
+    routers = np.flatnonzero(flat)
+    mult = flat[routers].astype(np.int64)
+    dist = router_distance(routers[:, None], routers[None, :], shape)
+    return np.bincount(dist.ravel(), weights=(mult[:, None] * mult[None, :]).ravel()).astype(np.int64)
+
+
+def all_pairs_hop_histogram(nodes, shape, hosts_per_router, endpoint_hops=ENDPOINT_HOPS):
+    """
+    Counter of hop count -> number of ordered node pairs (i != j) of a job.
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    if nodes.size < 2:
+        return Counter()
+
+    occupancy = router_occupancy(nodes, shape, hosts_per_router)
+    occupied = int(np.count_nonzero(occupancy))
+    if occupied * occupied <= occupancy.size:
+        hist = _router_distance_counts_pairs(occupancy)
+    else:
+        hist = _router_distance_counts_fft(occupancy)
+    hist[0] -= nodes.size  # drop the i == j pairs
+
+    return counter_from_bincount(hist, endpoint_hops)
+
+
+def root_hop_histogram(nodes, root, shape, hosts_per_router, endpoint_hops=ENDPOINT_HOPS):
+    """
+    Counter of hop count -> number of nodes reached from root (root excluded).
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    others = nodes[nodes != root]
+    if others.size == 0:
+        return Counter()
+
+    dist = router_distance(root // hosts_per_router, others // hosts_per_router, shape)
+    hist = np.bincount(dist)
+    return counter_from_bincount(hist, endpoint_hops)
+
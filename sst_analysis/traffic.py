@@ -0,0 +1,215 @@
+"""
+Sparse traffic matrices: bytes sent between the ranks (or nodes) of jobs.
+
+A TrafficMatrix over `size` indices is a list of blocks:
+
+    sparse  (src, dst, bytes) int64 arrays, duplicates allowed (COO)
+    dense   (members, bytes): every ordered pair of distinct members
+            exchanges `bytes`, stored as the member list only
+
+from_job() uses a dense block for the all-pairs patterns (Allreduce and
+Alltoall, as in jobs.pair_traffic) and sparse blocks for everything else, so
+memory stays close to the number of distinct messages: a 100k-rank Bcast
+takes O(n), a 100k-rank Alltoall O(n) too. Dense blocks are expanded
+(to_coo) or reduced against a distance model or matrix (byte_hops,
+hop_histogram) in row chunks of at most `block_pairs` pairs.
+
+Matrices of several jobs are concatenated with each job's ranks shifted
+by the sizes of the jobs before it (`offsets`, as in placement.comm_graph),
+and map_ranks() relabels ranks as nodes through an allocation;
+placed_traffic() gives the node-level matrix of every job of a placed mix.
+
+TrafficMatrix is the traffic input of placement, linkload, session,
+interference, flowsim and ugal. The hop-histogram engines (the per-topology
+all-pairs histograms, sampling, parallel and faults) count pairs from router
+occupancy or samples and never materialize the traffic, and schedules keeps
+the per-step arrays a summed matrix would lose.
+"""
+from collections import Counter
+
+import numpy as np
+
+from sst_analysis.jobs import iterations, message_bytes, pair_traffic
+
+# Patterns in which every ordered pair of ranks communicates
+DENSE_PATTERNS = ("Allreduce", "Alltoall")
+
+
+def _distance_function(distance):
+    # model.distance, or element lookup in a distance matrix
+    if hasattr(distance, "distance"):
+        return distance.distance
+    matrix = np.asarray(distance)
+    return lambda a, b: matrix[a, b]
+
+
+class TrafficMatrix:
+    """
+    Bytes exchanged between `size` ranks or nodes, as sparse and dense blocks.
+    """
+
+    def __init__(self, size, sparse=None, dense=None, offsets=None):
+        self.size = int(size)
+        self.sparse = list(sparse or [])
+        self.dense = list(dense or [])
+        self.offsets = np.array([0, self.size] if offsets is None else offsets, dtype=np.int64)
+
+    @classmethod
+    def from_job(cls, job, algorithm=None):
+        """
+        Traffic of one job over all its iterations. With an algorithm (see
+        schedules.ALGORITHMS) the pairs come from the collective's schedule
+        instead of jobs.pair_traffic.
+        """
+        size = job["size"]
+        if algorithm is not None:
+            from sst_analysis.schedules import schedule_traffic
+            return cls(size, sparse=[schedule_traffic(job, algorithm)])
+        if job["pattern"] in DENSE_PATTERNS:
+            members = np.arange(size, dtype=np.int64)
+            return cls(size, dense=[(members, message_bytes(job) * iterations(job))] if size > 1 else [])
+        return cls(size, sparse=[pair_traffic(job)])
+
+    @classmethod
+    def from_jobs(cls, jobs, algorithm=None):
+        return cls.concat([cls.from_job(job, algorithm) for job in jobs])
+
+    @classmethod
+    def concat(cls, matrices):
+        """
+        Block-diagonal concatenation: the indices of each matrix are shifted by
+        the sizes of the matrices before it.
+        """
+        offsets = np.concatenate([[0], np.cumsum([m.size for m in matrices])]).astype(np.int64)
+        sparse, dense = [], []
+        for m, offset in zip(matrices, offsets):
+            sparse += [(s + offset, d + offset, w) for s, d, w in m.sparse]
+            dense += [(members + offset, w) for members, w in m.dense]
+        return cls(offsets[-1], sparse, dense, offsets)
+
+    def map_ranks(self, rank_to_node, num_nodes=None):
+        """
+        The same traffic between nodes: index i becomes rank_to_node[i]. For
+        concatenated jobs pass the concatenation of their rank -> node maps.
+        """
+        mapping = np.asarray(rank_to_node, dtype=np.int64)
+        if mapping.size != self.size:
+            raise ValueError(f"mapping has {mapping.size} entries for {self.size} ranks")
+        size = int(num_nodes) if num_nodes is not None else int(mapping.max(initial=-1)) + 1
+        return TrafficMatrix(size, [(mapping[s], mapping[d], w) for s, d, w in self.sparse],
+                             [(mapping[members], w) for members, w in self.dense], offsets=[0, size])
+
+    def block(self, job):
+        """
+        The traffic of the job-th concatenated job, in its own rank numbering.
+        """
+        lo, hi = self.offsets[job], self.offsets[job + 1]
+        sparse = []
+        for s, d, w in self.sparse:
+            mine = (s >= lo) & (s < hi)
+            if mine.any():
+                sparse.append((s[mine] - lo, d[mine] - lo, w[mine]))
+        dense = [(members - lo, w) for members, w in self.dense
+                 if members.size and lo <= members[0] < hi]
+        return TrafficMatrix(hi - lo, sparse, dense)
+
+    @property
+    def nnz(self):
+        """
+        Number of stored messages, dense blocks counted as all their pairs.
+        """
+        return sum(s.size for s, _, _ in self.sparse) + sum(m.size * (m.size - 1) for m, _ in self.dense)
+
+    @property
+    def stored(self):
+        """
+        Number of stored index entries (the memory footprint in words / 2).
+        """
+        return sum(s.size for s, _, _ in self.sparse) + sum(m.size for m, _ in self.dense)
+
+    def total_bytes(self):
+        return (sum(int(np.sum(w)) for _, _, w in self.sparse)
+                + sum(int(w) * m.size * (m.size - 1) for m, w in self.dense))
+
+    def _dense_chunks(self, block_pairs):
+        # (members, first row, end row, bytes) per row chunk of each dense block
+        for members, w in self.dense:
+            rows = max(1, block_pairs // max(members.size, 1))
+            for lo in range(0, members.size, rows):
+                yield members, lo, min(lo + rows, members.size), w
+
+    def to_coo(self, block_pairs=1 << 24):
+        """
+        (src, dst, bytes) arrays of every message, dense blocks expanded.
+        """
+        src = [s for s, _, _ in self.sparse]
+        dst = [d for _, d, _ in self.sparse]
+        nbytes = [np.broadcast_to(np.asarray(w, dtype=np.int64), s.shape) for s, _, w in self.sparse]
+        for members, lo, hi, w in self._dense_chunks(block_pairs):
+            rows = np.arange(lo, hi)
+            i = np.repeat(rows, members.size)
+            j = np.tile(np.arange(members.size), hi - lo)
+            keep = i != j
+            src.append(members[i[keep]])
+            dst.append(members[j[keep]])
+            nbytes.append(np.full(int(keep.sum()), w, dtype=np.int64))
+        if not src:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        return np.concatenate(src), np.concatenate(dst), np.concatenate(nbytes)
+
+    def to_csr(self):
+        """
+        (indptr, indices, bytes) with duplicate entries summed.
+        """
+        src, dst, nbytes = self.to_coo()
+        keys, inverse = np.unique(src * self.size + dst, return_inverse=True)
+        data = np.bincount(inverse.ravel(), weights=nbytes, minlength=keys.size).astype(np.int64)
+        rows = keys // self.size
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=self.size))]).astype(np.int64)
+        return indptr, keys % self.size, data
+
+    def byte_hops(self, distance, block_pairs=1 << 22):
+        """
+        sum(bytes * distance) over all messages; distance is a topology
+        model (e.g. topology.MeshModel) or an index x index distance matrix.
+        """
+        dist = _distance_function(distance)
+        total = sum(float(np.dot(np.broadcast_to(w, s.shape), dist(s, d))) for s, d, w in self.sparse)
+        for members, lo, hi, w in self._dense_chunks(block_pairs):
+            # distance(a, a) is 0, so the diagonal adds nothing
+            total += float(w) * float(dist(members[lo:hi, None], members[None, :]).sum())
+        return total
+
+    def hop_histogram(self, distance, weight="bytes", block_pairs=1 << 22):
+        """
+        Counter of distance -> bytes (weight="bytes") or -> messages
+        (weight="pairs").
+        """
+        dist = _distance_function(distance)
+        sums = np.zeros(0)
+
+        def add(hops, w):
+            nonlocal sums
+            counts = np.bincount(hops.ravel(), weights=None if weight == "pairs" else w.ravel()).astype(np.float64)
+            if counts.size > sums.size:
+                counts[:sums.size] += sums
+                sums = counts
+            else:
+                sums[:counts.size] += counts
+
+        for s, d, w in self.sparse:
+            add(np.asarray(dist(s, d), dtype=np.int64), np.broadcast_to(np.asarray(w, dtype=np.float64), s.shape))
+        for members, lo, hi, w in self._dense_chunks(block_pairs):
+            hops = np.asarray(dist(members[lo:hi, None], members[None, :]), dtype=np.int64)
+            off_diagonal = np.arange(lo, hi)[:, None] != np.arange(members.size)[None, :]
+            add(hops[off_diagonal], np.full(int(off_diagonal.sum()), float(w)))
+        return Counter({h: int(round(c)) for h, c in enumerate(sums) if c > 0})
+
+
+def placed_traffic(jobs, maps, num_nodes=None, algorithm=None):
+    """
+    One node-level TrafficMatrix per job, ranks placed by the rank -> node
+    maps (see allocation.py).
+    """
+    return [TrafficMatrix.from_job(job, algorithm).map_ranks(nodes, num_nodes) for job, nodes in zip(jobs, maps)]
@@ -0,0 +1,205 @@
+"""
+Flow-level emulation of merlin's UGAL adaptive routing.
+
+Every flow (src node, dst node, bytes) has a minimal route and one Valiant
+route, both from linkload.route_incidence:
+
+    dragonfly     Valiant goes through a random intermediate group: minimal
+                  route to the router where the first global link lands,
+                  then minimal route on to the destination. Pairs within one
+                  group always route minimally, as in merlin.
+    other models  Valiant goes through a random intermediate router.
+
+Queue occupancy is estimated as the bytes routed over a link. Like merlin's
+UGAL, which compares the output queues at the source router weighted by
+path length, a flow takes the Valiant route when
+
+    q_min * hops_min > adaptive_threshold * q_val * hops_val
+
+with q the load of the route's first router-to-router link. Starting from
+all-minimal routing, the Valiant share of every flow moves toward its
+current choice by the method of successive averages until the link loads
+change by less than `tol` of the peak load. The steps shrink as
+1 / iteration, so flows whose choice keeps flipping (adversarial traffic)
+need a few hundred iterations for tol=1e-3. All steps are vectorized over
+flows.
+"""
+import argparse
+import json
+from collections import Counter
+
+import numpy as np
+
+from sst_analysis.hops import ENDPOINT_HOPS
+from sst_analysis.linkload import hotspots, num_links, route_incidence
+from sst_analysis.sweep import parse_bandwidth
+from sst_analysis.topology import DragonflyModel, model_from_topology
+from sst_analysis.traffic import placed_traffic
+
+
+def job_flows(jobs, maps):
+    """
+    (src, dst, bytes) node-level flow arrays of all jobs under rank -> node maps.
+    """
+    src, dst, nbytes = [], [], []
+    for traffic in placed_traffic(jobs, maps):
+        s, d, w = traffic.to_coo()
+        src.append(s)
+        dst.append(d)
+        nbytes.append(w)
+    if not src:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    return np.concatenate(src), np.concatenate(dst), np.concatenate(nbytes)
+
+
+def _valiant_waypoints(model, ra, rb, rng):
+    # (waypoint router, eligible) for every flow
+    if isinstance(model, DragonflyModel):
+        rpg = model.routers_per_group
+        ga, gb = ra // rpg, rb // rpg
+        eligible = ga != gb
+        if model.num_groups < 3:
+            return ra, np.zeros(ra.size, dtype=bool)
+        # Uniform over the groups other than ga and gb
+        mid = rng.integers(0, model.num_groups - 2, ra.size)
+        low, high = np.minimum(ga, gb), np.maximum(ga, gb)
+        mid = mid + (mid >= low)
+        mid = mid + (mid >= high)
+        mid = np.where(eligible, mid, (ga + 1) % model.num_groups)
+        # Land where the source router's (or its group's first) link to mid arrives
+        out_gw, in_gw = model.link_ends(ga, mid)
+        k = np.argmax(out_gw == ra[:, None], axis=1)
+        return in_gw[np.arange(ra.size), k], eligible
+    mid = rng.integers(0, model.num_routers, ra.size)
+    return mid, ra != rb
+
+
+def _first_links(pair, link, num_flows):
+    # Link of each flow's first hop (-1 for flows without router hops)
+    first = np.full(num_flows, -1, dtype=np.int64)
+    flows, index = np.unique(pair, return_index=True)
+    first[flows] = link[index]
+    return first
+
+
+def emulate_ugal(model, src, dst, nbytes, adaptive_threshold=2.0, max_iterations=1000, tol=1e-3,
+                 link_bw="12GB/s", seed=None):
+    """
+    Steady-state UGAL route split for node-level flows.
+
+    Flows between the same pair of routers share their routes and decisions
+    and are emulated together. Returns a dict with "valiant_share" (per
+    flow), "hop_histogram" (node hops -> expected number of flows),
+    "avg_hops", "link_loads" (bytes per link), "utilization" (per link,
+    relative to the bottleneck link finishing in "bottleneck_time" seconds at
+    link_bw), "iterations" and "converged".
+    """
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    nbytes = np.broadcast_to(np.asarray(nbytes, dtype=np.float64), src.shape)
+    keep = src != dst
+    rng = np.random.default_rng(seed)
+    links = num_links(model)
+
+    # One emulated flow per (source router, destination router)
+    ra_all, rb_all = model.router_of(src[keep]), model.router_of(dst[keep])
+    keys, inverse = np.unique(ra_all * model.num_routers + rb_all, return_inverse=True)
+    inverse = inverse.ravel()
+    ra, rb = keys // model.num_routers, keys % model.num_routers
+    volume = np.bincount(inverse, weights=nbytes[keep], minlength=keys.size)
+    members = np.bincount(inverse, minlength=keys.size)
+
+    min_pair, min_link = route_incidence(model, ra, rb)
+    waypoint, eligible = _valiant_waypoints(model, ra, rb, rng)
+    p1, l1 = route_incidence(model, ra, waypoint)
+    p2, l2 = route_incidence(model, waypoint, rb)
+    val_pair, val_link = np.concatenate([p1, p2]), np.concatenate([l1, l2])
+
+    hops_min = np.bincount(min_pair, minlength=keys.size)
+    hops_val = np.bincount(val_pair, minlength=keys.size)
+    first_min = _first_links(min_pair, min_link, keys.size)
+    first_val = _first_links(val_pair, val_link, keys.size)
+    eligible &= (first_min >= 0) & (first_val >= 0)
+    min_bytes = volume[min_pair]
+    val_bytes = volume[val_pair]
+
+    def link_loads(share):
+        return (np.bincount(min_link, weights=min_bytes * (1 - share[min_pair]), minlength=links)
+                + np.bincount(val_link, weights=val_bytes * share[val_pair], minlength=links))
+
+    # Method of successive averages: move every share toward the current best
+    # response with step 1 / (iteration + 1), which settles oscillating choices
+    share = np.zeros(keys.size)
+    loads = link_loads(share)
+    converged = False
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        q_min = loads[first_min] * hops_min
+        q_val = loads[first_val] * hops_val
+        choice = (eligible & (q_min > adaptive_threshold * q_val)).astype(np.float64)
+        share += (choice - share) / (iterations + 1)
+        new_loads = link_loads(share)
+        peak = new_loads.max(initial=0.0)
+        change = np.abs(new_loads - loads).max(initial=0.0) / peak if peak else 0.0
+        loads = new_loads
+        if change < tol:
+            converged = True
+            break
+
+    bandwidth = parse_bandwidth(link_bw)
+    bottleneck = loads.max(initial=0.0) / bandwidth
+    hist = Counter()
+    for hops, weight in ((hops_min, members * (1 - share)), (hops_val, members * share)):
+        sums = np.bincount(hops, weights=weight)
+        for d, c in enumerate(sums):
+            if c > 0:
+                hist[d + ENDPOINT_HOPS] += float(c)
+    # Flows with src == dst never enter the network
+    flows = int(keep.sum())
+    avg = sum(h * c for h, c in hist.items()) / flows if flows else 0.0
+    flow_share = np.zeros(src.size)
+    flow_share[keep] = share[inverse]
+    return {
+        "valiant_share": flow_share,
+        "hop_histogram": hist,
+        "avg_hops": avg,
+        "link_loads": loads,
+        "utilization": loads / (bandwidth * bottleneck) if bottleneck > 0 else loads,
+        "bottleneck_time": bottleneck,
+        "iterations": iterations,
+        "converged": converged,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emulate UGAL routing at flow level")
+    parser.add_argument("spec", help="spec with 'topology', 'router' and 'jobs' (sweep format)")
+    parser.add_argument("--allocation", default=None, help="allocation JSON from sst_analysis.placement")
+    parser.add_argument("--threshold", type=float, default=2.0, help="merlin's adaptive_threshold")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    model = model_from_topology(spec["topology"])
+    jobs = spec["jobs"]
+    if args.allocation:
+        with open(args.allocation) as f:
+            maps = [np.array(entry["nodes"], dtype=np.int64) for entry in json.load(f)]
+    else:
+        from sst_analysis.allocation import allocate
+        maps = allocate(jobs, model.num_nodes, spec.get("allocation", "linear"), seed=args.seed)
+
+    src, dst, nbytes = job_flows(jobs, maps)
+    result = emulate_ugal(model, src, dst, nbytes, args.threshold,
+                          link_bw=spec.get("router", {}).get("link_bw", "12GB/s"), seed=args.seed)
+    print(f"Flows: {src.size}  Valiant share: {result['valiant_share'].mean():.1%}  "
+          f"iterations: {result['iterations']}{'' if result['converged'] else ' (not converged)'}")
+    print(f"Average hops: {result['avg_hops']:.3f}")
+    print(f"Hop distribution: { {h: round(c, 1) for h, c in sorted(result['hop_histogram'].items())} }")
+    print(f"Bottleneck time: {result['bottleneck_time'] * 1e6:.3f} us")
+    for spot in hotspots(model, result["link_loads"], args.top):
+        print(f"  link {spot['link']:>6} {spot['kind']:<6} {spot['src_router']:>5} -> {spot['dst_router']:<5} "
+              f"{spot['bytes']:>12.0f} B")
@@ -0,0 +1,74 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from sst_analysis.allocation import allocate, allocated_nodes, curve_order
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Shipped runs that call allocateNodes(ep, "random") for every job: stats file,
+# number of nodes and the job sizes of the config next to it
+SST_RUNS = {
+    "torus": (os.path.join(REPO, "Multijob_2", "torus", "torus_stats.csv"), 640, [32, 64, 128, 256]),
+    "dragonfly": (os.path.join(REPO, "Multijob_2", "dragonfly", "dragonfly_stats.csv"), 512, [16, 64, 32, 64]),
+}
+
+
+def _jobs(sizes):
+    return [{"size": size, "start": 0, "pattern": "Alltoall"} for size in sizes]
+
+
+@pytest.mark.parametrize("run", sorted(SST_RUNS))
+def test_sst_random_run(run):
+    path, num_nodes, sizes = SST_RUNS[run]
+    used = allocated_nodes(path)
+    assert used.size == sum(sizes)
+    assert used.min() >= 0 and used.max() < num_nodes
+    # Not the linear placement
+    assert not np.array_equal(used, np.arange(sum(sizes)))
+    maps = allocate(_jobs(sizes), num_nodes, "random", seed=0)
+    assert [m.size for m in maps] == sizes
+    assert np.unique(np.concatenate(maps)).size == used.size
+
+
+@pytest.mark.parametrize("exact", [False, True])
+def test_random_is_seeded_and_disjoint(exact):
+    jobs = _jobs([5, 17, 40, 1])
+    first = allocate(jobs, 100, "random", seed=3, exact=exact)
+    again = allocate(jobs, 100, "random", seed=3, exact=exact)
+    assert all(np.array_equal(a, b) for a, b in zip(first, again))
+    nodes = np.concatenate(first)
+    assert np.unique(nodes).size == nodes.size
+    assert nodes.min() >= 0 and nodes.max() < 100
+
+
+def test_random_default_is_fast():
+    jobs = _jobs([10000] * 10)
+    started = time.perf_counter()
+    allocate(jobs, 100000, "random", seed=0)
+    assert time.perf_counter() - started < 0.2
+
+
+def test_deterministic_policies():
+    jobs = _jobs([3, 2, 4])
+    assert [m.tolist() for m in allocate(jobs, 12, "linear")] == [[0, 1, 2], [3, 4], [5, 6, 7, 8]]
+    assert [m.tolist() for m in allocate(jobs, 12, "interleaved")] == [[0, 3, 6], [1, 4], [2, 5, 7, 8]]
+    assert [m.tolist() for m in allocate(jobs, 12, "block", block_size=4)] == [[0, 1, 2], [4, 5], [8, 9, 10, 11]]
+    order = curve_order((4, 4))
+    assert sorted(order.tolist()) == list(range(16))
+    # Consecutive Hilbert positions are grid neighbours
+    x, y = order % 4, order // 4
+    assert np.all(np.abs(np.diff(x)) + np.abs(np.diff(y)) == 1)
+    maps = allocate(jobs, 16, "curve", shape=(4, 4))
+    assert np.array_equal(np.concatenate(maps), order[:9])
+
+
+def test_capacity_and_arguments():
+    with pytest.raises(ValueError):
+        allocate(_jobs([8, 8]), 10, "linear")
+    with pytest.raises(ValueError):
+        allocate(_jobs([2]), 10, "block")
+    with pytest.raises(ValueError):
+        allocate(_jobs([2]), 10, "spiral")
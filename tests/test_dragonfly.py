@@ -0,0 +1,131 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+import pytest
+
+from sst_analysis.dragonfly import all_pairs_hop_histogram, root_hop_histogram
+from sst_analysis.topology import DragonflyModel
+
+# (num_groups, routers_per_group, hosts_per_router, intergroup_links)
+CONFIGS = [(5, 4, 2, 2), (7, 3, 1, 2), (9, 4, 1, 1), (5, 2, 3, 3), (4, 3, 2, 4)]
+ROUTES = ["absolute", "relative"]
+
+
+def _wiring(model):
+    # links[g][h] = slots of the global links from g to h, in link order, walking merlin's port map
+    groups = model.num_groups
+    links = defaultdict(lambda: defaultdict(list))
+    for g in range(groups):
+        for slot in range(model.routers_per_group * model.global_ports):
+            if slot >= model.intergroup_links * (groups - 1):
+                continue
+            link = slot % (groups - 1)
+            if model.global_routes == "absolute":
+                h = link if link < g else link + 1
+            else:
+                h = (g + link + 1) % groups
+            links[g][h].append(slot)
+    return links
+
+
+def _ends(model, links, ga, gb):
+    rpg, ports = model.routers_per_group, model.global_ports
+    return [(ga * rpg + a // ports, gb * rpg + b // ports) for a, b in zip(links[ga][gb], links[gb][ga])]
+
+
+def _minimal(model, links, ra, rb):
+    rpg = model.routers_per_group
+    ga, gb = ra // rpg, rb // rpg
+    if ga == gb:
+        return int(ra != rb)
+    return min((ra != out) + 1 + (inn != rb) for out, inn in _ends(model, links, ga, gb))
+
+
+def _valiant(model, links, ra, rb):
+    # Mean over the intermediate groups of the shortest route through each
+    rpg = model.routers_per_group
+    ga, gb = ra // rpg, rb // rpg
+    if ga == gb:
+        return Counter({_minimal(model, links, ra, rb): 1.0})
+    mids = [m for m in range(model.num_groups) if m not in (ga, gb)]
+    hops = Counter()
+    for mid in mids:
+        best = min((ra != out1) + 1 + (in1 != out2) + 1 + (in2 != rb)
+                   for out1, in1 in _ends(model, links, ga, mid) for out2, in2 in _ends(model, links, mid, gb))
+        hops[best] += 1.0 / len(mids)
+    return hops
+
+
+def _assert_close(actual, expected):
+    assert sorted(actual) == sorted(k for k, v in expected.items() if v > 1e-9)
+    for hops, count in expected.items():
+        assert actual[hops] == pytest.approx(count)
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("routes", ROUTES)
+def test_gateway_table_matches_port_map(config, routes):
+    model = DragonflyModel(*config, routes)
+    links = _wiring(model)
+    table = model.gateway_slots()
+    groups = model.num_groups
+    for g in range(groups):
+        assert np.all(table[g, g] == -1)
+        for h in range(groups):
+            if h != g:
+                # Every group pair gets intergroup_links links, wired k-th to k-th
+                assert table[g, h].tolist() == links[g][h]
+                assert len(links[g][h]) == len(links[h][g]) == model.intergroup_links
+    ra, rb = np.meshgrid(np.arange(model.num_routers), np.arange(model.num_routers), indexing="ij")
+    out_gw, in_gw = model.gateway_routers(ra // model.routers_per_group, rb // model.routers_per_group, 0)
+    inter = ra // model.routers_per_group != rb // model.routers_per_group
+    expected = [_ends(model, links, a // model.routers_per_group, b // model.routers_per_group)[0]
+                for a, b in zip(ra[inter], rb[inter])]
+    assert list(zip(out_gw[inter].tolist(), in_gw[inter].tolist())) == expected
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("routes", ROUTES)
+def test_router_distances_match_enumeration(config, routes):
+    model = DragonflyModel(*config, routes)
+    links = _wiring(model)
+    n = model.num_routers
+    ra, rb = (r.ravel() for r in np.meshgrid(np.arange(n), np.arange(n), indexing="ij"))
+    expected = [_minimal(model, links, a, b) for a, b in zip(ra.tolist(), rb.tolist())]
+    assert model.router_distance(ra, rb).tolist() == expected
+    mean = model.mean_valiant_router_distance(ra, rb)
+    for a, b, value in zip(ra.tolist(), rb.tolist(), mean):
+        assert value == pytest.approx(sum(h * c for h, c in _valiant(model, links, a, b).items()))
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("routes", ROUTES)
+def test_occupancy_histograms_match_pairs(config, routes):
+    model = DragonflyModel(*config, routes)
+    links = _wiring(model)
+    hosts = model.hosts_per_router
+    rng = np.random.default_rng(sum(config))
+    nodes = rng.choice(model.num_nodes, min(40, model.num_nodes), replace=False)
+    routers = (nodes // hosts).tolist()
+
+    minimal, valiant = Counter(), Counter()
+    for i, a in enumerate(routers):
+        for j, b in enumerate(routers):
+            if i != j:
+                minimal[_minimal(model, links, a, b) + 2] += 1
+                for hops, share in _valiant(model, links, a, b).items():
+                    valiant[hops + 2] += share
+    assert all_pairs_hop_histogram(nodes, model, method="groups") == minimal
+    # Small blocks split the group pairs over several passes
+    assert all_pairs_hop_histogram(nodes, model, method="groups", block_pairs=3) == minimal
+    assert all_pairs_hop_histogram(nodes, model, method="routers", block_pairs=5) == minimal
+    _assert_close(all_pairs_hop_histogram(nodes, model, "valiant"), valiant)
+
+    root = int(nodes[3])
+    minimal, valiant = Counter(), Counter()
+    for b in routers[:3] + routers[4:]:
+        minimal[_minimal(model, links, root // hosts, b) + 2] += 1
+        for hops, share in _valiant(model, links, root // hosts, b).items():
+            valiant[hops + 2] += share
+    assert root_hop_histogram(nodes, root, model) == minimal
+    _assert_close(root_hop_histogram(nodes, root, model, "valiant"), valiant)
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from sst_analysis.faults import DegradedTopology, sweep_link_failures
+from sst_analysis.polarfly import UNREACHABLE, all_pairs_distances
+from sst_analysis.topology import DragonflyModel, TorusModel, model_from_topology
+
+
+def _bfs_distances(topo):
+    # Full recompute over the live links, for the live routers
+    live = topo._live_slots(np.arange(topo.num_routers))
+    indptr = np.concatenate([[0], np.cumsum(live.sum(axis=1))])
+    dist = all_pairs_distances(indptr, topo.neighbours[live])
+    return dist[np.ix_(topo.alive, topo.alive)]
+
+
+def _live_block(topo):
+    return topo.dist[np.ix_(topo.alive, topo.alive)]
+
+
+MODELS = {
+    "torus": lambda: TorusModel((4, 5)),
+    "dragonfly": lambda: DragonflyModel(5, 4, 2, 1),
+    "polarfly": lambda: model_from_topology({"type": "topoPolarFly", "q": 5}),
+}
+
+
+@pytest.mark.parametrize("name", sorted(MODELS))
+def test_random_updates_match_bfs(name):
+    topo = DegradedTopology(MODELS[name]())
+    rng = np.random.default_rng(7)
+    failed_links, failed_routers, changes = [], [], []
+    for _ in range(40):
+        action = rng.integers(5)
+        if action == 0:
+            a, b = topo.edges()
+            if not a.size:
+                continue
+            k = rng.integers(a.size)
+            changes.append(topo.fail_links([(a[k], b[k])]))
+            failed_links.append((a[k], b[k]))
+        elif action == 1 and failed_links:
+            changes.append(topo.restore_links([failed_links.pop(rng.integers(len(failed_links)))]))
+        elif action == 2 and topo.alive.sum() > 2:
+            router = int(rng.choice(np.flatnonzero(topo.alive)))
+            changes.append(topo.fail_routers([router]))
+            failed_routers.append(router)
+        elif action == 3 and failed_routers:
+            changes.append(topo.restore_routers([failed_routers.pop(rng.integers(len(failed_routers)))]))
+        elif action == 4 and changes:
+            topo.undo(changes.pop())
+            # Element bookkeeping follows the restored state
+            failed_routers = [r for r in failed_routers if not topo.alive[r]]
+            failed_links = [(a, b) for a, b in failed_links if topo.links[a, topo._slot(a, b)] == 0]
+        assert np.array_equal(_live_block(topo), _bfs_distances(topo))
+
+
+def test_undo_restores_table():
+    topo = DegradedTopology(TorusModel((4, 4)))
+    base = topo.dist.copy()
+    changes = [topo.fail_links([(0, 1)]), topo.fail_routers([5]), topo.fail_links([(2, 3)])]
+    for change in reversed(changes):
+        topo.undo(change)
+    assert np.array_equal(topo.dist, base)
+    assert topo.alive.all()
+
+
+def test_disconnection():
+    topo = DegradedTopology(model_from_topology({"type": "topoPolarFly", "q": 3}))
+    # Failing every neighbour of router 0 cuts it off
+    a, b = topo.edges()
+    neighbours = np.concatenate([b[a == 0], a[b == 0]])
+    topo.fail_routers(neighbours)
+    live = int(topo.alive.sum())
+    assert topo.disconnected_pairs() == 2 * (live - 1)
+    assert (topo.dist[0, topo.alive] == UNREACHABLE).sum() == live - 1
+
+
+def test_sweep_matches_recomputation():
+    model = TorusModel((4, 4), 2)
+    topo = DegradedTopology(model)
+    jobs = [{"size": 10, "start": 0, "pattern": "Alltoall"},
+            {"size": 8, "start": 12, "pattern": "Bcast", "params": "arg.root=3"}]
+    maps = [np.arange(0, 10), np.arange(12, 20)]
+    results = sweep_link_failures(topo, jobs, maps)
+    assert len(results) == topo.edges()[0].size
+    for entry in results:
+        change = topo.fail_links([entry["link"]])
+        histograms = topo.job_histograms(jobs, maps)
+        assert entry["diameter"] == topo.diameter()
+        assert entry["disconnected_pairs"] == topo.disconnected_pairs()
+        for idx, (hist, lost) in enumerate(histograms):
+            pairs = sum(hist.values())
+            avg = sum(h * c for h, c in hist.items()) / pairs if pairs else 0.0
+            assert entry["avg_hops"][idx] == pytest.approx(avg)
+            assert entry["disconnected"][idx] == lost
+        topo.undo(change)
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from sst_analysis.allocation import allocate
+from sst_analysis.flowsim import _csr, max_min_rates, simulate_flows, simulate_jobs
+from sst_analysis.interference import link_capacities
+from sst_analysis.linkload import num_links, route_incidence
+from sst_analysis.topology import DragonflyModel, MeshModel, TorusModel
+
+
+def _progressive_filling(incidence, capacity):
+    # Textbook max-min fair rates of a dense flow x link 0/1 matrix
+    num_flows = incidence.shape[0]
+    rates = np.zeros(num_flows)
+    open_flows = incidence.any(axis=1)
+    remaining = capacity.astype(np.float64)
+    while open_flows.any():
+        counts = incidence[open_flows].sum(axis=0)
+        used = counts > 0
+        level = (remaining[used] / counts[used]).min()
+        tight = used & np.isclose(remaining / np.maximum(counts, 1), level, rtol=1e-9)
+        frozen = open_flows & incidence[:, tight].any(axis=1)
+        rates[frozen] = level
+        remaining -= incidence[frozen].sum(axis=0) * level
+        open_flows &= ~frozen
+    return rates
+
+
+def _incidence(rows, cols, num_flows, num_links):
+    dense = np.zeros((num_flows, num_links), dtype=np.int64)
+    dense[rows, cols] = 1
+    return dense
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_max_min_rates_match_progressive_filling(seed):
+    rng = np.random.default_rng(seed)
+    num_flows, links = 40, 15
+    rows = np.repeat(np.arange(num_flows), rng.integers(1, 5, num_flows))
+    cols = rng.integers(links, size=rows.size)
+    dense = _incidence(rows, cols, num_flows, links)
+    rows, cols = np.nonzero(dense)
+    # Equal capacities give ties between links
+    capacity = rng.choice([1.0, 2.0, 3.5], links)
+    flow_ptr, flow_links = _csr(rows, cols, num_flows)
+    link_ptr, link_flows = _csr(cols, rows, links)
+    rates = max_min_rates(np.arange(num_flows), flow_ptr, flow_links, link_ptr, link_flows, capacity)
+    assert np.allclose(rates, _progressive_filling(dense, capacity))
+
+    # Feasible, and every flow has a saturated link on which no flow is faster
+    load = dense.T @ rates
+    assert np.all(load <= capacity * (1 + 1e-9))
+    for f in range(num_flows):
+        on = np.flatnonzero(dense[f])
+        saturated = np.isclose(load[on], capacity[on])
+        fastest = np.array([rates[dense[:, l] > 0].max() <= rates[f] * (1 + 1e-9) for l in on])
+        assert (saturated & fastest).any()
+
+
+def _naive_simulation(model, src, dst, nbytes, capacity):
+    # Full progressive filling over all unfinished flows at every completion
+    router_links = num_links(model)
+    pair, link = route_incidence(model, model.router_of(src), model.router_of(dst))
+    dense = _incidence(np.concatenate([pair, np.arange(src.size), np.arange(src.size)]),
+                       np.concatenate([link, router_links + src, router_links + model.num_nodes + dst]),
+                       src.size, capacity.size)
+    remaining = nbytes.astype(np.float64)
+    finish = np.zeros(src.size)
+    active = np.ones(src.size, dtype=bool)
+    now = 0.0
+    while active.any():
+        rates = _progressive_filling(dense * active[:, None], capacity)
+        left = np.where(active, remaining / np.where(active, rates, 1.0), np.inf)
+        step = left.min()
+        now += step
+        done = active & (left <= step * (1 + 1e-9))
+        remaining -= rates * step
+        finish[done] = now
+        active &= ~done
+    return finish
+
+
+@pytest.mark.parametrize("model", [MeshModel((4, 4), 2), TorusModel((4, 3), 2), DragonflyModel(4, 3, 2, 1)],
+                         ids=["mesh", "torus", "dragonfly"])
+def test_simulate_flows_matches_naive_simulation(model):
+    rng = np.random.default_rng(7)
+    src = rng.integers(model.num_nodes, size=60)
+    dst = (src + rng.integers(1, model.num_nodes, size=60)) % model.num_nodes
+    nbytes = rng.integers(1, 50, size=60) * 1000
+    result = simulate_flows(model, src, dst, nbytes, "10GB/s", "8GB/s", "20GB/s", merge_tol=1e-12)
+    capacity = link_capacities(model, "10GB/s", "8GB/s", "20GB/s")
+    assert result["links"] == capacity.size
+    assert np.allclose(result["finish"], _naive_simulation(model, src, dst, nbytes, capacity), rtol=1e-9)
+
+
+def test_shared_injection_link():
+    model = MeshModel((2, 1), 1)
+    # Two equal flows out of node 0 split its NIC: each at half rate, done together
+    result = simulate_flows(model, [0, 0], [1, 1], 1e9, "10GB/s")
+    assert np.allclose(result["finish"], 0.2)
+    # Local flows (src == dst) finish at time 0
+    assert simulate_flows(model, [1], [1], 100)["finish"].tolist() == [0.0]
+
+
+def test_simulate_jobs_completion():
+    model = MeshModel((4, 4), 2)
+    jobs = [{"size": 8, "start": 0, "pattern": "Alltoall",
+             "params": "arg.bytes=4096 arg.compute=1us arg.iterations=3"},
+            {"size": 6, "start": 8, "pattern": "Bcast", "params": "arg.count=1024"}]
+    maps = allocate(jobs, model.num_nodes, "random", seed=2)
+    per_job, result = simulate_jobs(model, jobs, maps)
+    assert sum(entry["flows"] for entry in per_job) == result["finish"].size
+    assert per_job[0]["compute_time"] == pytest.approx(3e-6)
+    for entry in per_job:
+        assert entry["completion_time"] == pytest.approx(entry["comm_time"] + entry["compute_time"])
+        assert entry["comm_time"] > 0
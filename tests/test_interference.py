@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from sst_analysis.allocation import allocate
+from sst_analysis.interference import interference_matrix, job_link_matrix, link_capacities
+from sst_analysis.jobs import pair_traffic
+from sst_analysis.linkload import link_loads, num_links
+from sst_analysis.topology import DragonflyModel, MeshModel
+
+JOBS = [
+    {"size": 14, "start": 0, "pattern": "Allreduce", "params": "arg.count=512 arg.iterations=2"},
+    {"size": 10, "start": 14, "pattern": "Alltoall", "params": "arg.bytes=256"},
+    {"size": 9, "start": 24, "pattern": "Bcast", "params": "arg.root=2 arg.count=1024"},
+    {"size": 8, "start": 33, "pattern": "Scatter", "params": "arg.count=128"},
+    {"size": 2, "start": 41, "pattern": "PingPong", "params": "arg.messageSize=65536"},
+]
+
+MODELS = {"mesh": MeshModel((5, 5), 2), "dragonfly": DragonflyModel(5, 4, 3, 1)}
+
+
+def _dense_loads(model, jobs, maps):
+    # job x link bytes: router links, then injection and ejection link of every node
+    rows = []
+    for job, nodes in zip(jobs, maps):
+        src, dst, nbytes = pair_traffic(job)
+        src, dst = nodes[src], nodes[dst]
+        rows.append(np.concatenate([link_loads(model, src, dst, nbytes),
+                                    np.bincount(src, weights=nbytes, minlength=model.num_nodes),
+                                    np.bincount(dst, weights=nbytes, minlength=model.num_nodes)]))
+    return np.array(rows)
+
+
+@pytest.mark.parametrize("name", sorted(MODELS))
+def test_matches_dense_reference(name):
+    model = MODELS[name]
+    maps = allocate(JOBS, model.num_nodes, "random", seed=11)
+    capacity = link_capacities(model, "10GB/s", "8GB/s", "20GB/s")
+    loads = _dense_loads(model, JOBS, maps)
+    assert loads.shape[1] == num_links(model) + 2 * model.num_nodes == capacity.size
+
+    job, link, nbytes = job_link_matrix(model, JOBS, maps)
+    sparse = np.zeros_like(loads)
+    sparse[job, link] = nbytes
+    assert np.allclose(sparse, loads)
+    assert np.all(nbytes > 0) and np.all(np.diff(link) >= 0)
+
+    used = loads > 0
+    time = loads / capacity
+    alone = time.max(axis=1)
+    num_jobs = len(JOBS)
+    pair = np.ones((num_jobs, num_jobs))
+    for i in range(num_jobs):
+        for j in range(num_jobs):
+            if i != j:
+                pair[i, j] = (time[i] + time[j])[used[i]].max() / alone[i]
+    shared = np.array([time.sum(axis=0)[used[i]].max() for i in range(num_jobs)])
+
+    result = interference_matrix(model, JOBS, maps, capacity)
+    assert np.allclose(result["overlap"], loads @ used.T)
+    assert np.array_equal(result["shared_links"], used.astype(np.int64) @ used.T.astype(np.int64))
+    assert np.allclose(result["alone"], alone)
+    assert np.allclose(result["pair_slowdown"], pair)
+    assert np.allclose(result["shared"], shared)
+    assert np.allclose(result["slowdown"], shared / alone)
+    # The random placement makes the jobs share router links
+    assert (result["shared_links"] - np.diag(np.diag(result["shared_links"]))).any()
+
+
+def test_lone_job_and_empty_job():
+    model = MODELS["mesh"]
+    jobs = [JOBS[0], {"size": 1, "start": 14, "pattern": "Allreduce"}]
+    maps = allocate(jobs, model.num_nodes, "linear")
+    result = interference_matrix(model, jobs, maps)
+    # No shared links: every slowdown is 1; the one-rank job sends nothing
+    assert np.allclose(result["slowdown"], 1.0)
+    assert np.allclose(result["pair_slowdown"], 1.0)
+    assert result["alone"][1] == 0 and result["overlap"][1].sum() == 0
@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from sst_analysis.allocation import allocated_nodes
+from sst_analysis.latency import LatencyIndex, comparison_table, job_latencies, scan_stats
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SINGLE_JOB = [os.path.join(REPO, "Singlejob_sst", d, f) for d, f in (
+    ("Mesh_topology", "mesh_stats.csv"), ("Polarfly_topology", "polarfly_stats.csv"),
+    ("Dragonfly_topology", "dragonfly.csv"))]
+TORUS = os.path.join(REPO, "Multijob_2", "torus", "torus_stats.csv")
+
+
+@pytest.mark.parametrize("path", SINGLE_JOB)
+def test_runs_without_nic_statistics(path):
+    summary = scan_stats(path)
+    assert not summary["nic_stats"]
+    assert summary["packet_latency_ns"] is None
+    assert 0 < summary["active_us"] <= summary["sim_time_us"]
+    with pytest.raises(ValueError, match="NIC"):
+        job_latencies(summary, [{"size": 4, "pattern": "Allreduce"}], [range(4)])
+
+
+def test_run_with_nic_statistics():
+    summary = scan_stats(TORUS)
+    assert summary["nic_stats"]
+    assert summary["nics"]["node"] == allocated_nodes(TORUS).tolist()
+    assert 0 < summary["packet_latency_ns"] <= summary["packet_latency_max_ns"]
+    (entry,) = job_latencies(summary, [{"size": 480, "pattern": "Alltoall"}], [summary["nics"]["node"]])
+    assert 0 < entry["completion_us"] <= summary["sim_time_us"]
+    assert entry["bytes"] == summary["bytes"]
+
+
+def test_index_reparses_only_changed_files(tmp_path):
+    paths = []
+    for src in SINGLE_JOB[:2]:
+        paths.append(str(tmp_path / os.path.basename(src)))
+        shutil.copyfile(src, paths[-1])
+    db = str(tmp_path / "index.sqlite")
+    index = LatencyIndex(db)
+    first, parsed = index.update(paths)
+    assert parsed == 2
+    assert index.update(paths) == (first, 0)
+    with open(paths[0], "a") as f:
+        f.write("rtr_9x9, idle_time, port0, Accumulator, 1, 0, 0, 0, 0, 0, 0\n")
+    assert index.update(paths)[1] == 1
+    index.close()
+
+    # Summaries of an older layout are reparsed
+    with sqlite3.connect(db) as conn:
+        row = conn.execute("SELECT summary FROM runs WHERE path = ?", (os.path.abspath(paths[1]),)).fetchone()
+        stale = json.loads(row[0])
+        del stale["version"], stale["nic_stats"]
+        conn.execute("UPDATE runs SET summary = ? WHERE path = ?", (json.dumps(stale), os.path.abspath(paths[1])))
+    index = LatencyIndex(db)
+    summaries, parsed = index.update(paths)
+    index.close()
+    assert parsed == 1 and summaries[paths[1]]["nic_stats"] is False
+
+    table = comparison_table(summaries)
+    assert table["Latency (us)"] == [summaries[p]["sim_time_us"] for p in paths]
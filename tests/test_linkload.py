@@ -0,0 +1,70 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from sst_analysis.linkload import link_endpoints, link_loads, num_links, route_incidence
+from sst_analysis.polarfly import all_pairs_distances, polarfly_adjacency
+from sst_analysis.topology import DistanceMatrixModel, DragonflyModel, MeshModel, TorusModel
+
+
+def _polarfly(q):
+    adjacency = polarfly_adjacency(q)
+    return DistanceMatrixModel(all_pairs_distances(*adjacency), 1, adjacency)
+
+
+MODELS = {
+    "mesh": MeshModel((4, 3), 1),
+    "mesh3d": MeshModel((3, 2, 3), 1),
+    "torus": TorusModel((5, 4), 1),
+    "torus3d": TorusModel((4, 3, 2), 1),
+    "dragonfly_absolute": DragonflyModel(5, 4, 1, 2, "absolute"),
+    "dragonfly_relative": DragonflyModel(5, 4, 1, 2, "relative"),
+    "dragonfly_uneven": DragonflyModel(7, 3, 1, 2, "relative"),
+    "polarfly_q3": _polarfly(3),
+    "polarfly_q5": _polarfly(5),
+}
+
+
+@pytest.mark.parametrize("name", sorted(MODELS))
+def test_routes_are_minimal_chains(name):
+    model = MODELS[name]
+    n = model.num_routers
+    ra, rb = (r.ravel() for r in np.meshgrid(np.arange(n), np.arange(n), indexing="ij"))
+    pair, link = route_incidence(model, ra, rb)
+    assert link.min() >= 0 and link.max() < num_links(model)
+    _, src, dst = link_endpoints(model, link)
+    # Every link joins two adjacent routers
+    assert np.all(model.router_distance(src, dst) == 1)
+
+    hops = np.bincount(pair, minlength=ra.size)
+    assert np.array_equal(hops, model.router_distance(ra, rb))
+    order = np.argsort(pair, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(hops)])
+    for p in range(ra.size):
+        edges = Counter(zip(src[order[starts[p]:starts[p + 1]]].tolist(),
+                            dst[order[starts[p]:starts[p + 1]]].tolist()))
+        # Walk from the source, using each link once, to the destination
+        cur = int(ra[p])
+        for _ in range(hops[p]):
+            step = [e for e in edges if e[0] == cur]
+            assert len(step) == 1, (name, ra[p], rb[p], edges)
+            edges[step[0]] -= 1
+            edges = +edges
+            cur = step[0][1]
+        assert cur == rb[p] and not edges
+    # A link is used at most once per route
+    assert np.unique(pair * num_links(model) + link).size == link.size
+
+
+@pytest.mark.parametrize("name", ["mesh", "torus", "dragonfly_relative", "polarfly_q3"])
+def test_link_loads_carry_byte_hops(name):
+    model = MODELS[name]
+    rng = np.random.default_rng(2)
+    src = rng.integers(model.num_nodes, size=300)
+    dst = rng.integers(model.num_nodes, size=300)
+    nbytes = rng.integers(1, 1000, size=300)
+    expected = float(np.dot(nbytes, model.router_distance(model.router_of(src), model.router_of(dst))))
+    assert link_loads(model, src, dst, nbytes).sum() == expected
+    # Chunking does not change the loads
+    assert np.array_equal(link_loads(model, src, dst, nbytes, chunk_links=7), link_loads(model, src, dst, nbytes))
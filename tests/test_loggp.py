@@ -0,0 +1,61 @@
+import os
+import runpy
+
+import numpy as np
+import pytest
+
+from sst_analysis.jobs import message_bytes, pair_traffic
+from sst_analysis.loggp import message_time, network_params, predict_latency
+from sst_analysis.topology import MeshModel
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+COMPARISON = os.path.join(REPO, "Singlejob_sst", "latency_comparison", "latency_comparison.py")
+
+
+@pytest.mark.parametrize("pattern,params,expected", [
+    ("Allreduce", "messageSize=1024", 8),
+    ("Allreduce", "", 8),
+    ("Allreduce", "arg.count=512 arg.iterations=1", 4096),
+    ("Bcast", "arg.root=0 arg.count=512", 4096),
+    ("Scatter", "arg.count=3 arg.bytes=99", 24),
+    ("Alltoall", "arg.bytes=512 arg.count=4", 512),
+    ("PingPong", "", 128),
+    ("PingPong", "messageSize=1024", 1024),
+    ("Barrier", "arg.count=512", 8),
+])
+def test_payload_follows_ember_motifs(pattern, params, expected):
+    assert message_bytes({"size": 4, "pattern": pattern, "params": params}) == expected
+
+
+def test_pair_traffic_bytes():
+    job = {"size": 4, "pattern": "Allreduce", "params": "arg.count=2 arg.iterations=3"}
+    src, dst, nbytes = pair_traffic(job)
+    assert src.size == 12 and np.all(nbytes == 2 * 8 * 3)
+
+
+def test_message_time():
+    net = network_params({"link_bw": "4GB/s", "flit_size": "8B", "input_latency": "20ns",
+                          "output_latency": "20ns"}, {"link_latency": "20ns"})
+    # 2 o + 3 links of (20 ns + 2 ns) + 2 routers of 40 ns + 400 B at 4 GB/s
+    assert message_time(400, 1, net) == pytest.approx(200e-9 + 66e-9 + 80e-9 + 100e-9)
+
+
+def test_bcast_rounds_add_up():
+    net = network_params({"link_bw": "4GB/s"})
+    job = {"size": 8, "start": 0, "pattern": "Bcast", "params": "arg.count=1"}
+    latency = predict_latency(job, net, MeshModel((8, 1)))
+    # Three binomial rounds: the slowest message of each is 4, 2 and 1 router hops
+    expected = sum(message_time(8, d, net) for d in (4, 2, 1)) * 1e6
+    assert latency == pytest.approx(expected)
+
+
+def test_single_job_comparison_against_sst():
+    pytest.importorskip("matplotlib")
+    pytest.importorskip("pandas")
+    script = runpy.run_path(COMPARISON, run_name="latency_comparison")
+    predicted = np.array(script["simulation_data"]["Predicted Latency (us)"])
+    measured = np.array(script["simulation_data"]["Latency (us)"])
+    assert predicted == pytest.approx([1.392, 3.280, 3.852], abs=1e-3)
+    # Same ranking of the topologies as SST, within the stated error
+    assert np.array_equal(np.argsort(predicted), np.argsort(measured))
+    assert np.all(np.abs(predicted - measured) / measured <= 0.35)
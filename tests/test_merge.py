@@ -0,0 +1,70 @@
+import os
+import random
+
+import pytest
+
+from sst_analysis.merge import merge_shards, record_key
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+STATS = os.path.join(REPO, "Multijob_2", "torus", "torus_stats.csv")
+
+
+def _write(path, header, lines):
+    with open(path, "w") as f:
+        f.write(header)
+        f.writelines(lines)
+    return str(path)
+
+
+def _shards(tmp_path, header, lines, ranks, seed):
+    # Components dealt to ranks as a parallel run partitions them, rows shuffled within each shard
+    rng = random.Random(seed)
+    components = sorted({record_key(line)[0] for line in lines})
+    owner = {comp: rng.randrange(ranks) for comp in components}
+    parts = [[] for _ in range(ranks)]
+    for line in lines:
+        parts[owner[record_key(line)[0]]].append(line)
+    for part in parts:
+        rng.shuffle(part)
+    return [_write(tmp_path / f"stats_{rank}.csv", header, part) for rank, part in enumerate(parts)]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_shuffled_shards_match_single_file(tmp_path, seed):
+    with open(STATS) as f:
+        header = f.readline()
+        lines = f.readlines()
+    single = tmp_path / "single.csv"
+    written = merge_shards([STATS], str(single), workers=1)
+    shards = _shards(tmp_path, header, lines, 4, seed)
+    merged = tmp_path / "merged.csv"
+    # Small runs and fan-in force several levels of intermediate merges
+    assert merge_shards(shards, str(merged), workers=2, chunk_rows=500, fan_in=3) == written == len(lines)
+    assert merged.read_text() == single.read_text()
+    rows = single.read_text().splitlines(keepends=True)
+    assert rows[0] == header
+    assert rows[1:] == sorted(lines, key=record_key)
+
+
+def test_duplicates_keep_earliest_shard(tmp_path):
+    with open(STATS) as f:
+        header = f.readline()
+        lines = f.readlines()[:200]
+    # Rank 1 repeats every tenth record of rank 0 with another value
+    first = _write(tmp_path / "stats_0.csv", header, lines)
+    changed = [line.rsplit(", ", 1)[0] + ", 999999\n" for line in lines[::10]]
+    second = _write(tmp_path / "stats_1.csv", header, changed)
+    out = tmp_path / "merged.csv"
+    assert merge_shards([first, second], str(out), workers=1, chunk_rows=7) == len(lines)
+    assert out.read_text().splitlines(keepends=True)[1:] == sorted(lines, key=record_key)
+    # Intermediate merges keep the shard order too
+    assert merge_shards([second, first], str(out), workers=1, chunk_rows=7, fan_in=3) == len(lines)
+    assert sum("999999" in line for line in out.read_text().splitlines()) == len(changed)
+    assert merge_shards([first, second], str(out), workers=1, dedupe=False) == len(lines) + len(changed)
+
+
+def test_rejects_mismatched_headers(tmp_path):
+    first = _write(tmp_path / "a.csv", "ComponentName, StatisticName, StatisticSubId, StatisticType, SimTime\n", [])
+    second = _write(tmp_path / "b.csv", "ComponentName, StatisticName, SimTime\n", [])
+    with pytest.raises(ValueError):
+        merge_shards([first, second], str(tmp_path / "out.csv"))
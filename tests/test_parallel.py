@@ -0,0 +1,52 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from sst_analysis.allocation import allocate
+from sst_analysis.jobs import ROOT_PATTERNS, job_root
+from sst_analysis.parallel import hop_histograms
+from sst_analysis.topology import DragonflyModel, MeshModel, TorusModel
+
+JOBS = [
+    {"size": 40, "start": 0, "pattern": "Allreduce"},
+    {"size": 25, "start": 40, "pattern": "Alltoall"},
+    {"size": 30, "start": 65, "pattern": "Scatter", "params": "arg.root=7"},
+    {"size": 18, "start": 95, "pattern": "Bcast"},
+    {"size": 1, "start": 113, "pattern": "Allreduce"},
+    {"size": 6, "start": 114, "pattern": "Barrier"},
+]
+
+MODELS = {
+    "mesh": MeshModel((6, 5), 4),
+    "torus": TorusModel((4, 4, 3), 3),
+    "dragonfly": DragonflyModel(8, 4, 4, 2),
+}
+
+
+def _exact(model, job, nodes):
+    # Every ordered pair of distinct ranks, or the root -> every other rank
+    if job["pattern"] in ROOT_PATTERNS:
+        root = job_root(job)
+        pairs = [(nodes[root], nodes[r]) for r in range(nodes.size) if r != root]
+    else:
+        pairs = [(a, b) for i, a in enumerate(nodes) for j, b in enumerate(nodes) if i != j]
+    return Counter(int(model.distance(a, b)) for a, b in pairs)
+
+
+@pytest.mark.parametrize("name", sorted(MODELS))
+@pytest.mark.parametrize("workers", [1, 3])
+def test_hop_histograms_match_enumeration(name, workers):
+    model = MODELS[name]
+    maps = allocate(JOBS, model.num_nodes, "random", seed=5)
+    # Small blocks and chunks, so every job is split over several tasks
+    histograms = hop_histograms(model, JOBS, maps, workers=workers, block_pairs=16, rank_chunk=7)
+    assert len(histograms) == len(JOBS)
+    for job, nodes, hist in zip(JOBS, maps, histograms):
+        assert hist == _exact(model, job, nodes)
+
+
+def test_workers_agree_on_default_blocks():
+    model = MODELS["dragonfly"]
+    maps = allocate(JOBS, model.num_nodes, "linear")
+    assert hop_histograms(model, JOBS, maps, workers=1) == hop_histograms(model, JOBS, maps, workers=2)
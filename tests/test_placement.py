@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from sst_analysis.allocation import allocate
+from sst_analysis.linkload import job_link_loads
+from sst_analysis.placement import (ByteHopCost, MaxLinkLoadCost, comm_graph, optimize_placement,
+                                    placement_cost)
+from sst_analysis.topology import DragonflyModel, MeshModel, TorusModel
+
+JOBS = [
+    {"size": 12, "start": 0, "pattern": "Allreduce", "params": "arg.count=256 arg.iterations=3"},
+    {"size": 8, "start": 12, "pattern": "Alltoall", "params": "arg.bytes=512"},
+    {"size": 9, "start": 20, "pattern": "Bcast", "params": "arg.root=4 arg.count=2048"},
+    {"size": 2, "start": 29, "pattern": "PingPong", "params": "arg.messageSize=8192"},
+]
+
+MODELS = {
+    "mesh": MeshModel((6, 6), 1),
+    "torus": TorusModel((4, 4), 3),
+    "dragonfly": DragonflyModel(5, 4, 2, 1),
+}
+
+
+def _moves(rng, assign, num_nodes, count):
+    # Random (rank, target node) moves onto free and occupied nodes
+    for _ in range(count):
+        yield int(rng.integers(assign.size)), int(rng.integers(num_nodes))
+
+
+@pytest.mark.parametrize("name", sorted(MODELS))
+@pytest.mark.parametrize("objective", ["byte_hops", "max_link_load"])
+def test_deltas_match_full_evaluation(name, objective):
+    model = MODELS[name]
+    maps = allocate(JOBS, model.num_nodes, "random", seed=1)
+    offsets, indptr, nbrs, weights = comm_graph(JOBS)
+    assign = np.concatenate(maps)
+    if objective == "byte_hops":
+        cost = ByteHopCost(model, (indptr, nbrs, weights), assign)
+    else:
+        cost = MaxLinkLoadCost(model, JOBS, assign)
+
+    def full():
+        return placement_cost(model, JOBS, [assign[offsets[j]:offsets[j + 1]] for j in range(len(JOBS))],
+                              objective)
+
+    owner = np.full(model.num_nodes, -1, dtype=np.int64)
+    owner[assign] = np.arange(assign.size)
+    current = full()
+    rng = np.random.default_rng(4)
+    for a, target in _moves(rng, assign, model.num_nodes, 60):
+        if target == assign[a]:
+            continue
+        b = owner[target]
+        delta = cost.delta(a, target, b)
+        # The delta leaves the placement untouched
+        assert full() == pytest.approx(current)
+        cost.commit()
+        p = assign[a]
+        assign[a], owner[target] = target, a
+        if b >= 0:
+            assign[b], owner[p] = p, b
+        else:
+            owner[p] = -1
+        new = full()
+        assert new - current == pytest.approx(delta, abs=1e-6 * max(current, 1.0))
+        current = new
+    if objective == "max_link_load":
+        maps = [assign[offsets[j]:offsets[j + 1]] for j in range(len(JOBS))]
+        assert np.allclose(cost.loads, job_link_loads(model, JOBS, maps))
+
+
+@pytest.mark.parametrize("name", sorted(MODELS))
+@pytest.mark.parametrize("objective", ["byte_hops", "max_link_load"])
+def test_never_worse_than_linear(name, objective):
+    model = MODELS[name]
+    linear = placement_cost(model, JOBS, allocate(JOBS, model.num_nodes, "linear"), objective)
+    for seed in range(3):
+        maps = optimize_placement(JOBS, model, iterations=300, seed=seed, objective=objective)
+        nodes = np.concatenate(maps)
+        assert [m.size for m in maps] == [job["size"] for job in JOBS]
+        assert np.unique(nodes).size == nodes.size and nodes.max() < model.num_nodes
+        assert placement_cost(model, JOBS, maps, objective) <= linear
+
+
+def test_unknown_objective():
+    with pytest.raises(ValueError):
+        optimize_placement(JOBS, MODELS["mesh"], iterations=10, objective="latency")
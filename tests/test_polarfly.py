@@ -0,0 +1,145 @@
+import os
+from collections import Counter, deque
+
+import numpy as np
+import pytest
+
+from sst_analysis.polarfly import (UNREACHABLE, all_pairs_distances, all_pairs_hop_histogram, distance_cache_path,
+                                   field_tables, load_distance_matrix, polarfly_adjacency, read_adjacency,
+                                   root_hop_histogram, write_adjacency)
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SHIPPED = {
+    3: os.path.join(REPO, "Singlejob_sst", "Polarfly_topology", "polarfly_data", "PolarFly.q_3.txt"),
+    25: os.path.join(REPO, "Multijob_2", "polarfly_topo", "polarfly_data", "PolarFly.q_25.txt"),
+}
+
+
+def _bfs(indptr, indices, sources=None):
+    n = indptr.size - 1
+    sources = range(n) if sources is None else sources
+    dist = np.full((n, n), UNREACHABLE, dtype=np.int64)
+    for source in sources:
+        dist[source, source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for v in indices[indptr[u]:indptr[u + 1]]:
+                if dist[source, v] == UNREACHABLE:
+                    dist[source, v] = dist[source, u] + 1
+                    queue.append(v)
+    return dist
+
+
+@pytest.mark.parametrize("q", sorted(SHIPPED))
+def test_shipped_adjacency(q):
+    indptr, indices = read_adjacency(SHIPPED[q])
+    n = q * q + q + 1
+    assert indptr.size == n + 1
+    src = np.repeat(np.arange(n), np.diff(indptr))
+    # Undirected, no self-loops
+    assert np.all(src != indices)
+    assert Counter(zip(src.tolist(), indices.tolist())) == Counter(zip(indices.tolist(), src.tolist()))
+
+
+@pytest.mark.parametrize("q", sorted(SHIPPED))
+def test_distances_match_bfs(q):
+    indptr, indices = read_adjacency(SHIPPED[q])
+    dist = all_pairs_distances(indptr, indices)
+    # Every source of q=3, and sources straddling the 64-source words of q=25
+    n = dist.shape[0]
+    sources = np.arange(n) if n < 64 else np.r_[0:5, 60:70, 125:130, n - 5:n]
+    assert np.array_equal(dist[sources], _bfs(indptr, indices, sources)[sources])
+    assert np.array_equal(dist, dist.T)
+    assert dist.max() == 2
+
+
+def test_disconnected_routers_are_unreachable():
+    # Two triangles
+    indptr = np.array([0, 2, 4, 6, 8, 10, 12])
+    indices = np.array([1, 2, 0, 2, 0, 1, 4, 5, 3, 5, 3, 4])
+    dist = all_pairs_distances(indptr, indices)
+    assert np.array_equal(dist, _bfs(indptr, indices))
+    assert dist[0, 3] == UNREACHABLE
+
+
+def test_distance_cache(tmp_path):
+    adjacency = tmp_path / "PolarFly.q_3.txt"
+    with open(SHIPPED[3], "rb") as f:
+        adjacency.write_bytes(f.read())
+    cache = distance_cache_path(str(adjacency), str(tmp_path / "cache"))
+    first = load_distance_matrix(str(adjacency), str(tmp_path / "cache"))
+    assert os.path.exists(cache)
+    assert isinstance(first, np.memmap)
+    assert np.array_equal(first, all_pairs_distances(*read_adjacency(str(adjacency))))
+    # An edited file gets a new cache entry
+    lines = adjacency.read_text().splitlines()
+    adjacency.write_text("\n".join(lines[:-1]) + "\n")
+    assert distance_cache_path(str(adjacency), str(tmp_path / "cache")) != cache
+
+
+def test_histograms_match_pairs():
+    dist = all_pairs_distances(*read_adjacency(SHIPPED[25]))
+    hosts = 4
+    rng = np.random.default_rng(3)
+    nodes = rng.choice(dist.shape[0] * hosts, 120, replace=False)
+    routers = nodes // hosts
+    expected = Counter()
+    for i in range(nodes.size):
+        for j in range(nodes.size):
+            if i != j:
+                expected[int(dist[routers[i], routers[j]]) + 2] += 1
+    assert all_pairs_hop_histogram(nodes, dist, hosts) == expected
+    root = int(nodes[7])
+    expected = Counter(int(dist[root // hosts, r]) + 2 for r in np.delete(routers, 7))
+    assert root_hop_histogram(nodes, root, dist, hosts) == expected
+
+
+@pytest.mark.parametrize("q", sorted(SHIPPED))
+def test_generated_file_matches_shipped(q, tmp_path):
+    path = tmp_path / f"PolarFly.q_{q}.txt"
+    write_adjacency(str(path), *polarfly_adjacency(q))
+    with open(SHIPPED[q], "rb") as f:
+        shipped = f.read().replace(b"\r\n", b"\n")
+    assert path.read_bytes() == shipped
+
+
+@pytest.mark.parametrize("q", sorted(SHIPPED))
+def test_adjacency_round_trip(q, tmp_path):
+    indptr, indices = polarfly_adjacency(q)
+    shipped = read_adjacency(SHIPPED[q])
+    assert np.array_equal(indptr, shipped[0])
+    assert np.array_equal(indices, shipped[1])
+    path = str(tmp_path / "adjacency.txt")
+    write_adjacency(path, indptr, indices)
+    again = read_adjacency(path)
+    assert np.array_equal(again[0], indptr) and np.array_equal(again[1], indices)
+
+
+@pytest.mark.parametrize("q", [2, 4, 8, 9, 16, 27])
+def test_field_and_graph_properties(q):
+    add, mul, neg, inv = field_tables(q)
+    elements = np.arange(q)
+    assert np.all(add[elements, neg] == 0)
+    assert np.all(mul[elements[1:], inv[1:]] == 1)
+    # Distributivity over all triples
+    assert np.array_equal(mul[elements[:, None, None], add[elements[None, :, None], elements[None, None, :]]],
+                          add[mul[elements[:, None, None], elements[None, :, None]],
+                              mul[elements[:, None, None], elements[None, None, :]]])
+
+    indptr, indices = polarfly_adjacency(q)
+    n = q * q + q + 1
+    degrees = np.diff(indptr)
+    assert indptr.size == n + 1
+    # q + 1 absolute points (on their own polar line) have degree q, the others q + 1
+    assert np.count_nonzero(degrees == q) == q + 1
+    assert np.count_nonzero(degrees == q + 1) == n - q - 1
+    dist = all_pairs_distances(indptr, indices)
+    assert np.array_equal(dist, dist.T)
+    assert dist.max() == 2 and UNREACHABLE not in dist
+
+
+@pytest.mark.parametrize("q", [0, 1, 6, 12, 100])
+def test_rejects_non_prime_powers(q):
+    with pytest.raises(ValueError):
+        polarfly_adjacency(q)
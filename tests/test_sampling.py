@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from sst_analysis.sampling import MIN_CELL_SAMPLES, sample_hops
+from sst_analysis.topology import DragonflyModel, MeshModel
+
+
+def _exact(model, nodes, root=None):
+    nodes = np.asarray(nodes)
+    if root is None:
+        src, dst = np.nonzero(~np.eye(nodes.size, dtype=bool))
+    else:
+        dst = np.delete(np.arange(nodes.size), root)
+        src = np.full(dst.size, root)
+    hops = np.asarray(model.distance(nodes[src], nodes[dst]))
+    return hops.mean(), np.bincount(hops) / hops.size, src.size
+
+
+@pytest.mark.parametrize("strata,root", [(None, None), ("router", None), ("router", 3), ("group", None)])
+def test_interval_coverage(strata, root):
+    model = DragonflyModel(6, 4, 2, 1) if strata == "group" else MeshModel((8, 8), 2)
+    nodes = np.random.default_rng(1).permutation(model.num_nodes)[:40]
+    mean, fractions, pairs = _exact(model, nodes, root)
+    runs = 40
+    covered = 0
+    bins_missed = 0
+    for seed in range(runs):
+        est = sample_hops(model, nodes, root=root, strata=strata, tol=0.05, batch=256, seed=seed)
+        assert est["pairs"] == pairs
+        assert est["converged"]
+        lo, hi = est["avg_ci"]
+        # Router strata of a mesh have constant distances, so the interval may be a point
+        covered += lo - 1e-9 <= mean <= hi + 1e-9
+        for h, (_, lo, hi) in est["histogram"].items():
+            bins_missed += not lo - 1e-9 <= fractions[h] <= hi + 1e-9
+    # 95% intervals: about 38 of 40 cover the exact average
+    assert covered >= 34
+    assert bins_missed <= 0.1 * runs * np.count_nonzero(fractions)
+
+
+def test_counts_and_tolerance():
+    model = MeshModel((16, 16))
+    est = sample_hops(model, range(256), tol=0.02, seed=0)
+    mean, _, pairs = _exact(model, np.arange(256))
+    assert est["half_width"] <= 0.02
+    assert abs(est["avg_hops"] - mean) <= 3 * est["half_width"]
+    assert sum(est["counts"].values()) == pytest.approx(pairs, rel=1e-3)
+
+
+def test_max_samples_stops_unconverged():
+    model = MeshModel((16, 16))
+    est = sample_hops(model, range(256), tol=1e-6, batch=1000, max_samples=5000, seed=0)
+    assert est["samples"] == 5000 + MIN_CELL_SAMPLES
+    assert not est["converged"]
+
+
+def test_single_rank_and_bad_root():
+    model = MeshModel((4, 4))
+    assert sample_hops(model, [3])["samples"] == 0
+    with pytest.raises(ValueError):
+        sample_hops(model, range(4), root=4)
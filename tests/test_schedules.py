@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from sst_analysis.schedules import (ALGORITHMS, collective_schedule, schedule_hops, schedule_link_loads,
+                                    schedule_steps, schedule_traffic)
+from sst_analysis.topology import MeshModel
+
+M = 64
+
+
+def _job(pattern, size, root=0, algorithm=None):
+    job = {"size": size, "start": 0, "pattern": pattern,
+           "params": f"arg.root={root} arg.count={M // 8} arg.bytes={M} arg.messageSize={M}"}
+    if algorithm:
+        job["algorithm"] = algorithm
+    return job
+
+
+def _rounds(job):
+    return [(src.tolist(), dst.tolist(), nbytes.tolist()) for src, dst, nbytes in schedule_steps(job)]
+
+
+@pytest.mark.parametrize("pattern", ["Bcast", "Scatter"])
+@pytest.mark.parametrize("size", range(2, 18))
+def test_root_trees_are_causal(pattern, size):
+    for root in range(size):
+        has_data = {root}
+        for src, dst, _ in _rounds(_job(pattern, size, root)):
+            # Every sender already holds the data; every rank receives once
+            assert set(src) <= has_data
+            assert not set(dst) & has_data
+            has_data |= set(dst)
+        assert has_data == set(range(size))
+
+
+@pytest.mark.parametrize("size", range(2, 18))
+def test_scatter_bytes(size):
+    for root in range(size):
+        sent = np.zeros(size, dtype=np.int64)
+        received = np.zeros(size, dtype=np.int64)
+        for src, dst, nbytes in schedule_steps(_job("Scatter", size, root)):
+            np.add.at(sent, src, nbytes)
+            np.add.at(received, dst, nbytes)
+        # Every rank keeps exactly its own share and forwards the rest
+        others = np.arange(size) != root
+        assert np.all(received[others] - sent[others] == M)
+        assert sent[root] == M * (size - 1) and received[root] == 0
+        # Each share travels the tree depth of its rank: popcount of its distance from root
+        assert sent.sum() == M * sum(bin(rel).count("1") for rel in range(1, size))
+    if size & (size - 1) == 0:
+        assert sent.sum() == M * (size // 2) * (size.bit_length() - 1)
+
+
+def test_scatter_rounds_for_eight():
+    rounds = _rounds(_job("Scatter", 8))
+    assert rounds == [([0], [4], [4 * M]), ([0, 4], [2, 6], [2 * M] * 2), ([0, 2, 4, 6], [1, 3, 5, 7], [M] * 4)]
+
+
+@pytest.mark.parametrize("size", range(2, 18))
+def test_binomial_allreduce_is_causal(size):
+    steps = _rounds(_job("Allreduce", size, algorithm="binomial"))
+    half = len(steps) // 2
+    # Reduce: a rank sends its partial result once, after all of its children have sent theirs
+    done = set()
+    for src, dst, _ in steps[:half]:
+        assert not set(src) & done and not set(dst) & done
+        done |= set(src)
+    assert done == set(range(1, size))
+    # Broadcast of the result from rank 0
+    has_data = {0}
+    for src, dst, _ in steps[half:]:
+        assert set(src) <= has_data
+        has_data |= set(dst)
+    assert has_data == set(range(size))
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS["Allreduce"])
+@pytest.mark.parametrize("size", [2, 5, 8, 12])
+def test_allreduce_every_rank_hears_from_every_rank(algorithm, size):
+    # Track which ranks' contributions each rank holds
+    holds = [{r} for r in range(size)]
+    for src, dst, _ in schedule_steps(_job("Allreduce", size, algorithm=algorithm)):
+        incoming = [set(holds[s]) for s in src]
+        for d, contribution in zip(dst, incoming):
+            holds[d] |= contribution
+    assert all(h == set(range(size)) for h in holds)
+
+
+def test_one_message_per_rank_and_step():
+    for pattern, algorithms in ALGORITHMS.items():
+        for algorithm in algorithms:
+            for src, dst, _ in schedule_steps(_job(pattern, 11, 3, algorithm)):
+                assert np.unique(src).size == src.size
+                assert np.all(src != dst)
+
+
+def test_traffic_and_engines_agree():
+    job = _job("Scatter", 13, root=5)
+    job["params"] += " arg.iterations=2"
+    step, src, dst, nbytes = collective_schedule(job)
+    pair_src, pair_dst, pair_bytes = schedule_traffic(job)
+    assert pair_bytes.sum() == 2 * nbytes.sum()
+    model = MeshModel((4, 4))
+    nodes = np.arange(13)
+    hops = schedule_hops(model, job, nodes)
+    assert sum(hops["histogram"].values()) == 2 * nbytes.sum()
+    assert hops["step_bytes"].tolist() == np.bincount(step, weights=nbytes).tolist()
+    loads, step_max = schedule_link_loads(model, job, nodes)
+    assert step_max.size == step.max() + 1
+    assert loads.sum() == pytest.approx(2 * np.dot(nbytes, model.distance(src, dst) - 2))
@@ -0,0 +1,97 @@
+import copy
+
+import numpy as np
+import pytest
+
+from sst_analysis.session import JobMixSession
+from sst_analysis.topology import DragonflyModel, MeshModel
+
+JOBS = [
+    {"size": 16, "start": 0, "pattern": "Allreduce", "params": "arg.count=256 arg.iterations=4"},
+    {"size": 12, "start": 16, "pattern": "Alltoall", "params": "arg.bytes=512"},
+    {"size": 10, "start": 28, "pattern": "Scatter", "params": "arg.root=3 arg.count=64"},
+    {"size": 9, "start": 38, "pattern": "Bcast", "params": "arg.count=128 arg.iterations=2"},
+    {"size": 8, "start": 47, "pattern": "Barrier", "params": "arg.iterations=10"},
+]
+
+MODELS = {"mesh": MeshModel((6, 6), 2), "dragonfly": DragonflyModel(6, 4, 3, 1)}
+
+
+def _edits():
+    # A sequence of job mixes, each one edit away from the last
+    jobs = copy.deepcopy(JOBS)
+    yield copy.deepcopy(jobs)
+    jobs[1]["params"] = "arg.bytes=2048"
+    yield copy.deepcopy(jobs)
+    jobs[3]["start"] = 60
+    yield copy.deepcopy(jobs)
+    jobs.append({"size": 6, "start": 66, "pattern": "PingPong", "params": "arg.messageSize=4096"})
+    yield copy.deepcopy(jobs)
+    del jobs[0]
+    yield copy.deepcopy(jobs)
+    jobs.append(copy.deepcopy(jobs[0]))
+    yield copy.deepcopy(jobs)
+    jobs[1]["params"] = "arg.bytes=512"
+    yield copy.deepcopy(jobs)
+    yield []
+
+
+def test_edit_recomputes_only_the_changed_job():
+    session = JobMixSession(MODELS["mesh"])
+    first = session.evaluate(JOBS)
+    assert first["recomputed"] == len(JOBS)
+    assert session.evaluate(JOBS)["recomputed"] == 0
+
+    edited = copy.deepcopy(JOBS)
+    edited[2]["params"] = "arg.root=5 arg.count=64"
+    result = session.evaluate(edited)
+    assert result["recomputed"] == 1
+    for idx in (0, 1, 3, 4):
+        assert result["jobs"][idx]["histogram"] == first["jobs"][idx]["histogram"]
+        assert result["jobs"][idx]["byte_hops"] == first["jobs"][idx]["byte_hops"]
+    # Going back hits the cache again
+    assert session.evaluate(JOBS)["recomputed"] == 0
+
+
+def test_allocation_edit_moves_later_jobs():
+    session = JobMixSession(MODELS["mesh"], allocation="linear")
+    session.evaluate(JOBS)
+    edited = copy.deepcopy(JOBS)
+    edited[2]["size"] = 11
+    # The resized job and the two allocated after it
+    assert session.evaluate(edited)["recomputed"] == 3
+
+
+@pytest.mark.parametrize("name", sorted(MODELS))
+def test_deltas_match_fresh_session(name):
+    model = MODELS[name]
+    session = JobMixSession(model)
+    for jobs in _edits():
+        result = session.evaluate(jobs)
+        fresh = JobMixSession(model)
+        expected = fresh.evaluate(jobs)
+        assert result["histogram"] == expected["histogram"]
+        assert result["byte_hops"] == expected["byte_hops"]
+        assert result["bytes"] == expected["bytes"]
+        assert np.array_equal(session.loads, fresh.loads)
+        assert result["links"] == expected["links"]
+    assert not session.histogram
+    assert session.byte_hops == 0 and session.bytes == 0
+    assert not session.loads.any()
+
+
+def test_eviction_keeps_the_current_mix():
+    session = JobMixSession(MODELS["mesh"], max_entries=2)
+    session.evaluate(JOBS)
+    # The cache may exceed max_entries, but only by jobs of the current mix
+    assert len(session._cache) == len(JOBS)
+    assert session.evaluate(JOBS)["recomputed"] == 0
+
+    for jobs in _edits():
+        session.evaluate(jobs)
+        assert set(session._mix) <= set(session._cache)
+        assert len(session._cache) <= max(session.max_entries, len(session._mix))
+    # Jobs that left the mix are evicted first, least recently used first
+    session.evaluate(JOBS[:1])
+    assert len(session._cache) == 2
+    assert session.evaluate(JOBS[:1])["recomputed"] == 0
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sst_analysis.statcsv import aggregate, iter_chunks
+from sst_analysis.statstore import StatStore, convert
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+TORUS_STATS = os.path.join(REPO, "Multijob_2", "torus", "torus_stats.csv")
+
+HEADER = ("ComponentName, StatisticName, StatisticSubId, StatisticType, SimTime, Rank, "
+          "Sum.u32, SumSQ.u32, Count.u64, Min.u32, Max.u32, Sum.u64, SumSQ.u64, Min.u64, Max.u64")
+
+
+def _write_stats(path, rows):
+    # rows: (component, statistic, subid, simtime, sum, count, min, max, wide)
+    lines = [HEADER]
+    for comp, stat, subid, time, total, count, lo, hi, wide in rows:
+        narrow = (total, total * total, count, lo, hi, 0, 0, 0, 0)
+        typed = (0, 0, count, 0, 0, total, total * total, lo, hi) if wide else narrow
+        lines.append(", ".join(map(str, (comp, stat, subid, "Accumulator", time, 0) + typed)))
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def stats_file(tmp_path):
+    rows = [
+        ("rtr_0", "hopcount", "port0", 10, 12, 4, 2, 5, False),
+        ("rtr_0", "hopcount", "port1", 10, 0, 0, 0, 0, False),
+        ("rtr_1", "hopcount", "port0", 20, 30, 6, 3, 9, True),
+        ("rtr_1", "idle_time", "port0", 20, 7, 1, 7, 7, False),
+        ("rtr_2", "idle_time", "port0", 30, 0, 0, 0, 0, True),
+        ("nic_0", "stalls", "", 30, 0, 0, 0, 0, False),
+    ]
+    path = tmp_path / "stats.csv"
+    _write_stats(path, rows)
+    return str(path)
+
+
+def test_typed_columns_merged(stats_file):
+    chunk = next(iter_chunks(stats_file))
+    assert chunk["Sum"].tolist() == [12, 0, 30, 7, 0, 0]
+    assert chunk["Max"].tolist() == [5, 0, 9, 7, 0, 0]
+
+
+def test_filters_and_chunking(stats_file):
+    whole = aggregate(stats_file, components="rtr_*", statistics="hopcount")
+    chunked = aggregate(stats_file, components="rtr_*", statistics="hopcount", chunk_rows=1)
+    assert whole == chunked
+    assert whole["hopcount"]["Rows"] == 3
+    assert whole["hopcount"]["Sum"] == 42
+
+
+def test_min_max_skip_records_without_samples(stats_file):
+    result = aggregate(stats_file)
+    assert (result["hopcount"]["Min"], result["hopcount"]["Max"]) == (2, 9)
+    assert (result["idle_time"]["Min"], result["idle_time"]["Max"]) == (7, 7)
+    assert (result["stalls"]["Min"], result["stalls"]["Max"]) == (0, 0)
+    # Count is read for the mask but only returned when asked for
+    assert set(aggregate(stats_file, fields=("Min",))["hopcount"]) == {"Rows", "SimTime", "Min"}
+
+
+def _pandas_aggregate(path):
+    frame = pd.read_csv(path, skipinitialspace=True)
+    for field in ("Sum", "SumSQ", "Count", "Min", "Max"):
+        frame[field] = frame.filter(regex=rf"^{field}\.").sum(axis=1)
+    sampled = frame[frame["Count"] > 0]
+    totals = frame.groupby("StatisticName")[["Sum", "Count", "SimTime"]].agg(
+        {"Sum": "sum", "Count": "sum", "SimTime": "max"})
+    extremes = sampled.groupby("StatisticName").agg({"Min": "min", "Max": "max"})
+    return totals.join(extremes).fillna(0)
+
+
+@pytest.mark.parametrize("path", [TORUS_STATS, None])
+def test_aggregate_matches_pandas(path, stats_file):
+    path = path or stats_file
+    expected = _pandas_aggregate(path)
+    result = aggregate(path, chunk_rows=97)
+    assert set(result) == set(expected.index)
+    for name, row in expected.iterrows():
+        for field in ("Sum", "Count", "SimTime", "Min", "Max"):
+            assert result[name][field] == row[field], (name, field)
+
+
+def test_store_matches_streaming_aggregate(stats_file, tmp_path):
+    store = StatStore(convert(stats_file, str(tmp_path / "stats.sststore")))
+    by = ("ComponentName", "StatisticName")
+    assert store.aggregate(by=by) == aggregate(stats_file, by=by)
+    assert store.aggregate() == aggregate(stats_file)
+    rows = store.query(components="rtr_1", statistics="hopcount")
+    assert rows["Sum"].tolist() == [30]
+    assert np.array_equal(store.select(statistics="idle_time"), [4, 5])
@@ -0,0 +1,230 @@
+import json
+import os
+import stat
+import sys
+import time
+
+import pytest
+
+from sst_analysis.runcache import ResultCache, canonical_value, config_key
+from sst_analysis.sweep import LocalScheduler, expand_sweep, parse_bandwidth, parse_size, parse_time, run_sweep, sweep_values
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SPEC = os.path.join(REPO, "Multijob_2", "dragonfly", "link_bw_sweep.json")
+
+# Stand-in for the sst Python modules: every merlin/ember class builds an
+# object that accepts any attribute and method call and remembers them
+STUB_MODULE = '''
+INSTANCES = []
+OUTPUT = {}
+
+
+class _Obj:
+    def __init__(self, kind):
+        self.__dict__["_kind"] = kind
+        self.__dict__["_calls"] = []
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        child = _Obj(self._kind + "." + name)
+        self.__dict__[name] = child
+        return child
+
+    def __call__(self, *args, **kwargs):
+        self._calls.append(args)
+
+
+class _Kind:
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        obj = _Obj(self.name)
+        obj.__dict__["_args"] = args
+        INSTANCES.append(obj)
+        return obj
+
+
+PlatformDefinition = _Obj("PlatformDefinition")
+for _name in ("topoDragonFly", "topoTorus", "topoMesh", "topoPolarFly", "hr_router",
+              "ReorderLinkControl", "LinkControl", "System", "EmberMPIJob"):
+    globals()[_name] = _Kind(_name)
+
+
+def setStatisticLoadLevel(level):
+    OUTPUT["level"] = level
+
+
+def setStatisticOutput(kind, params):
+    OUTPUT["kind"] = kind
+    OUTPUT["params"] = params
+
+
+def enableAllStatisticsForComponentType(kind):
+    OUTPUT.setdefault("enabled", []).append(kind)
+'''
+
+# The stub sst executable: prints the contents of VERSION for --version, or runs
+# config.py against the stub modules, writes a one-record stats file and the
+# router settings, and fails for 48GB/s links
+STUB_SST = '''#!{python}
+import json
+import runpy
+import sys
+
+if sys.argv[1:] == ["--version"]:
+    print(open({version!r}).read())
+    sys.exit(0)
+sys.path.insert(0, {modules!r})
+from sst import _stub
+
+runpy.run_path(sys.argv[-1])
+router = next(o for o in _stub.INSTANCES if o._kind == "hr_router")
+settings = {{k: v for k, v in vars(router).items() if not k.startswith("_")}}
+with open("router.json", "w") as f:
+    json.dump(settings, f)
+if settings["link_bw"] == "48GB/s":
+    sys.exit(1)
+with open(_stub.OUTPUT["params"]["filepath"], "w") as f:
+    f.write("ComponentName, StatisticName, StatisticSubId, StatisticType, SimTime, Rank, Sum.u64\\n")
+    f.write("rtr_0, send_bit_count, port0, Accumulator, 100, 0, 1\\n")
+'''
+
+
+@pytest.fixture
+def stub_sst(tmp_path):
+    modules = tmp_path / "modules"
+    package = modules / "sst"
+    (package / "merlin").mkdir(parents=True)
+    (package / "_stub.py").write_text(STUB_MODULE)
+    (package / "__init__.py").write_text("from sst._stub import *\n")
+    (package / "merlin" / "__init__.py").write_text("")
+    for name in ("base", "endpoint", "interface", "topology"):
+        (package / "merlin" / f"{name}.py").write_text("from sst._stub import *\n")
+    (package / "ember.py").write_text("from sst._stub import *\n")
+    (tmp_path / "VERSION").write_text("SST-Core Version (14.1.0)")
+    executable = tmp_path / "sst"
+    executable.write_text(STUB_SST.format(python=sys.executable, modules=str(modules),
+                                          version=str(tmp_path / "VERSION")))
+    executable.chmod(executable.stat().st_mode | stat.S_IEXEC)
+    return str(executable)
+
+
+@pytest.fixture
+def spec():
+    with open(SPEC) as f:
+        spec = json.load(f)
+    spec["sweep"] = {"router.link_bw": ["12GB/s", "24GB/s", "48GB/s"], "router.num_vns": [1, 2]}
+    return spec
+
+
+def test_units():
+    assert parse_size("16kB") == 16e3
+    assert parse_size("2GiB") == 2 ** 31
+    assert parse_bandwidth("12GB/s") == 12e9
+    assert parse_time("20ns") == pytest.approx(20e-9)
+    assert parse_time(5, "us") == pytest.approx(5e-6)
+    with pytest.raises(ValueError):
+        parse_size("12 parsecs")
+
+
+def test_expand_sweep():
+    with open(SPEC) as f:
+        spec = json.load(f)
+    assert sweep_values({"start": 16, "stop": 64, "step": 16, "unit": "kB"}) == ["16kB", "32kB", "48kB", "64kB"]
+    points = expand_sweep(spec)
+    assert len(points) == 3 * 4 * 2
+    point, config = points[-1]
+    assert point == {"router.link_bw": "48GB/s", "router.input_buf_size": "64kB", "router.num_vns": 2}
+    assert config["router"]["input_buf_size"] == "64kB"
+    assert "sweep" not in config and "resources" not in config
+    # The spec itself is untouched
+    assert spec["router"]["link_bw"] == "12GB/s"
+
+
+def test_run_sweep_with_stub_sst(stub_sst, spec, tmp_path):
+    out = tmp_path / "out"
+    results = run_sweep(spec, str(out), sst=stub_sst, max_cores=2)
+    assert len(results) == 6
+    assert json.loads((out / "sweep_results.json").read_text()) == results
+    for result in results:
+        with open(os.path.join(result["run_dir"], "router.json")) as f:
+            router = json.load(f)
+        # The generated config applied the point on top of the base router settings
+        assert router["link_bw"] == result["point"]["router.link_bw"]
+        assert router["num_vns"] == result["point"]["router.num_vns"]
+        assert router["xbar_bw"] == "20GB/s"
+        failed = result["point"]["router.link_bw"] == "48GB/s"
+        assert result["returncode"] == (1 if failed else 0)
+        assert (result["stats"] is None) == failed
+        assert not result["cached"]
+
+
+def test_run_sweep_reuses_cache(stub_sst, spec, tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    try:
+        first = run_sweep(spec, str(tmp_path / "first"), sst=stub_sst, cache=cache)
+        assert len(cache) == 4
+        second = run_sweep(spec, str(tmp_path / "second"), sst=stub_sst, cache=cache)
+    finally:
+        cache.close()
+    # Successful points come from the cache, failed ones run again
+    assert [r["cached"] for r in second] == [r["stats"] is not None for r in first]
+    for result in second:
+        if result["cached"]:
+            with open(result["stats"]) as f:
+                assert f.read().startswith("ComponentName")
+
+
+def test_run_sweep_misses_cache_after_sst_upgrade(stub_sst, spec, tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    try:
+        run_sweep(spec, str(tmp_path / "first"), sst=stub_sst, cache=cache)
+        (tmp_path / "VERSION").write_text("SST-Core Version (15.0.0)")
+        again = run_sweep(spec, str(tmp_path / "second"), sst=stub_sst, cache=cache)
+        assert len(cache) == 8
+        # Both releases' runs with 12GB/s links
+        assert cache.invalidate({"router.link_bw": "12 GB/s"}) == 4
+    finally:
+        cache.close()
+    assert not any(r["cached"] for r in again)
+
+
+def test_config_key_is_canonical():
+    with open(SPEC) as f:
+        spec = json.load(f)
+    config = expand_sweep(spec)[0][1]
+    same = json.loads(json.dumps(config))
+    same["name"] = "renamed"
+    same["router"]["link_bw"] = "12 GB/s"
+    same["router"]["input_buf_size"] = "16000B"
+    same["router"]["num_vns"] = "1"
+    same["topology"]["link_latency"] = "0.025us"
+    same["jobs"][0]["params"] = "arg.compute=1 arg.iterations=1 arg.count=512"
+    # Written-out defaults equal omitted ones
+    same["platform"] = "firefly-defaults"
+    same["statistic_load_level"] = 8
+    del same["nic2host_lat"]
+    assert config_key(same) == config_key(config)
+    assert config_key(config, "SST-Core Version (14.1.0)") != config_key(config)
+
+    changed = json.loads(json.dumps(config))
+    changed["router"]["link_bw"] = "12GiB/s"
+    assert config_key(changed) != config_key(config)
+    assert canonical_value("merlin.xbar_arb_lru") == "merlin.xbar_arb_lru"
+    assert canonical_value(["ugal", "16kB", "2"]) == ["ugal", "16000B", 2]
+
+
+def test_scheduler_cleans_up_after_failed_launch(tmp_path):
+    marker = tmp_path / "finished"
+    slow = {"cmd": [sys.executable, "-c", f"import time; time.sleep(0.5); open({str(marker)!r}, 'w')"],
+            "cwd": str(tmp_path), "cores": 1, "memory": 0, "log": str(tmp_path / "slow.log")}
+    broken = {"cmd": [sys.executable, "-c", "pass"], "cwd": str(tmp_path / "missing"),
+              "cores": 1, "memory": 0, "log": str(tmp_path / "broken.log")}
+    with pytest.raises(OSError):
+        LocalScheduler(max_cores=2, max_memory="1GB").run([slow, broken])
+    # The run that had already started was killed, not orphaned, and no handle is left open
+    assert not any(key.startswith("_") for key in slow) and not any(key.startswith("_") for key in broken)
+    time.sleep(1)
+    assert not marker.exists()
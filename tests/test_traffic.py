@@ -0,0 +1,114 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from sst_analysis.allocation import allocate
+from sst_analysis.jobs import pair_traffic
+from sst_analysis.topology import DragonflyModel, MeshModel
+from sst_analysis.traffic import TrafficMatrix, placed_traffic
+
+JOBS = [
+    {"size": 12, "start": 0, "pattern": "Allreduce", "params": "arg.count=64 arg.iterations=3"},
+    {"size": 9, "start": 12, "pattern": "Alltoall", "params": "arg.bytes=100"},
+    {"size": 10, "start": 21, "pattern": "Scatter", "params": "arg.root=4 arg.count=16"},
+    {"size": 7, "start": 31, "pattern": "Bcast", "params": "arg.count=8 arg.iterations=2"},
+    {"size": 11, "start": 38, "pattern": "Barrier", "params": "arg.iterations=5"},
+    {"size": 2, "start": 49, "pattern": "PingPong", "params": "arg.messageSize=1024"},
+]
+
+
+def _brute_force(jobs, maps):
+    # bytes per ordered (src node, dst node) from jobs.pair_traffic
+    total = Counter()
+    for job, nodes in zip(jobs, maps):
+        for s, d, w in zip(*pair_traffic(job)):
+            total[int(nodes[s]), int(nodes[d])] += int(w)
+    return total
+
+
+def _as_counter(src, dst, nbytes):
+    total = Counter()
+    for s, d, w in zip(src, dst, np.broadcast_to(nbytes, np.shape(src))):
+        total[int(s), int(d)] += int(w)
+    return total
+
+
+@pytest.mark.parametrize("job", JOBS, ids=[job["pattern"] for job in JOBS])
+def test_from_job_matches_pair_traffic(job):
+    traffic = TrafficMatrix.from_job(job)
+    expected = _brute_force([job], [np.arange(job["size"])])
+    assert _as_counter(*traffic.to_coo()) == expected
+    # Small row chunks expand to the same messages
+    assert _as_counter(*traffic.to_coo(block_pairs=5)) == expected
+    assert traffic.nnz == len(expected)
+    assert traffic.total_bytes() == sum(expected.values())
+
+    indptr, indices, data = traffic.to_csr()
+    assert indptr.size == job["size"] + 1
+    rows = np.repeat(np.arange(job["size"]), np.diff(indptr))
+    assert _as_counter(rows, indices, data) == expected
+
+
+def test_dense_blocks_store_members_only():
+    size = 100000
+    bcast = TrafficMatrix.from_job({"size": size, "start": 0, "pattern": "Bcast"})
+    alltoall = TrafficMatrix.from_job({"size": size, "start": 0, "pattern": "Alltoall"})
+    assert bcast.stored == size - 1
+    assert alltoall.stored == size
+    assert alltoall.nnz == size * (size - 1)
+
+
+@pytest.mark.parametrize("model", [MeshModel((6, 5), 2), DragonflyModel(5, 4, 3, 1)],
+                         ids=["mesh", "dragonfly"])
+def test_reductions_match_brute_force(model):
+    maps = allocate(JOBS, model.num_nodes, "random", seed=3)
+    traffic = TrafficMatrix.from_jobs(JOBS).map_ranks(np.concatenate(maps), model.num_nodes)
+    expected = _brute_force(JOBS, maps)
+    assert _as_counter(*traffic.to_coo()) == expected
+
+    hops = {pair: int(model.distance(*pair)) for pair in expected}
+    assert traffic.byte_hops(model) == sum(w * hops[pair] for pair, w in expected.items())
+    assert traffic.byte_hops(model, block_pairs=7) == traffic.byte_hops(model)
+    by_bytes, by_pairs = Counter(), Counter()
+    for pair, w in expected.items():
+        by_bytes[hops[pair]] += w
+        by_pairs[hops[pair]] += 1
+    assert traffic.hop_histogram(model) == by_bytes
+    assert traffic.hop_histogram(model, weight="pairs", block_pairs=7) == by_pairs
+
+    # A distance matrix gives the same reductions as the model
+    nodes = np.arange(model.num_nodes)
+    matrix = model.distance(nodes[:, None], nodes[None, :])
+    assert traffic.byte_hops(matrix) == traffic.byte_hops(model)
+    assert traffic.hop_histogram(matrix) == by_bytes
+
+    # Per-job matrices of the placed mix add up to the same traffic
+    per_job = placed_traffic(JOBS, maps, model.num_nodes)
+    assert sum(t.byte_hops(model) for t in per_job) == traffic.byte_hops(model)
+    for t, job, nodes in zip(per_job, JOBS, maps):
+        assert _as_counter(*t.to_coo()) == _brute_force([job], [nodes])
+
+
+def test_concat_and_block():
+    traffic = TrafficMatrix.from_jobs(JOBS)
+    sizes = [job["size"] for job in JOBS]
+    assert traffic.size == sum(sizes)
+    assert traffic.offsets.tolist() == np.concatenate([[0], np.cumsum(sizes)]).tolist()
+    # Every job's block is its own matrix again, and no message crosses jobs
+    src, dst, _ = traffic.to_coo()
+    owner = np.searchsorted(traffic.offsets, src, side="right") - 1
+    assert np.array_equal(owner, np.searchsorted(traffic.offsets, dst, side="right") - 1)
+    for j, job in enumerate(JOBS):
+        block = traffic.block(j)
+        assert block.size == job["size"]
+        assert _as_counter(*block.to_coo()) == _as_counter(*TrafficMatrix.from_job(job).to_coo())
+
+
+def test_map_ranks_checks_length():
+    traffic = TrafficMatrix.from_job(JOBS[0])
+    with pytest.raises(ValueError):
+        traffic.map_ranks(np.arange(5))
+    mapped = traffic.map_ranks(np.arange(12)[::-1] * 3)
+    assert mapped.size == 34
+    assert _as_counter(*mapped.to_coo()) == _brute_force([JOBS[0]], [np.arange(12)[::-1] * 3])
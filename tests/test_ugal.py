@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from sst_analysis.hops import ENDPOINT_HOPS
+from sst_analysis.linkload import link_loads
+from sst_analysis.topology import DragonflyModel, MeshModel
+from sst_analysis.ugal import emulate_ugal
+
+MODEL = DragonflyModel(6, 4, 2, 1)
+
+
+def _shift_traffic(model):
+    # Every node sends to the same position one group ahead: all of a group's
+    # traffic wants the single global link to the next group
+    nodes = np.arange(model.num_nodes)
+    per_group = model.routers_per_group * model.hosts_per_router
+    return nodes, (nodes + per_group) % model.num_nodes, np.full(nodes.size, 1e6)
+
+
+def _uniform_traffic(model, seed=0):
+    rng = np.random.default_rng(seed)
+    src = rng.integers(model.num_nodes, size=400)
+    return src, rng.integers(model.num_nodes, size=400), rng.integers(1, 100, size=400) * 1000
+
+
+def test_high_threshold_routes_minimally():
+    src, dst, nbytes = _uniform_traffic(MODEL)
+    # Valiant would need an idle first link; uniform traffic loads them all
+    result = emulate_ugal(MODEL, src, dst, nbytes, adaptive_threshold=1e12, seed=0)
+    assert result["converged"] and result["iterations"] == 1
+    assert not result["valiant_share"].any()
+    assert np.allclose(result["link_loads"], link_loads(MODEL, src, dst, nbytes))
+    hops = MODEL.distance(src, dst)
+    assert result["avg_hops"] == pytest.approx(hops[src != dst].mean())
+
+
+def test_zero_threshold_goes_valiant():
+    src, dst, nbytes = _shift_traffic(MODEL)
+    result = emulate_ugal(MODEL, src, dst, nbytes, adaptive_threshold=0.0, seed=0)
+    # Every flow here crosses groups, so every flow is eligible and ends up nearly all Valiant
+    assert result["converged"]
+    assert result["valiant_share"].min() > 0.9
+    assert result["avg_hops"] > MODEL.distance(src, dst).mean()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_adversarial_traffic_converges_and_spreads_load(seed):
+    src, dst, nbytes = _shift_traffic(MODEL)
+    minimal = link_loads(MODEL, src, dst, nbytes)
+    result = emulate_ugal(MODEL, src, dst, nbytes, seed=seed)
+    # Choices keep flipping here, so this takes a few hundred iterations
+    assert result["converged"] and result["iterations"] > 1
+    assert 0 < result["valiant_share"].mean() < 1
+    assert result["utilization"].max() == pytest.approx(1.0)
+    # The hop histogram counts every flow once, split between its two routes,
+    # and carries the same byte-hops as the link loads (all flows send 1e6 bytes)
+    hist = result["hop_histogram"]
+    assert sum(hist.values()) == pytest.approx(src.size)
+    assert result["link_loads"].sum() == pytest.approx(1e6 * sum((h - ENDPOINT_HOPS) * c for h, c in hist.items()))
+
+    # Lower thresholds divert more traffic; at 1 it relieves the saturated global links
+    shares = [emulate_ugal(MODEL, src, dst, nbytes, adaptive_threshold=t, seed=seed)["valiant_share"].mean()
+              for t in (4.0, 2.0, 1.0, 0.0)]
+    assert shares == sorted(shares)
+    eager = emulate_ugal(MODEL, src, dst, nbytes, adaptive_threshold=1.0, seed=seed)
+    assert eager["link_loads"].max() < minimal.max()
+
+    # A tighter tolerance runs longer but lands on nearly the same split
+    tighter = emulate_ugal(MODEL, src, dst, nbytes, tol=1e-4, max_iterations=5000, seed=seed)
+    assert tighter["converged"] and tighter["iterations"] >= result["iterations"]
+    assert np.abs(tighter["link_loads"] - result["link_loads"]).max() < 0.05 * result["link_loads"].max()
+
+
+def test_same_group_pairs_stay_minimal():
+    src, dst, nbytes = _uniform_traffic(MODEL, seed=3)
+    result = emulate_ugal(MODEL, src, dst, nbytes, adaptive_threshold=0.0, seed=0)
+    group_size = MODEL.routers_per_group * MODEL.hosts_per_router
+    local = src // group_size == dst // group_size
+    assert local.any()
+    assert not result["valiant_share"][local].any()
+    # Same seed, same result
+    again = emulate_ugal(MODEL, src, dst, nbytes, adaptive_threshold=0.0, seed=0)
+    assert np.array_equal(again["valiant_share"], result["valiant_share"])
+
+
+def test_mesh_valiant_via_random_router():
+    model = MeshModel((4, 4), 1)
+    src, dst, nbytes = _uniform_traffic(model, seed=1)
+    result = emulate_ugal(model, src, dst, nbytes, adaptive_threshold=0.0, seed=0)
+    assert result["converged"]
+    # Valiant over a random router is never shorter than dimension order
+    assert result["avg_hops"] >= MeshModel((4, 4), 1).distance(src, dst)[src != dst].mean()